@@ -0,0 +1,71 @@
+import json
+import platform
+import statistics
+import sys
+import time
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-output",
+        default=None,
+        help="Write benchmark results as JSON to this file.",
+    )
+
+
+class BenchmarkResults:
+
+    def __init__(self):
+        self.results = []
+
+    def record(self, name, samples, **params):
+        """Record the durations, in seconds, of repeated runs of one benchmark."""
+        ordered = sorted(samples)
+        result = {
+            "name": name,
+            "params": params,
+            "count": len(ordered),
+            "min": ordered[0],
+            "median": statistics.median(ordered),
+            "p90": ordered[int(0.9 * (len(ordered) - 1))],
+            "max": ordered[-1],
+            "mean": statistics.mean(ordered),
+        }
+        self.results.append(result)
+        return result
+
+    def record_throughput(self, name, elapsed, total_bytes, count, **params):
+        """Record a benchmark that moved `total_bytes` in `count` messages."""
+        result = {
+            "name": name,
+            "params": params,
+            "count": count,
+            "elapsed": elapsed,
+            "bytes_per_second": total_bytes / elapsed,
+            "messages_per_second": count / elapsed,
+        }
+        self.results.append(result)
+        return result
+
+    def as_json(self):
+        return {
+            "python": sys.version,
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "results": self.results,
+        }
+
+
+@pytest.fixture(scope="session")
+def benchmark_results(request):
+    results = BenchmarkResults()
+    yield results
+    output = request.config.getoption("--bench-output")
+    if output is None:
+        json.dump(results.as_json(), sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(output, "w") as f:
+            json.dump(results.as_json(), f, indent=2)
@@ -0,0 +1,317 @@
+"""Benchmarks for the cost of the `tcpserver` fixture itself.
+
+Run them with `make benchmark`. They run over loopback TCP, except where transports are
+compared, and the results are written as JSON so that they can be compared between
+revisions.
+"""
+import json
+import random
+import time
+from unittest.mock import ANY
+
+import pytest
+
+from pytest_tcpclient.framing import read_frame, write_frame
+from pytest_tcpclient.plugin import MockTcpServerFactory
+from pytest_tcpclient.script import Script
+
+ITERATIONS = 200
+
+FRAME_SIZES = [16, 256, 4 * 1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024]
+
+# Each frame size moves roughly this many bytes in each direction
+FRAME_BYTES_PER_SIZE = 64 * 1024 * 1024
+
+MAX_FRAMES_PER_SIZE = 5000
+
+SCRIPT_STEPS = 5000
+
+MESSAGES = 100_000
+
+
+async def connect(server):
+    server.expect_connect()
+    reader, writer = await server.open_connection()
+    await server.join()
+    return reader, writer
+
+
+async def disconnect(writer):
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_fixture_setup_teardown(benchmark_results, unused_tcp_port_factory, mocker):
+    samples = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        factory = MockTcpServerFactory(unused_tcp_port_factory, mocker)
+        server = await factory()
+        _, writer = await connect(server)
+        await disconnect(writer)
+        await factory.stop()
+        mocker.stopall()
+        samples.append(time.perf_counter() - start)
+    benchmark_results.record("fixture_setup_teardown", samples)
+
+
+@pytest.mark.asyncio()
+async def test_bytes_round_trip_latency(benchmark_results, tcpserver):
+    reader, writer = await connect(tcpserver)
+    samples = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        tcpserver.expect_bytes(b"ping")
+        tcpserver.send_bytes(b"pong")
+        writer.write(b"ping")
+        assert await reader.readexactly(4) == b"pong"
+        samples.append(time.perf_counter() - start)
+    await tcpserver.join()
+    await disconnect(writer)
+    benchmark_results.record("bytes_round_trip_latency", samples)
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("transport", ["tcp", "unix", "socketpair"])
+async def test_transport_setup_and_round_trip(
+    benchmark_results, unused_tcp_port_factory, mocker, transport
+):
+    setup_samples = []
+    round_trip_samples = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        factory = MockTcpServerFactory(unused_tcp_port_factory, mocker)
+        server = await factory(transport=transport)
+        reader, writer = await connect(server)
+        setup_samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        server.expect_bytes(b"ping")
+        server.send_bytes(b"pong")
+        writer.write(b"ping")
+        assert await reader.readexactly(4) == b"pong"
+        round_trip_samples.append(time.perf_counter() - start)
+
+        await disconnect(writer)
+        await factory.stop()
+        mocker.stopall()
+    benchmark_results.record("transport_setup", setup_samples, transport=transport)
+    benchmark_results.record("transport_round_trip", round_trip_samples, transport=transport)
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("size", FRAME_SIZES)
+async def test_expect_frame_throughput(benchmark_results, tcpserver, size):
+    _, writer = await connect(tcpserver)
+    payload = b"x" * size
+    count = max(1, min(MAX_FRAMES_PER_SIZE, FRAME_BYTES_PER_SIZE // size))
+
+    start = time.perf_counter()
+    for _ in range(count):
+        tcpserver.expect_frame(payload)
+        write_frame(writer, payload)
+        await writer.drain()
+    await tcpserver.join()
+    elapsed = time.perf_counter() - start
+
+    await disconnect(writer)
+    benchmark_results.record_throughput(
+        "expect_frame_throughput", elapsed, (size + 4) * count, count, size=size
+    )
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("size", FRAME_SIZES)
+async def test_expect_until_throughput(benchmark_results, tcpserver, size):
+    _, writer = await connect(tcpserver)
+    # Lines longer than the server's stream reader limit arrive in many chunks, each of
+    # which must only be searched once
+    line = b"x" * size + b"\r\n"
+    count = max(1, min(MAX_FRAMES_PER_SIZE, FRAME_BYTES_PER_SIZE // size))
+
+    start = time.perf_counter()
+    for _ in range(count):
+        tcpserver.expect_until(b"\r\n")
+        writer.write(line)
+        await writer.drain()
+    await tcpserver.join()
+    elapsed = time.perf_counter() - start
+
+    await disconnect(writer)
+    benchmark_results.record_throughput(
+        "expect_until_throughput", elapsed, len(line) * count, count, size=size
+    )
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("size", FRAME_SIZES)
+async def test_send_frame_throughput(benchmark_results, tcpserver, size):
+    reader, writer = await connect(tcpserver)
+    payload = b"x" * size
+    count = max(1, min(MAX_FRAMES_PER_SIZE, FRAME_BYTES_PER_SIZE // size))
+
+    start = time.perf_counter()
+    for _ in range(count):
+        tcpserver.send_frame(payload)
+    for _ in range(count):
+        assert len(await read_frame(reader)) == size
+    await tcpserver.join()
+    elapsed = time.perf_counter() - start
+
+    await disconnect(writer)
+    benchmark_results.record_throughput(
+        "send_frame_throughput", elapsed, (size + 4) * count, count, size=size
+    )
+
+
+@pytest.mark.asyncio()
+async def test_script_steps_throughput(benchmark_results, tcpserver):
+    reader, writer = await connect(tcpserver)
+
+    start = time.perf_counter()
+    for _ in range(SCRIPT_STEPS):
+        tcpserver.expect_bytes(b"ping")
+        tcpserver.send_bytes(b"pong")
+    writer.write(b"ping" * SCRIPT_STEPS)
+    assert await reader.readexactly(4 * SCRIPT_STEPS) == b"pong" * SCRIPT_STEPS
+    await tcpserver.join()
+    elapsed = time.perf_counter() - start
+
+    await disconnect(writer)
+    benchmark_results.record_throughput(
+        "script_steps_throughput", elapsed, 8 * SCRIPT_STEPS, 2 * SCRIPT_STEPS
+    )
+
+
+@pytest.mark.asyncio()
+async def test_compiled_script_throughput(benchmark_results, tcpserver):
+    script = Script()
+    for _ in range(SCRIPT_STEPS):
+        script.expect_bytes(b"ping").send_bytes(b"pong")
+    script.compile()
+    reader, writer = await connect(tcpserver)
+
+    start = time.perf_counter()
+    tcpserver.run_script(script)
+    writer.write(b"ping" * SCRIPT_STEPS)
+    assert await reader.readexactly(4 * SCRIPT_STEPS) == b"pong" * SCRIPT_STEPS
+    await tcpserver.join()
+    elapsed = time.perf_counter() - start
+
+    await disconnect(writer)
+    benchmark_results.record_throughput(
+        "compiled_script_throughput", elapsed, 8 * SCRIPT_STEPS, 2 * SCRIPT_STEPS
+    )
+
+
+@pytest.mark.asyncio()
+async def test_serve_repeated_throughput(benchmark_results, tcpserver):
+    reader, writer = await connect(tcpserver)
+
+    start = time.perf_counter()
+    report = tcpserver.serve_repeated(b"ping", b"pong", SCRIPT_STEPS)
+    for _ in range(SCRIPT_STEPS):
+        writer.write(b"ping")
+        assert await reader.readexactly(4) == b"pong"
+    await tcpserver.join()
+    elapsed = time.perf_counter() - start
+
+    await disconnect(writer)
+    assert len(report) == SCRIPT_STEPS - 1
+    benchmark_results.record_throughput(
+        "serve_repeated_throughput", elapsed, 8 * SCRIPT_STEPS, 2 * SCRIPT_STEPS
+    )
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("decode_only", [False, True])
+async def test_expect_message_throughput(benchmark_results, tcpserver, decode_only):
+    # With `decode_only`, the same messages are only decoded, as a baseline for the cost
+    # of reading and matching them
+    lines = [
+        json.dumps({"op": "tick", "seq": seq, "topic": "news"}).encode() + b"\n"
+        for seq in range(MESSAGES)
+    ]
+    data = b"".join(lines)
+    _, writer = await connect(tcpserver)
+
+    start = time.perf_counter()
+    if decode_only:
+        for line in lines:
+            json.loads(line)
+    else:
+        tcpserver.expect_message({"op": "tick", "seq": int, "topic": ANY}, count=MESSAGES)
+        writer.write(data)
+        await tcpserver.join()
+    elapsed = time.perf_counter() - start
+
+    await disconnect(writer)
+    benchmark_results.record_throughput(
+        "expect_message_throughput", elapsed, len(data), MESSAGES, decode_only=decode_only
+    )
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("ordered", [True, False])
+async def test_unordered_frames_throughput(benchmark_results, tcpserver, ordered):
+    # Requests sent in a random order and matched by `expect_frames_unordered`, against
+    # the same requests in order, each with its own `expect_frame`
+    payloads = [f"GET /item/{index}".encode() for index in range(MESSAGES)]
+    sent = payloads if ordered else random.Random(0).sample(payloads, len(payloads))
+    _, writer = await connect(tcpserver)
+
+    start = time.perf_counter()
+    if ordered:
+        for payload in payloads:
+            tcpserver.expect_frame(payload)
+    else:
+        tcpserver.expect_frames_unordered(payloads)
+    for payload in sent:
+        write_frame(writer, payload)
+    await tcpserver.join()
+    elapsed = time.perf_counter() - start
+
+    await disconnect(writer)
+    size = sum(len(payload) + 4 for payload in payloads)
+    benchmark_results.record_throughput(
+        "unordered_frames_throughput", elapsed, size, MESSAGES, ordered=ordered
+    )
+
+
+@pytest.mark.asyncio()
+async def test_on_frame_throughput(benchmark_results, tcpserver):
+    # Pipelined requests answered by a handler, with no expectation per request
+    tcpserver.on_frame(b"ping", lambda payload: b"pong")
+    reader, writer = await connect(tcpserver)
+
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        write_frame(writer, b"ping")
+    for _ in range(MESSAGES):
+        assert await read_frame(reader) == b"pong"
+    elapsed = time.perf_counter() - start
+
+    await disconnect(writer)
+    benchmark_results.record_throughput(
+        "on_frame_throughput", elapsed, 16 * MESSAGES, 2 * MESSAGES
+    )
+
+
+@pytest.mark.asyncio()
+async def test_expect_disconnect_chain(benchmark_results, unused_tcp_port_factory, mocker):
+    samples = []
+    for _ in range(ITERATIONS):
+        factory = MockTcpServerFactory(unused_tcp_port_factory, mocker)
+        server = await factory()
+        _, writer = await connect(server)
+
+        start = time.perf_counter()
+        server.expect_disconnect()
+        await disconnect(writer)
+        await server.join()
+        samples.append(time.perf_counter() - start)
+
+        await server.stop()
+        mocker.stopall()
+    benchmark_results.record("expect_disconnect_chain", samples)
@@ -0,0 +1,90 @@
+import asyncio
+import time
+import zlib
+
+import pytest
+
+CHUNK = b"x" * 64 * 1024
+CHUNKS = 256
+
+
+async def write_all(writer):
+    for _ in range(CHUNKS):
+        writer.write(CHUNK)
+        await writer.drain()
+
+
+@pytest.mark.asyncio()
+async def test_client_respects_drain(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.pause_reading()
+    tcpserver.expect_client_paused(timeout=5)
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    client = asyncio.create_task(write_all(writer))
+    await tcpserver.join()
+
+    # The client is waiting in `drain` rather than filling its write buffer
+    [paused] = tcpserver.flow_control_transitions
+    assert paused.paused
+    await asyncio.sleep(0.05)
+    assert not client.done()
+    assert writer.transport.get_write_buffer_size() < 2 * paused.buffer_size
+
+    tcpserver.resume_reading()
+    tcpserver.expect_client_resumed(timeout=5)
+    tcpserver.expect_bytes_digest(
+        len(CHUNK) * CHUNKS, digest=f"{zlib.crc32(CHUNK * CHUNKS):08x}", algorithm="crc32"
+    )
+    await client
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_throttle_reading(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.throttle_reading(4 * 1024 * 1024)
+    tcpserver.expect_bytes(CHUNK * 16)
+
+    start = time.monotonic()
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(CHUNK * 16)
+    await tcpserver.join()
+    assert time.monotonic() - start >= 0.2
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_client_not_paused(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_client_paused(timeout=0.1)
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_client_paused_instead_of_resumed(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.pause_reading()
+    tcpserver.expect_client_resumed(timeout=5)
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    client = asyncio.create_task(write_all(writer))
+    try:
+        await tcpserver.join()
+    finally:
+        client.cancel()
+        writer.close()
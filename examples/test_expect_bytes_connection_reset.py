@@ -0,0 +1,27 @@
+import asyncio
+import socket
+import struct
+
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_expect_bytes_connection_reset(tcpserver):
+
+    tcpserver.expect_connect()
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    await tcpserver.join()
+
+    tcpserver.expect_bytes(b"A" * 200_000)
+    writer.write(b"A" * 1000)
+    await writer.drain()
+
+    # Closing without lingering resets the connection while the server is reading
+    writer.get_extra_info("socket").setsockopt(
+        socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+    )
+    writer.close()
+    await writer.wait_closed()
+
+    # Neither payload is shown in full in the failure
+    await tcpserver.join()
@@ -0,0 +1,20 @@
+import asyncio
+import pytest
+
+from pytest_tcpclient.streaming import StreamDigest
+
+EXPECTED = StreamDigest.of(b"A" * 10000, chunk_size=1000)
+
+
+@pytest.mark.asyncio()
+async def test_expect_bytes_digest_chunk_mismatch(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_bytes_digest(EXPECTED.length, EXPECTED)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"A" * 3500 + b"B" + b"A" * 6499)
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
@@ -0,0 +1,34 @@
+import asyncio
+import hashlib
+import pytest
+
+from pytest_tcpclient.framing import write_frame
+from pytest_tcpclient.streaming import StreamDigest
+
+UPLOAD = bytes(range(256)) * 4096
+
+# In a real test suite these would be calculated once and pasted into the test
+UPLOAD_SHA256 = hashlib.sha256(UPLOAD).hexdigest()
+UPLOAD_CRC32_CHUNKS = StreamDigest.of(UPLOAD, algorithm="crc32", chunk_size=65536)
+
+
+@pytest.mark.asyncio()
+async def test_expect_digest_success(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_bytes_digest(len(UPLOAD), UPLOAD_SHA256)
+    tcpserver.expect_frame_digest(
+        len(UPLOAD),
+        algorithm="crc32",
+        chunk_size=UPLOAD_CRC32_CHUNKS.chunk_size,
+        chunk_digests=UPLOAD_CRC32_CHUNKS.chunk_hexdigests,
+    )
+    tcpserver.expect_disconnect()
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(UPLOAD)
+    write_frame(writer, UPLOAD)
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
@@ -0,0 +1,15 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_expect_frame_digest_connection_closed(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_frame_digest(1000, "0" * 64)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
@@ -0,0 +1,13 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_expect_frame_digest_times_out(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_frame_digest(1000, "0" * 64, timeout=0.1)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    await tcpserver.join()
@@ -0,0 +1,18 @@
+import asyncio
+import pytest
+
+from pytest_tcpclient.framing import write_frame
+
+
+@pytest.mark.asyncio()
+async def test_expect_frame_digest_wrong_length(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_frame_digest(1000, "0" * 64)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    write_frame(writer, b"X" * 999)
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
@@ -0,0 +1,95 @@
+import asyncio
+import random
+
+import pytest
+
+from pytest_tcpclient.framing import read_frame, write_frame
+
+
+@pytest.mark.asyncio()
+async def test_expect_frames_unordered(tcpserver):
+
+    requests = [f"GET /item/{index}".encode() for index in range(64)] + [b"PING"] * 3
+
+    tcpserver.expect_connect()
+    tcpserver.expect_frames_unordered(requests)
+    tcpserver.send_frame(b"DONE")
+    tcpserver.expect_any_of([b"BYE", b"QUIT"])
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    shuffled = random.sample(requests, len(requests))
+    for request in shuffled:
+        write_frame(writer, request)
+    assert await read_frame(reader) == b"DONE"
+    write_frame(writer, b"QUIT")
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_expect_frames_unordered_unexpected_frame(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_frames_unordered([b"a", b"b", b"c"])
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    for payload in [b"c", b"a", b"a"]:
+        write_frame(writer, payload)
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_frames_unordered_times_out(tcpserver):
+
+    requests = [f"GET /item/{index}".encode() for index in range(20)] + [b"PING"] * 3
+
+    tcpserver.expect_connect()
+    tcpserver.expect_frames_unordered(requests, timeout=0.1)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    for request in requests[10:19]:
+        write_frame(writer, request)
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_any_of_wrong_frame(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_any_of([b"QUIT", b"BYE"])
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    write_frame(writer, b"EXIT")
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_frames_unordered_frame_not_expected(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_frames_unordered([b"a", b"b"])
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    write_frame(writer, b"z")
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_frames_unordered_connection_closed(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_frames_unordered([b"a", b"b"])
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    write_frame(writer, b"b")
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import re
+from unittest.mock import ANY
+
+import pytest
+
+from pytest_tcpclient.framing import write_frame
+
+
+@pytest.mark.asyncio()
+async def test_expect_message_json_lines(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_message({"op": "subscribe", "topic": ANY, "id": int})
+    tcpserver.expect_message({"op": "publish", "tags": [ANY, re.compile(r"v\d+")]})
+    tcpserver.expect_message({"op": "ping"}, count=1000)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    # Extra keys are ignored
+    writer.write(b'{"op": "subscribe", "topic": "news", "id": 7, "ts": 1697536800}\n')
+    writer.write(b'{"op": "publish", "tags": ["sports", "v2"]}\n')
+    writer.write(b'{"op": "ping"}\n' * 1000)
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_expect_message_json_frames(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_message([1, ANY, {"ok": True}], message_format="json-frames")
+    tcpserver.expect_message(b"raw", message_format="frames")
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    write_frame(writer, json.dumps([1, "two", {"ok": True}]).encode())
+    write_frame(writer, b"raw")
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_expect_message_mismatch(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_message({"op": "subscribe", "topic": ANY}, count=3)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b'{"op": "subscribe", "topic": "news"}\n')
+    writer.write(b'{"op": "subscribe", "topic": "sports"}\n')
+    writer.write(b'{"op": "unsubscribe", "topic": "news"}\n')
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_message_missing_key(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_message({"op": "subscribe", "args": {"topic": ANY}})
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b'{"op": "subscribe", "args": {}}\n')
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_message_not_decodable(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_message({"op": "subscribe"})
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b'{"op": subscribe}\n')
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_message_times_out(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_message({"op": "subscribe"}, timeout=0.1)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b'{"op": "subscribe"}')
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_message_connection_closed(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_message({"op": "subscribe"}, count=2)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b'{"op": "subscribe"}\n{"op": ')
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_message_missing_expect_connect(tcpserver):
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    tcpserver.expect_message({"op": "subscribe"})
+    writer.write(b'{"op": "subscribe"}\n')
+
+    await tcpserver.join()
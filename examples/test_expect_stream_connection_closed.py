@@ -0,0 +1,16 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_expect_stream_connection_closed(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_stream(b"Hello" * 1000, chunk_size=1000)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Hello" * 300)
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
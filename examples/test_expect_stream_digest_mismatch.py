@@ -0,0 +1,19 @@
+import asyncio
+import hashlib
+import pytest
+
+from pytest_tcpclient.streaming import StreamDigest
+
+
+@pytest.mark.asyncio()
+async def test_expect_stream_digest_mismatch(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_stream(StreamDigest(5, hashlib.md5(b"Hello").hexdigest(), "md5"))
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Howdy")
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
@@ -0,0 +1,16 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_expect_stream_mismatch(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_stream([b"A" * 1000, b"B" * 1000], chunk_size=250)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"A" * 1000 + b"B" * 500 + b"C" * 500)
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
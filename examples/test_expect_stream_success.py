@@ -0,0 +1,35 @@
+import asyncio
+import hashlib
+import pytest
+
+from pytest_tcpclient.streaming import StreamDigest
+
+
+def generate_chunks():
+    for index in range(100):
+        yield bytes([index]) * 1000
+
+
+@pytest.mark.asyncio()
+async def test_expect_stream_success(tcpserver, tmp_path):
+
+    path = tmp_path / "upload.bin"
+    path.write_bytes(b"From a file" * 10000)
+    digest = hashlib.sha256(b"Digested" * 10000).hexdigest()
+
+    # The expected data is compared as it arrives, chunk by chunk
+    tcpserver.expect_connect()
+    tcpserver.expect_stream(generate_chunks(), chunk_size=4096)
+    tcpserver.expect_stream(path)
+    tcpserver.expect_stream(StreamDigest(80000, digest), chunk_size=1000)
+    tcpserver.expect_disconnect()
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    for chunk in generate_chunks():
+        writer.write(chunk)
+    writer.write(b"From a file" * 10000)
+    writer.write(b"Digested" * 10000)
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
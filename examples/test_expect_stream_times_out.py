@@ -0,0 +1,14 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_expect_stream_times_out(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_stream(b"Hello" * 1000, chunk_size=1000, timeout=0.1)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Hello" * 300)
+
+    await tcpserver.join()
@@ -0,0 +1,24 @@
+import asyncio
+import pytest
+
+from pytest_tcpclient.framing import read_frame, write_frame
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("codec", ["u16le", "u64be", "varint"])
+async def test_frame_codec(tcpserver_factory, codec):
+
+    # `expect_frame` and `send_frame` use the server's codec
+    server = await tcpserver_factory(codec=codec)
+    server.expect_connect()
+    server.expect_frame(b"Hello, server!")
+    server.send_frame(b"Hello, client!" * 20)
+    server.expect_disconnect()
+
+    reader, writer = await asyncio.open_connection(None, server.service_port)
+    write_frame(writer, b"Hello, server!", codec=codec)
+    assert await read_frame(reader, codec=codec) == b"Hello, client!" * 20
+    writer.close()
+    await writer.wait_closed()
+
+    await server.join()
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import re
+from unittest.mock import ANY
+
+import pytest
+
+from pytest_tcpclient.framing import read_frame, write_frame
+
+
+@pytest.mark.asyncio()
+async def test_on_frame(tcpserver):
+
+    def get(payload):
+        request = json.loads(payload)
+        return json.dumps({"id": request["id"], "value": request["key"].upper()}).encode()
+
+    tcpserver.on_frame(re.compile(rb'\{"op": "get".*'), get)
+    tcpserver.expect_connect()
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    # Pipelined requests
+    for id in range(1000):
+        write_frame(writer, json.dumps({"op": "get", "id": id, "key": f"k{id}"}).encode())
+    for id in range(1000):
+        assert json.loads(await read_frame(reader)) == {"id": id, "value": f"K{id}"}
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_handlers_alongside_expectations(tcpserver):
+
+    async def slow_echo(message):
+        await asyncio.sleep(float(message.split()[1]))
+        return message + b"\n"
+
+    # Heartbeats are answered whenever they arrive. Everything else is for the script.
+    tcpserver.on_bytes(b"PING", lambda message: b"PONG\n")
+    tcpserver.on_bytes(lambda message: message.startswith(b"ECHO "), slow_echo)
+    tcpserver.expect_connect()
+    tcpserver.expect_bytes(b"LOGIN alice\n")
+    tcpserver.send_bytes(b"OK\n")
+    tcpserver.expect_message({"op": "quit"})
+    tcpserver.expect_disconnect()
+
+    reader, writer = await tcpserver.open_connection()
+    writer.write(b"PING\nECHO 0.2\nECHO 0.1\nLOGIN alice\nPING\n")
+    replies = [await reader.readline() for _ in range(5)]
+    # The script's reply and the synchronous replies come first
+    assert sorted(replies[:3]) == [b"OK\n", b"PONG\n", b"PONG\n"]
+    # The asynchronous handlers reply in the order in which they finish
+    assert replies[3:] == [b"ECHO 0.1\n", b"ECHO 0.2\n"]
+    writer.write(b'{"op": "quit"}\n')
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_handler_added_after_connecting(tcpserver):
+
+    tcpserver.expect_connect()
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    await tcpserver.join()
+
+    tcpserver.on_frame(ANY, lambda payload: payload[::-1])
+    write_frame(writer, b"Hello")
+    assert await read_frame(reader) == b"olleH"
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_handler_fails(tcpserver):
+
+    def fail(payload):
+        raise ValueError("no such key")
+
+    tcpserver.on_frame(ANY, fail)
+    tcpserver.expect_connect()
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    write_frame(writer, b"GET missing")
+    # Let the handler run
+    await asyncio.sleep(0.1)
+
+    await tcpserver.join()
@@ -0,0 +1,18 @@
+import asyncio
+import pytest
+
+from pytest_tcpclient.framing import write_frame
+
+
+@pytest.mark.asyncio()
+async def test_large_frame_mismatch(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_frame(b"Hello, world!" * 100)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    write_frame(writer, b"")
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
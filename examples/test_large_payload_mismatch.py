@@ -0,0 +1,21 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_large_payload_mismatch(tcpserver):
+
+    expected = b"A" * 1000 + b"B" * 1000
+    actual = b"A" * 1000 + b"C" * 1000
+
+    tcpserver.expect_connect()
+    tcpserver.expect_bytes(expected)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(actual)
+    writer.close()
+    await writer.wait_closed()
+
+    # Only the first 16 bytes (see `tcpserver_bytes_repr_limit` in the ini file) of
+    # each payload are shown, followed by a hexdump around the first difference.
+    await tcpserver.join()
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_reply_within_bound(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.send_frame(b"ping")
+    # The client must reply within 100ms of the server sending "ping"
+    tcpserver.expect_frame(b"pong", within=0.1)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    assert await reader.readexactly(8) == b"\x00\x00\x00\x04ping"
+    writer.write(b"\x00\x00\x00\x04pong")
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_reconnect_within_bound(tcpserver_factory):
+
+    server = await tcpserver_factory(connections=2)
+    first, second = server.connections
+    first.expect_connect()
+    first.disconnect()
+    # Measured from the server disconnecting the first connection
+    second.expect_connect(within=0.2)
+    second.expect_bytes(b"again", within=0.1)
+
+    reader, writer = await asyncio.open_connection(None, server.service_port)
+    assert await reader.read() == b""
+    writer.close()
+    await writer.wait_closed()
+
+    reader, writer = await asyncio.open_connection(None, server.service_port)
+    writer.write(b"again")
+    await server.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_reply_too_slow(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.send_bytes(b"ping")
+    tcpserver.expect_bytes(b"pong", within=0.01)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    assert await reader.readexactly(4) == b"ping"
+    await asyncio.sleep(0.05)
+    writer.write(b"pong")
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_reconnect_too_slow(tcpserver_factory):
+
+    server = await tcpserver_factory(connections=2)
+    first, second = server.connections
+    first.expect_connect()
+    first.disconnect()
+    second.expect_connect(within=0.01)
+
+    reader, writer = await asyncio.open_connection(None, server.service_port)
+    assert await reader.read() == b""
+    writer.close()
+    await writer.wait_closed()
+
+    await asyncio.sleep(0.05)
+    reader, writer = await asyncio.open_connection(None, server.service_port)
+    await server.join()
+
+
+@pytest.mark.asyncio()
+async def test_frame_reply_too_slow(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.send_frame(b"ping")
+    tcpserver.expect_frame(b"pong", within=0.01)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    assert await reader.readexactly(8) == b"\x00\x00\x00\x04ping"
+    await asyncio.sleep(0.05)
+    writer.write(b"\x00\x00\x00\x04pong")
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_connect_too_slow(tcpserver):
+
+    # With no event before it, measured from when the expectation started waiting
+    tcpserver.expect_connect(within=0.01)
+
+    await asyncio.sleep(0.05)
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    await tcpserver.join()
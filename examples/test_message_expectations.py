@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_message_expectations(tcpserver):
+
+    tcpserver.expect_connect()
+    greeting = tcpserver.expect_prefix(b"HELLO ")
+    command = tcpserver.expect_regex(rb"SET session:([0-9a-f]+) (\d+) EX 60")
+    headers = tcpserver.expect_until(b"\r\n\r\n")
+    tcpserver.send_bytes(b"+OK\r\n")
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"HELLO client-1697\r\n")
+    # Split across writes so that the message arrives in pieces
+    writer.write(b"SET session:8f3a")
+    await writer.drain()
+    writer.write(b" 1697 EX 60\r\n")
+    writer.write(b"Host: example.com\r\nDate: Tue, 17 Oct 2023 10:00:00 GMT\r\n\r\n")
+
+    assert await reader.readline() == b"+OK\r\n"
+    await tcpserver.join()
+
+    assert greeting.data == b"HELLO client-1697\r\n"
+    assert command.match.group(1) == b"8f3a"
+    assert command.match.group(2) == b"1697"
+    assert headers.data.endswith(b"GMT\r\n\r\n")
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_expect_until_large_message(tcpserver):
+
+    tcpserver.expect_connect()
+    line = tcpserver.expect_until(b"\n")
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    # Much longer than the server's stream reader limit
+    writer.write(b"x" * 4 * 1024 * 1024 + b"\n")
+    await tcpserver.join()
+
+    assert len(line.data) == 4 * 1024 * 1024 + 1
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_expect_regex_mismatch(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_regex(rb"GET /\S* HTTP/1\.1")
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"POST /login HTTP/1.1\r\n")
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_prefix_mismatch(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_prefix(b"+OK", timeout=10)
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    # Fails as soon as the first byte arrives rather than waiting for the delimiter
+    writer.write(b"-ERR unknown")
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_until_connection_closed(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_until(b"\r\n\r\n")
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Host: example.com\r\n")
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_until_times_out(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_until(b"\n", timeout=0.1)
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"no newline")
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_regex_without_expect_connect(tcpserver):
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    tcpserver.expect_regex(rb"PING \d+")
+    writer.write(b"PING 1\r\n")
+
+    await tcpserver.join()
@@ -0,0 +1,25 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_multiple_connections(tcpserver_factory):
+
+    # Each connection has its own script. They are evaluated concurrently.
+    server = await tcpserver_factory(connections=50)
+    for connection in server.connections:
+        connection.expect_connect()
+        connection.expect_bytes(b"Hello")
+        connection.send_bytes(b"World")
+        connection.expect_disconnect()
+
+    async def client():
+        reader, writer = await asyncio.open_connection(None, server.service_port)
+        writer.write(b"Hello")
+        assert await reader.readexactly(5) == b"World"
+        writer.close()
+        await writer.wait_closed()
+
+    await asyncio.gather(*(client() for _ in range(50)))
+
+    await server.join()
@@ -0,0 +1,18 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_multiple_connections_too_many(tcpserver_factory):
+
+    server = await tcpserver_factory(connections=2)
+    for connection in server.connections:
+        connection.expect_connect()
+
+    writers = []
+    for _ in range(3):
+        _, writer = await asyncio.open_connection(None, server.service_port)
+        writers.append(writer)
+
+    await asyncio.sleep(0.1)
+    await server.join()
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+
+from pytest_tcpclient.recording import Recording
+
+
+async def client(port):
+    reader, writer = await asyncio.open_connection(None, port)
+    writer.write(b"Hello, ")
+    writer.write(b"server!")
+    greeting = await reader.readexactly(14)
+    writer.write(b"Goodbye")
+    writer.close()
+    await writer.wait_closed()
+    return greeting
+
+
+@pytest.mark.asyncio()
+async def test_record_and_replay(tcpserver_factory, unused_tcp_port, tmp_path):
+
+    # A stand-in for the real server
+    async def handle(reader, writer):
+        await reader.readexactly(14)
+        writer.write(b"Hello, client!")
+        await reader.readexactly(7)
+        writer.close()
+
+    real_server = await asyncio.start_server(handle, port=unused_tcp_port)
+    recorder = tcpserver_factory.record(unused_tcp_port, tmp_path / "session.rec")
+    assert await client(unused_tcp_port) == b"Hello, client!"
+    recorder.close()
+    real_server.close()
+    await real_server.wait_closed()
+
+    # Replay the recording without the real server
+    with Recording(tmp_path / "session.rec") as recording:
+        tcpserver = await tcpserver_factory()
+        tcpserver.expect_connect()
+        tcpserver.run_script(recording.to_script())
+        assert await client(tcpserver.service_port) == b"Hello, client!"
+        await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_record_first_connection_only(tcpserver_factory, unused_tcp_port, tmp_path):
+
+    async def echo(reader, writer):
+        writer.write(await reader.readexactly(4))
+        writer.close()
+
+    real_server = await asyncio.start_server(echo, port=unused_tcp_port)
+    recorder = tcpserver_factory.record(unused_tcp_port, tmp_path / "session.rec")
+    for request in [b"ping", b"pong"]:
+        reader, writer = await asyncio.open_connection(None, unused_tcp_port)
+        writer.writelines([request[:2], request[2:]])
+        assert await reader.readexactly(4) == request
+        writer.close()
+        await writer.wait_closed()
+    recorder.close()
+    real_server.close()
+    await real_server.wait_closed()
+
+    with Recording(tmp_path / "session.rec") as recording:
+        assert [bytes(chunk.data) for chunk in recording.chunks] == [b"ping", b"ping"]
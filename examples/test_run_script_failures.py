@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+
+from pytest_tcpclient.framing import frame_parts
+
+
+@pytest.mark.asyncio()
+async def test_run_script_frame_incomplete(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.run_script([("expect_frame", b"Hello, server!")])
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    # The client closes the connection part way through the frame
+    writer.write(b"".join(frame_parts(b"Hello, server!"))[:9])
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_run_script_bytes_incomplete(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.run_script([("expect_bytes", b"Hello, server!")])
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Hello")
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_run_script_bytes_timeout(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.run_script([("expect_bytes", b"Hello, server!", 0.05)])
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_run_script_frame_timeout(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.run_script([("expect_frame", b"Hello, server!", 0.05)])
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
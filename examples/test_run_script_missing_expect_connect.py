@@ -0,0 +1,13 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_run_script_missing_expect_connect(tcpserver):
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    tcpserver.run_script([("expect_bytes", b"Hello")])
+    writer.write(b"Hello")
+
+    await tcpserver.join()
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+
+from pytest_tcpclient.framing import read_frame, write_frame
+from pytest_tcpclient.script import Script
+
+# Built and compiled once, then run by every test that uses it
+GREETING = (
+    Script()
+    .expect_bytes(b"Hello, ")
+    .expect_bytes(b"server!")
+    .send_bytes(b"Hello, ")
+    .send_bytes(b"client!")
+    .expect_frame(b"How are you?")
+    .send_frame(b"Very well")
+)
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("attempt", range(3))
+async def test_run_script_success(tcpserver, attempt):
+
+    tcpserver.expect_connect()
+    tcpserver.run_script(GREETING)
+    tcpserver.expect_disconnect()
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Hello, server!")
+    assert await reader.readexactly(14) == b"Hello, client!"
+    write_frame(writer, b"How are you?")
+    assert await read_frame(reader) == b"Very well"
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_run_script_list(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.run_script([
+        ("expect_bytes", b"ping", 2),
+        ("send_bytes", b"pong"),
+    ])
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"ping")
+    assert await reader.readexactly(4) == b"pong"
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
@@ -0,0 +1,20 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_run_script_wrong_bytes_sent(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.run_script([
+        ("expect_bytes", b"Hello, "),
+        ("expect_bytes", b"server!"),
+        ("send_bytes", b"Hello, client!"),
+    ])
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Hello, world!!")
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
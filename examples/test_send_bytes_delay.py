@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from pytest_tcpclient.script import Script
+
+
+@pytest.mark.asyncio()
+async def test_send_bytes_delay(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.send_bytes(b"Hello", delay=0.2)
+    tcpserver.send_frame(b"World", delay=0.1)
+
+    # The delays are slept on the event loop's clock so that is what they're measured
+    # with. Only the lower bounds are exact. A busy machine can make them later.
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    assert await reader.readexactly(5) == b"Hello"
+    assert 0.2 <= loop.time() - start < 2
+    assert await reader.readexactly(9) == b"\x00\x00\x00\x05World"
+    assert 0.3 <= loop.time() - start < 2
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_run_script_send_delay(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.run_script(Script().send_bytes(b"Hello", delay=0.1))
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    assert await reader.readexactly(5) == b"Hello"
+    assert 0.1 <= loop.time() - start < 2
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
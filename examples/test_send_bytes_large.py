@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+
+from pytest_tcpclient.framing import read_frame
+
+
+@pytest.mark.asyncio()
+async def test_send_bytes_large(tcpserver):
+
+    tcpserver.expect_connect()
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    # Much more than the transport buffers before pausing. `join` still returns
+    # before the client reads the data.
+    tcpserver.send_bytes(b"x" * 4 * 1024 * 1024)
+    await tcpserver.join()
+
+    assert len(await reader.readexactly(4 * 1024 * 1024)) == 4 * 1024 * 1024
+
+    # The next action waits for the send to be drained
+    tcpserver.expect_bytes(b"Done")
+    writer.write(b"Done")
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_send_bytes_large_last_action(tcpserver):
+
+    tcpserver.expect_connect()
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    tcpserver.send_bytes(b"x" * 4 * 1024 * 1024)
+    await tcpserver.join()
+
+    assert len(await reader.readexactly(4 * 1024 * 1024)) == 4 * 1024 * 1024
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_send_frame_large(tcpserver):
+
+    tcpserver.expect_connect()
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    tcpserver.send_frame(b"x" * 4 * 1024 * 1024)
+    await tcpserver.join()
+
+    assert len(await read_frame(reader)) == 4 * 1024 * 1024
+
+    writer.close()
+    await writer.wait_closed()
@@ -0,0 +1,24 @@
+import asyncio
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_send_bytes_large_unread(tcpserver_factory):
+
+    server = await tcpserver_factory(connections=2)
+    server.connections[0].expect_connect()
+    server.connections[0].send_bytes(b"x" * 4 * 1024 * 1024)
+    server.connections[1].expect_connect()
+    server.connections[1].expect_bytes(b"Hello")
+
+    # The first client never reads what is sent to it
+    _, writer_1 = await asyncio.open_connection(None, server.service_port)
+    writer_1.close()
+    await writer_1.wait_closed()
+
+    _, writer_2 = await asyncio.open_connection(None, server.service_port)
+    writer_2.write(b"Howdy")
+    writer_2.close()
+    await writer_2.wait_closed()
+
+    await server.join()
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from pytest_tcpclient.shaping import SendShaping
+
+
+@pytest.mark.asyncio()
+async def test_one_byte_at_a_time(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.shape(chunk_size=1, chunk_delay=0.01)
+    tcpserver.send_bytes(b"Hello")
+    # Back to sending as fast as possible
+    tcpserver.shape()
+    tcpserver.send_bytes(b"World")
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    chunks = [await reader.read(100) for _ in range(4)]
+    assert chunks == [b"H", b"e", b"l", b"l"]
+    # "World" follows "o" immediately
+    assert await reader.readexactly(6) == b"oWorld"
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_bandwidth(tcpserver):
+
+    tcpserver.expect_connect()
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    await tcpserver.join()
+
+    # 20000 bytes at 100000 bytes/s, less the initial burst of 1000 bytes
+    tcpserver.shape(bandwidth=100000)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tcpserver.send_bytes(b"x" * 10000)
+    tcpserver.send_bytes(b"x" * 10000)
+    assert len(await reader.readexactly(20000)) == 20000
+    assert 0.15 <= loop.time() - start < 2
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_shaped_frames(tcpserver_factory):
+
+    server = await tcpserver_factory(shaping=SendShaping(chunk_size=3, chunk_delay=0.01))
+    server.expect_connect()
+    server.send_frame(b"Hi")
+
+    reader, writer = await asyncio.open_connection(None, server.service_port)
+    assert await reader.read(100) == b"\x00\x00\x00"
+    assert await reader.read(100) == b"\x02Hi"
+
+    await server.join()
+
+    writer.close()
+    await writer.wait_closed()
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_serve_repeated(tcpserver):
+
+    tcpserver.expect_connect()
+    report = tcpserver.serve_repeated(b"PING\n", b"PONG\n", 1000)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    for _ in range(1000):
+        writer.write(b"PING\n")
+        assert await reader.readline() == b"PONG\n"
+
+    await tcpserver.join()
+
+    # The first request has no response before it to be timed from
+    assert len(report) == 999
+    assert report.p50 <= report.p90 <= report.p99 <= report.max < 0.5
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_serve_repeated_wrong_request(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.serve_repeated(b"PING\n", b"PONG\n", 10)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    for _ in range(2):
+        writer.write(b"PING\n")
+        assert await reader.readline() == b"PONG\n"
+    writer.write(b"PONG\n")
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_serve_repeated_timeout(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.serve_repeated(b"PING\n", b"PONG\n", 10, timeout=0.05)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"PING\n")
+    assert await reader.readline() == b"PONG\n"
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_serve_repeated_closed(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.serve_repeated(b"PING\n", b"PONG\n", 10)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"PING\n")
+    assert await reader.readline() == b"PONG\n"
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_serve_repeated_missing_expect_connect(tcpserver):
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    tcpserver.serve_repeated(b"PING\n", b"PONG\n", 10)
+    writer.write(b"PING\n")
+
+    await tcpserver.join()
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+
+@pytest.mark.asyncio()
+async def test_stats(tcpserver):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_bytes(b"Hello")
+    tcpserver.send_bytes(b"World")
+    tcpserver.expect_frame(b"ping")
+    tcpserver.send_frame(b"pong")
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Hello")
+    assert await reader.readexactly(5) == b"World"
+    writer.write(b"\x00\x00\x00\x04ping")
+    assert await reader.readexactly(8) == b"\x00\x00\x00\x04pong"
+
+    await tcpserver.join()
+
+    stats = tcpserver.stats
+    assert stats.bytes_sent == 13
+    assert stats.frames_sent == 1
+    assert stats.bytes_received == 13
+    assert stats.frames_received == 1
+    assert stats.client_reads == 2
+    assert stats.client_bytes_read == 13
+    assert stats.time_to_first_byte >= 0
+    assert [name for name, _ in stats.expectation_durations] == [
+        "ExpectConnect", "ExpectBytes", "SendBytes", "ExpectFrame", "SendFrame",
+    ]
+
+    writer.close()
+    await writer.wait_closed()
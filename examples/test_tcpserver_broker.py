@@ -0,0 +1,30 @@
+import asyncio
+import os
+
+import pytest
+
+
+# Run with `tcpserver_broker = true` in the `pytest` ini file and `-n 2`
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("index", range(8))
+async def test_exchange(tcpserver, index):
+
+    tcpserver.expect_connect()
+    tcpserver.expect_bytes(b"Hello, server!")
+    tcpserver.send_bytes(b"Hello, client!")
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Hello, server!")
+    assert await reader.readexactly(14) == b"Hello, client!"
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+def test_worker_uses_broker(tcpserver_broker_pool):
+    assert os.environ.get("PYTEST_XDIST_WORKER")
+    assert type(tcpserver_broker_pool).__name__ == "BrokeredPool"
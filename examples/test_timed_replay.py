@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from pytest_tcpclient.recording import (
+    MAGIC, RECORD_HEADER, SENT_BY_CLIENT, SENT_BY_SERVER, Recording
+)
+
+
+def write_recording(path, *chunks):
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for direction, timestamp, data in chunks:
+            f.write(RECORD_HEADER.pack(direction, timestamp, len(data)))
+            f.write(data)
+
+
+@pytest.mark.asyncio()
+async def test_timed_replay(tcpserver, tmp_path):
+
+    # The client asks, the server answers after 2s and sends a heartbeat after 4s
+    write_recording(
+        tmp_path / "session.rec",
+        (SENT_BY_CLIENT, 0.0, b"Hello"),
+        (SENT_BY_SERVER, 2.0, b"Hi"),
+        (SENT_BY_SERVER, 4.0, b"<3"),
+    )
+
+    # Replay at a tenth of real time
+    with Recording(tmp_path / "session.rec") as recording:
+        script = recording.to_script(time_scale=0.1)
+
+    tcpserver.expect_connect()
+    tcpserver.run_script(script)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    # The intervals are measured from when the server receives the request
+    await asyncio.sleep(0.1)
+    # Measured on the event loop's clock, which the replay is timed with. Only the lower
+    # bounds are exact. A busy machine can make the sends later.
+    loop = asyncio.get_running_loop()
+    writer.write(b"Hello")
+    start = loop.time()
+    assert await reader.readexactly(2) == b"Hi"
+    assert 0.2 <= loop.time() - start < 2
+    assert await reader.readexactly(2) == b"<3"
+    assert 0.4 <= loop.time() - start < 2
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
@@ -0,0 +1,23 @@
+import asyncio
+import pytest
+
+from pytest_tcpclient.framing import write_frame
+
+
+@pytest.mark.asyncio()
+async def test_timeout_none(tcpserver):
+
+    # As with `asyncio.wait_for`, a timeout of `None` waits for as long as it takes
+    tcpserver.expect_connect(timeout=None)
+    tcpserver.expect_bytes(b"Hello", timeout=None)
+    tcpserver.expect_frame(b"Goodbye", timeout=None)
+
+    await asyncio.sleep(0.1)
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"Hello")
+    write_frame(writer, b"Goodbye")
+
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
@@ -0,0 +1,130 @@
+import asyncio
+import os
+
+import pytest
+
+
+@pytest.fixture(params=["unix", "socketpair"])
+def transport(request):
+    return request.param
+
+
+@pytest.mark.asyncio()
+async def test_conversation(tcpserver_factory, transport):
+
+    server = await tcpserver_factory(transport=transport)
+    assert server.service_port is None
+    server.expect_connect()
+    server.expect_bytes(b"Hello")
+    server.send_bytes(b"World")
+
+    reader, writer = await server.open_connection()
+    writer.write(b"Hello")
+    assert await reader.readexactly(5) == b"World"
+
+    await server.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_open_unix_connection(tcpserver_factory):
+
+    server = await tcpserver_factory(transport="unix")
+    server.expect_connect()
+    server.expect_frame(b"Hello")
+
+    reader, writer = await asyncio.open_unix_connection(server.service_path)
+    writer.write(b"\x00\x00\x00\x05Hello")
+
+    await server.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_multiple_connections(tcpserver_factory, transport):
+
+    server = await tcpserver_factory(connections=10, transport=transport)
+    for index, connection in enumerate(server.connections):
+        connection.expect_connect()
+        connection.expect_bytes(b"Hello")
+        connection.send_bytes(b"World %d" % index)
+        connection.expect_disconnect()
+
+    async def client():
+        reader, writer = await server.open_connection()
+        writer.write(b"Hello")
+        reply = await reader.readexactly(7)
+        writer.close()
+        await writer.wait_closed()
+        return reply
+
+    replies = await asyncio.gather(*(client() for _ in range(10)))
+    assert sorted(replies) == [b"World %d" % index for index in range(10)]
+
+    await server.join()
+
+
+@pytest.mark.asyncio()
+async def test_sent_data_not_read(tcpserver_factory, transport):
+
+    server = await tcpserver_factory(transport=transport)
+    server.expect_connect()
+    server.send_bytes(b"Hola!")
+
+    reader, writer = await server.open_connection()
+    await server.join()
+
+    server.expect_disconnect()
+    writer.close()
+    await writer.wait_closed()
+
+    await server.join()
+
+
+@pytest.mark.asyncio()
+async def test_other_unix_socket_not_intercepted(tcpserver_factory, tmp_path):
+
+    async def echo(reader, writer):
+        writer.write(await reader.readexactly(5))
+        await writer.drain()
+        writer.close()
+
+    path = str(tmp_path / "other")
+    other = await asyncio.start_unix_server(echo, path)
+    async with other:
+        server = await tcpserver_factory(transport="unix")
+        server.expect_connect()
+        server.expect_bytes(b"Hello")
+
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(b"Hello")
+        assert await reader.readexactly(5) == b"Hello"
+        writer.close()
+        await writer.wait_closed()
+
+        reader, writer = await server.open_connection()
+        writer.write(b"Hello")
+        await server.join()
+        writer.close()
+        await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_unix_connect_fails(tcpserver_factory):
+
+    server = await tcpserver_factory(transport="unix")
+    os.unlink(server.service_path)
+
+    with pytest.raises(FileNotFoundError):
+        await asyncio.open_unix_connection(server.service_path)
+
+
+@pytest.mark.asyncio()
+async def test_unknown_transport(tcpserver_factory):
+
+    with pytest.raises(ValueError, match="`transport` must be one of"):
+        await tcpserver_factory(transport="udp")
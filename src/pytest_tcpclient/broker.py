@@ -0,0 +1,151 @@
+"""Listening sockets that are bound in one process and handed out to others.
+
+Under `pytest-xdist`, the controller runs a `ListenerBroker` and each worker's
+`tcpserver_broker_pool` gets its listening sockets from it with a `BrokerClient`. The
+sockets are bound to port 0 by the broker, so the kernel picks a free port and no
+worker ever binds a port that another worker might be binding at the same time. A
+socket's descriptor is passed over a Unix socket with `SCM_RIGHTS`.
+"""
+import array
+import logging
+import os
+import socket
+import struct
+import tempfile
+import threading
+
+from collections import deque
+
+ACQUIRE = b"A"
+
+PORT = struct.Struct("<H")
+
+
+def create_listening_socket(backlog=100):
+    # Mimic `asyncio.start_server(port=...)`, which listens on both IPv4 and IPv6
+    # where it can. Port 0 lets the kernel pick a free port, which can't race with
+    # anything else picking a port.
+    if socket.has_dualstack_ipv6():
+        return socket.create_server(
+            ("", 0), family=socket.AF_INET6, dualstack_ipv6=True, backlog=backlog
+        )
+    return socket.create_server(("", 0), backlog=backlog)
+
+
+def is_supported():
+    return hasattr(socket, "AF_UNIX") and hasattr(socket, "SCM_RIGHTS")
+
+
+class ListenerBroker:
+    """Hands out a new listening socket to each acquire request from a `BrokerClient`.
+    `spare` sockets are kept bound ahead of the requests. Requests are served by
+    threads so the broker can run in the `pytest` process that coordinates the
+    workers.
+    """
+
+    def __init__(self, spare=4):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.directory = tempfile.mkdtemp(prefix="tcpserver-broker-")
+        self.path = os.path.join(self.directory, "broker")
+        self.lock = threading.Lock()
+        self.spare_sockets = deque(create_listening_socket() for _ in range(spare))
+        self.clients = []
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen()
+        self.thread = threading.Thread(target=self.accept_clients, daemon=True)
+        self.thread.start()
+
+    def accept_clients(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                # Closed by `close`
+                return
+            with self.lock:
+                self.clients.append(client)
+            threading.Thread(target=self.serve_client, args=(client,), daemon=True).start()
+
+    def serve_client(self, client):
+        with client:
+            while True:
+                try:
+                    request = client.recv(1)
+                except OSError:
+                    return
+                if request != ACQUIRE:
+                    # The worker has finished, or closed its connection on error
+                    return
+                sock = self.take_socket()
+                with sock:
+                    port = sock.getsockname()[1]
+                    self.logger.debug("handing out listening socket on port %s", port)
+                    fds = array.array("i", [sock.fileno()])
+                    try:
+                        client.sendmsg(
+                            [PORT.pack(port)], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)]
+                        )
+                    except OSError:
+                        # Closed, by `close` or by the worker, while the request was
+                        # being served
+                        return
+
+    def take_socket(self):
+        with self.lock:
+            if self.spare_sockets:
+                sock = self.spare_sockets.popleft()
+                self.spare_sockets.append(create_listening_socket())
+                return sock
+        return create_listening_socket()
+
+    def close(self):
+        try:
+            # Closing alone doesn't wake a thread blocked in `accept` on Linux
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            # Closing does wake it on platforms that can't shut down a listening socket
+            pass
+        self.listener.close()
+        self.thread.join()
+        with self.lock:
+            for client in self.clients:
+                try:
+                    # Wake the thread serving the client, as closing alone doesn't
+                    client.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    # The client has already gone
+                    pass
+                client.close()
+            for sock in self.spare_sockets:
+                sock.close()
+            self.spare_sockets.clear()
+        os.unlink(self.path)
+        os.rmdir(self.directory)
+
+
+class BrokerClient:
+    """A worker's connection to a `ListenerBroker`."""
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+
+    def acquire(self):
+        """Return a new listening socket."""
+        self.sock.sendall(ACQUIRE)
+        fd_size = array.array("i").itemsize
+        data, ancillary, _, _ = self.sock.recvmsg(PORT.size, socket.CMSG_SPACE(fd_size))
+        if not data:
+            raise ConnectionError("Listener broker closed the connection")
+        for level, kind, fd_data in ancillary:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds = array.array("i")
+                fds.frombytes(fd_data[:fd_size])
+                return socket.socket(fileno=fds[0])
+        raise ConnectionError(
+            f"Listener broker didn't send a socket for port {PORT.unpack(data)[0]}"
+        )
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,72 @@
+import mmap
+
+
+def is_read_only_mapping(data):
+    """Return `True` if `data` is a read-only view of a memory mapped file, such as a
+    chunk of a recording. It cannot change so there is no need to copy it.
+    """
+    return isinstance(data, memoryview) and data.readonly and isinstance(data.obj, mmap.mmap)
+
+
+class CaptureBuffer:
+    """An append-only record of the bytes that passed through a stream.
+
+    Chunks are kept as a list rather than being concatenated so that appending is
+    amortized O(1). Capturing ``n`` bytes therefore costs O(n) overall instead of the
+    O(n**2) that repeated ``bytes +=`` would cost.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.length = 0
+
+    def append(self, data):
+        if not data:
+            return
+        if not isinstance(data, bytes) and not is_read_only_mapping(data):
+            # `bytearray` and `memoryview` may be modified by the caller after the
+            # write so we have to take a copy.
+            data = bytes(data)
+        self.chunks.append(data)
+        self.length += len(data)
+
+    def clear(self):
+        self.chunks = []
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __bytes__(self):
+        return b"".join(self.chunks)
+
+    def startswith(self, prefix):
+        """Return ``True`` if the bytes in ``prefix``, another ``CaptureBuffer``, are a
+        prefix of the bytes in this buffer. Neither buffer is joined to do this.
+        """
+        if len(prefix) > len(self):
+            return False
+        chunks = iter(self.chunks)
+        current = memoryview(b"")
+        for chunk in prefix.chunks:
+            needed = memoryview(chunk)
+            while needed:
+                if not current:
+                    current = memoryview(next(chunks))
+                n = min(len(current), len(needed))
+                if current[:n] != needed[:n]:
+                    return False
+                current = current[n:]
+                needed = needed[n:]
+        return True
+
+    def tail(self, offset):
+        """Return the bytes from ``offset`` onwards."""
+        remaining = []
+        for chunk in self.chunks:
+            if offset >= len(chunk):
+                offset -= len(chunk)
+                continue
+            remaining.append(chunk[offset:] if offset else chunk)
+            offset = 0
+        return b"".join(remaining)
@@ -2,21 +2,237 @@ import asyncio
 import struct
 
 
-def write_frame(writer, payload: bytes):
-    writer.write(struct.pack(">I", len(payload)))
-    writer.write(payload)
+class LengthPrefixCodec:
+    """Frames whose header is the payload length packed with the `struct` format
+    `fmt`, e.g. `">I"` for a 4-byte big-endian length.
+    """
+
+    def __init__(self, fmt):
+        self.header = struct.Struct(fmt)
+
+    def encode_header(self, length):
+        return self.header.pack(length)
+
+    def decode_header(self, buffer, offset=0):
+        """Return `(length, header_size)` for the header at `offset` in `buffer` or
+        `None` if the header is not complete.
+        """
+        if len(buffer) - offset < self.header.size:
+            return None
+        length, = self.header.unpack_from(buffer, offset)
+        return length, self.header.size
+
+    async def read_header(self, reader):
+        length, = self.header.unpack(await reader.readexactly(self.header.size))
+        return length
+
+
+class VarintCodec:
+    """Frames whose header is the payload length encoded as a protobuf-style
+    (LEB128) unsigned varint.
+    """
+
+    MAX_HEADER_SIZE = 10
+
+    def encode_header(self, length):
+        header = bytearray()
+        while length >= 0x80:
+            header.append((length & 0x7F) | 0x80)
+            length >>= 7
+        header.append(length)
+        return bytes(header)
+
+    def decode_header(self, buffer, offset=0):
+        """Return `(length, header_size)` for the header at `offset` in `buffer` or
+        `None` if the header is not complete.
+        """
+        length = 0
+        shift = 0
+        end = min(len(buffer), offset + self.MAX_HEADER_SIZE)
+        for index in range(offset, end):
+            byte = buffer[index]
+            length |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return length, index + 1 - offset
+            shift += 7
+        if end - offset == self.MAX_HEADER_SIZE:
+            raise ValueError(f"Varint is longer than {self.MAX_HEADER_SIZE} bytes")
+        return None
+
+    async def read_header(self, reader):
+        header = bytearray()
+        while True:
+            # Decode from the bytes that `reader` has already buffered so that a header
+            # that has arrived is consumed in one read rather than a read per byte. Only
+            # when none of it has arrived is a single byte awaited.
+            buffered = getattr(reader, "_buffer", b"")
+            available = bytes(buffered[:self.MAX_HEADER_SIZE - len(header)])
+            decoded = self.decode_header(header + available)
+            if decoded is None:
+                size = max(1, len(available))
+            else:
+                size = decoded[1] - len(header)
+            try:
+                header += await reader.readexactly(size)
+            except asyncio.IncompleteReadError as e:
+                raise asyncio.IncompleteReadError(bytes(header) + e.partial, None)
+            if decoded is not None:
+                return decoded[0]
+
+
+CODECS = {
+    "u16be": LengthPrefixCodec(">H"),
+    "u16le": LengthPrefixCodec("<H"),
+    "u32be": LengthPrefixCodec(">I"),
+    "u32le": LengthPrefixCodec("<I"),
+    "u64be": LengthPrefixCodec(">Q"),
+    "u64le": LengthPrefixCodec("<Q"),
+    "varint": VarintCodec(),
+}
+
+DEFAULT_CODEC = CODECS["u32be"]
+
+
+def register_codec(name, codec):
+    """Make `codec` available by `name` wherever a codec can be given."""
+    CODECS[name] = codec
+
+
+def get_codec(codec):
+    """Return the codec registered as `codec` if it is a name. Otherwise `codec` must
+    itself be a codec, or `None` for the default 4-byte big-endian header.
+    """
+    if codec is None:
+        return DEFAULT_CODEC
+    if isinstance(codec, str):
+        return CODECS[codec]
+    return codec
+
+
+def frame_parts(payload, codec=None):
+    """Return the header and payload of a frame as separate buffers. `payload` can be
+    any bytes-like object. It is not copied. `bytes` are returned as they are, so that
+    a capture can keep them, and anything else as a byte-wise `memoryview`.
+    """
+    if not isinstance(payload, bytes):
+        payload = memoryview(payload).cast("B")
+    return get_codec(codec).encode_header(len(payload)), payload
 
 
-async def read_frame(reader):
+def write_frame(writer, payload, codec=None):
+    """Write a single frame. The header and payload are passed to the transport in
+    one `writelines` call rather than being concatenated first.
+    """
+    writer.writelines(frame_parts(payload, codec))
+
+
+def write_frames(writer, payloads, codec=None):
+    """Write many frames with a single `writelines` call."""
+    codec = get_codec(codec)
+    parts = []
+    for payload in payloads:
+        parts.extend(frame_parts(payload, codec))
+    writer.writelines(parts)
+
+
+class FrameDecoder:
+    """Incrementally decodes frames from chunks of arbitrary size.
+
+    This is "sans-IO": feed it whatever bytes arrived and it returns the payloads of
+    all the frames that are now complete. Payloads are `memoryview` slices of the
+    data that was fed in so they are not copied, which means that the caller must not
+    modify that data afterwards. The only copying is of frames that span chunks and
+    they are accumulated in an internal buffer.
+    """
+
+    def __init__(self, codec=None):
+        self.codec = get_codec(codec)
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        view = memoryview(data).cast("B")
+        payloads = []
+        if self.buffer:
+            view = self.complete_buffered_frame(view, payloads)
+
+        decode_header = self.codec.decode_header
+        offset = 0
+        end_of_data = len(view)
+        while offset < end_of_data:
+            header = decode_header(view, offset)
+            if header is None:
+                break
+            length, header_size = header
+            start = offset + header_size
+            end = start + length
+            if end > end_of_data:
+                break
+            payloads.append(view[start:end])
+            offset = end
+
+        if offset < end_of_data:
+            self.buffer += view[offset:]
+        return payloads
+
+    def complete_buffered_frame(self, view, payloads):
+        """Move bytes from the start of `view` to the partial frame in the buffer and
+        return the rest of `view`. If that completes the frame, its payload is added to
+        `payloads`.
+        """
+        # Headers are short so complete the header a byte at a time. That way, no
+        # bytes beyond the end of the frame are ever moved into the buffer.
+        header = self.codec.decode_header(self.buffer)
+        while header is None and view:
+            self.buffer += view[:1]
+            view = view[1:]
+            header = self.codec.decode_header(self.buffer)
+        if header is None:
+            return view
+
+        length, header_size = header
+        needed = header_size + length - len(self.buffer)
+        self.buffer += view[:needed]
+        if len(self.buffer) == header_size + length:
+            payloads.append(memoryview(self.buffer)[header_size:])
+            self.buffer = bytearray()
+        return view[needed:]
+
+
+async def iter_frames(reader, chunk_size=64 * 1024, codec=None):
+    """Asynchronously iterate over the payloads of the frames read from `reader`, which
+    is read `chunk_size` bytes at a time. Each read can yield many frames.
+
+    Iteration stops when the connection is closed cleanly. If it is closed part way
+    through a frame `asyncio.IncompleteReadError` is raised.
+    """
+    decoder = FrameDecoder(codec)
+    while True:
+        data = await reader.read(chunk_size)
+        if not data:
+            if decoder.buffer:
+                raise asyncio.IncompleteReadError(bytes(decoder.buffer), None)
+            return
+        for payload in decoder.feed(data):
+            yield payload
+
+
+async def read_frame(reader, codec=None):
     """Read a frame and return the payload. If the connection was closed
     cleanly, meaning that there is no partial message, an empty byte array
     is returned.
     """
     try:
-        header_bytes = await reader.readexactly(4)
+        message_length = await get_codec(codec).read_header(reader)
     except asyncio.IncompleteReadError as e:
         if len(e.partial) == 0:
             return b""
         raise
-    message_length, = struct.unpack(">I", header_bytes)
     return await reader.readexactly(message_length)
+
+
+async def read_payload(reader, codec=None):
+    """Read a frame and return the payload. Unlike `read_frame`, an empty payload is
+    returned only for an empty frame. If the connection is closed before the frame is
+    complete, even before it starts, `asyncio.IncompleteReadError` is raised.
+    """
+    return await reader.readexactly(await get_codec(codec).read_header(reader))
@@ -0,0 +1,91 @@
+"""Reading variable-length messages, such as lines, for the pattern expectations.
+
+Each chunk that arrives is searched once. `StreamReader.readuntil` only searches the
+bytes that arrived since its last search, and `read_until` hands anything longer than
+the reader's limit over to the caller rather than letting it be searched again, so a
+message of any size costs time linear in its length.
+"""
+import asyncio
+import re
+
+
+def as_pattern(pattern):
+    """Compile `pattern`, which is bytes or an already compiled bytes pattern."""
+    if isinstance(pattern, re.Pattern):
+        if not isinstance(pattern.pattern, bytes):
+            raise TypeError("`pattern` must be a bytes pattern, not a str pattern")
+        return pattern
+    if not isinstance(pattern, (bytes, bytearray)):
+        raise TypeError(f"`pattern` must be bytes or a compiled pattern, not {pattern!r}")
+    return re.compile(bytes(pattern))
+
+
+def as_delimiter(delimiter):
+    if not isinstance(delimiter, (bytes, bytearray)) or not delimiter:
+        raise ValueError(f"`delimiter` must be non-empty bytes, not {delimiter!r}")
+    return bytes(delimiter)
+
+
+def check_prefix(prefix, delimiter):
+    # The delimiter is only searched for after the prefix has been read
+    if delimiter in prefix or any(
+        prefix.endswith(delimiter[:size]) for size in range(1, len(delimiter))
+    ):
+        raise ValueError(
+            f"`prefix` must not contain or end with part of `delimiter` {delimiter!r}, "
+            f"not {prefix!r}"
+        )
+    return prefix
+
+
+class ReceivedMessage:
+    """What a message expectation read. `data` includes the delimiter. `match` is the
+    `re.Match` of an `expect_regex` expectation. Both are `None` until the expectation
+    is met.
+    """
+
+    def __init__(self):
+        self.data = None
+        self.match = None
+
+
+async def read_until(reader, delimiter):
+    """Read from `reader` up to and including `delimiter`. Unlike
+    `StreamReader.readuntil`, the message can be longer than the reader's limit.
+
+    If the connection is closed first, `asyncio.IncompleteReadError` is raised with
+    everything that was read.
+    """
+    parts = []
+    while True:
+        try:
+            data = await reader.readuntil(delimiter)
+        except asyncio.LimitOverrunError as e:
+            # `e.consumed` bytes were searched and can't contain the start of the
+            # delimiter. Take them out of the buffer so that they aren't searched again.
+            parts.append(await reader.readexactly(e.consumed))
+            continue
+        except asyncio.IncompleteReadError as e:
+            raise asyncio.IncompleteReadError(b"".join(parts) + e.partial, None)
+        if not parts:
+            return data
+        parts.append(data)
+        return b"".join(parts)
+
+
+async def read_prefix(reader, prefix):
+    """Read `prefix` from `reader`, comparing each chunk as it arrives. Return the
+    bytes read, which are `prefix` or, as soon as the data differs from it, the bytes
+    up to and including the first chunk that differs.
+    """
+    received = bytearray()
+    size = len(prefix)
+    while len(received) < size:
+        chunk = await reader.read(size - len(received))
+        if not chunk:
+            raise asyncio.IncompleteReadError(bytes(received), size)
+        start = len(received)
+        received += chunk
+        if chunk != prefix[start:len(received)]:
+            break
+    return bytes(received)
@@ -0,0 +1,203 @@
+"""Decoded messages and the matchers that `MockTcpServer.expect_message` checks them
+with.
+
+A message format reads one message at a time from the stream, either up to a
+delimiter or as a frame of the server's codec, and decodes it. Nothing is read ahead
+so expectations of other kinds can follow.
+
+An expected value is compiled into a matcher once, when the expectation is added.
+In an expected value:
+
+- `ANY` (which is `unittest.mock.ANY`) matches anything.
+- A dict matches a dict that has at least its keys, with matching values. Other keys
+  are ignored.
+- A list or tuple matches a list or tuple of the same length with matching items.
+- A type matches any instance of it, e.g. `{"id": int}`.
+- A compiled regular expression matches a string, or bytes, that it fully matches.
+- Any other callable is a predicate that is called with the value.
+- Anything else matches an equal value.
+"""
+import json
+import re
+
+from dataclasses import dataclass
+from unittest.mock import ANY
+
+from .framing import read_payload
+from .matching import read_until
+from .rendering import render_value
+
+
+@dataclass
+class Mismatch:
+    """Where a message differs from the expected value. `path` is the keys and indexes
+    from the top of the message to the value that differs.
+    """
+
+    path: list
+    description: str
+
+    def __str__(self):
+        location = "".join(f"[{key!r}]" for key in reversed(self.path))
+        return f"message{location} {self.description}"
+
+
+def compile_matcher(expected):
+    """Return a function that takes a decoded value and returns `None` if it matches
+    `expected` or a `Mismatch` if it doesn't. `None` is returned instead of a function
+    for `ANY`, so that it costs nothing.
+    """
+    if expected is ANY:
+        return None
+    if isinstance(expected, dict):
+        return compile_dict_matcher(expected)
+    if isinstance(expected, (list, tuple)):
+        return compile_sequence_matcher(expected)
+    if isinstance(expected, type):
+        return compile_type_matcher(expected)
+    if isinstance(expected, re.Pattern):
+        return compile_pattern_matcher(expected)
+    if callable(expected):
+        return compile_predicate_matcher(expected)
+
+    def match_equal(value):
+        if value != expected:
+            return Mismatch(
+                [], f"is {render_value(value)}, expected {render_value(expected)}"
+            )
+    return match_equal
+
+
+def compile_dict_matcher(expected):
+    matchers = [(key, compile_matcher(value)) for key, value in expected.items()]
+
+    def match_dict(value):
+        if not isinstance(value, dict):
+            return Mismatch([], f"is {render_value(value)}, expected a dict")
+        for key, matcher in matchers:
+            try:
+                item = value[key]
+            except KeyError:
+                return Mismatch([key], "is missing")
+            if matcher is not None:
+                mismatch = matcher(item)
+                if mismatch is not None:
+                    mismatch.path.append(key)
+                    return mismatch
+    return match_dict
+
+
+def compile_sequence_matcher(expected):
+    matchers = [
+        (index, matcher) for index, matcher in enumerate(map(compile_matcher, expected))
+        if matcher is not None
+    ]
+    length = len(expected)
+
+    def match_sequence(value):
+        if not isinstance(value, (list, tuple)):
+            return Mismatch([], f"is {render_value(value)}, expected a list")
+        if len(value) != length:
+            return Mismatch([], f"has {len(value)} items, expected {length}")
+        for index, matcher in matchers:
+            mismatch = matcher(value[index])
+            if mismatch is not None:
+                mismatch.path.append(index)
+                return mismatch
+    return match_sequence
+
+
+def compile_type_matcher(expected):
+    def match_type(value):
+        if not isinstance(value, expected):
+            return Mismatch(
+                [], f"is {render_value(value)}, expected an instance of {expected.__name__}"
+            )
+    return match_type
+
+
+def compile_pattern_matcher(expected):
+    kind = type(expected.pattern)
+
+    def match_pattern(value):
+        if not isinstance(value, kind) or expected.fullmatch(value) is None:
+            return Mismatch(
+                [], f"is {render_value(value)}, expected to match {expected.pattern!r}"
+            )
+    return match_pattern
+
+
+def compile_predicate_matcher(expected):
+    name = getattr(expected, "__name__", repr(expected))
+
+    def match_predicate(value):
+        if not expected(value):
+            return Mismatch([], f"is {render_value(value)}, which doesn't satisfy {name}")
+    return match_predicate
+
+
+class MessageFormat:
+    """Messages that end with `delimiter` or, if it's `None`, are the payloads of
+    frames. `decode` turns the bytes of a message, without the delimiter, into a value.
+    """
+
+    def __init__(self, decode, delimiter=None):
+        self.decode = decode
+        self.delimiter = delimiter
+
+    async def read(self, reader, codec):
+        """Read the bytes of the next message. Raise `asyncio.IncompleteReadError` if
+        the connection is closed first.
+        """
+        if self.delimiter is None:
+            return await read_payload(reader, codec)
+        data = await read_until(reader, self.delimiter)
+        return data[:-len(self.delimiter)]
+
+
+class MsgpackFormat(MessageFormat):
+    """Frames of msgpack. The `msgpack` package is imported when the first message is
+    decoded, so that only the tests that use the format require it, and `decode` is
+    then replaced with `msgpack.unpackb` itself.
+    """
+
+    def __init__(self):
+        super().__init__(self.decode_first)
+
+    def decode_first(self, data):
+        try:
+            import msgpack
+        except ImportError:
+            raise ValueError("The `msgpack` package is required for msgpack messages")
+        self.decode = msgpack.unpackb
+        return self.decode(data)
+
+
+FORMATS = {
+    "lines": MessageFormat(bytes, b"\n"),
+    "json-lines": MessageFormat(json.loads, b"\n"),
+    "frames": MessageFormat(bytes),
+    "json-frames": MessageFormat(json.loads),
+    "msgpack-frames": MsgpackFormat(),
+}
+
+DEFAULT_FORMAT = "json-lines"
+
+
+def register_format(name, message_format):
+    """Make `message_format` available by `name` wherever a message format can be
+    given.
+    """
+    FORMATS[name] = message_format
+
+
+def get_format(message_format):
+    """Return the format registered as `message_format` if it is a name. Otherwise it
+    must itself be a `MessageFormat`.
+    """
+    if isinstance(message_format, str):
+        try:
+            return FORMATS[message_format]
+        except KeyError:
+            raise ValueError(f"Unknown message format {message_format!r}")
+    return message_format
@@ -1,6 +1,14 @@
 import asyncio
+import inspect
+import itertools
+import json
 import logging
+import os
+import shutil
+import socket
+import tempfile
 
+from collections import Counter
 from dataclasses import dataclass
 
 import pytest
@@ -8,7 +16,22 @@ import pytest_asyncio
 from _pytest.outcomes import OutcomeException
 
 
-from .framing import read_frame, write_frame
+from .capture import CaptureBuffer
+from . import broker, rendering
+from .framing import frame_parts, get_codec, read_frame, read_payload, write_frame
+from .matching import (
+    ReceivedMessage, as_delimiter, as_pattern, check_prefix, read_prefix, read_until,
+)
+from .messages import DEFAULT_FORMAT, compile_matcher, get_format
+from .recording import SENT_BY_CLIENT, SENT_BY_SERVER, SessionRecorder
+from .rendering import LazyBytes, render_bytes, render_counts, render_mismatch, render_value
+from .script import ExpectBytesStep, Script, SendStep, as_bytes, check_delay, check_timeout
+from .shaping import MIN_SLEEP, ReadThrottle, SendShaping, check_positive
+from .stats import ConnectionStats, LatencyReport, as_record, format_seconds, summary_lines
+from .streaming import DEFAULT_CHUNK_SIZE, StreamDigest, first_difference, iter_expected_chunks
+
+# How many bytes either side of a mismatch in a stream are reported
+MISMATCH_WINDOW = 16
 
 
 @dataclass
@@ -31,6 +54,12 @@ class SecondClientConnectionAttempted(ServerActionEvent):
     pass
 
 
+@dataclass
+class TooManyClientConnectionsAttempted(ServerActionEvent):
+
+    limit: int
+
+
 @dataclass
 class ReadZeroBytes(ServerActionEvent):
     pass
@@ -69,17 +98,223 @@ class FrameReadEvent(ServerActionEvent):
     payload: bytes
 
 
+@dataclass
+class UnorderedFramesReadEvent(ServerActionEvent):
+    """As an expected event, the frames whose payloads are counted by `expected`, in
+    any order.
+    """
+
+    count: int
+    expected: Counter = None
+
+
+@dataclass
+class UnexpectedFrameEvent(ServerActionEvent):
+    """Frame `index` (from 0) wasn't expected. `duplicate` is true if it was expected
+    but it had already been received as many times as expected.
+    """
+
+    index: int
+    payload: bytes
+    duplicate: bool
+
+
+@dataclass
+class FramesMissingEvent(ServerActionEvent):
+    """The frames counted by `missing` weren't received because of `actual_event`, which
+    is a timeout or the connection being closed.
+    """
+
+    missing: Counter
+    actual_event: ServerActionEvent
+
+
+@dataclass
+class AnyFrameReadEvent(ServerActionEvent):
+    """As an expected event, a frame with any of `payloads`."""
+
+    payloads: frozenset
+
+
+@dataclass
+class StreamReadEvent(ServerActionEvent):
+
+    length: int
+
+
+@dataclass
+class StreamMismatchEvent(ServerActionEvent):
+
+    offset: int
+    expected: bytes
+    actual: bytes
+
+
+@dataclass
+class StreamDigestMismatchEvent(ServerActionEvent):
+
+    expected_hexdigest: str
+    actual_hexdigest: str
+    # Set when the stream has chunk digests, `None` otherwise
+    chunk_index: int = None
+    chunk_offset: int = None
+
+
+@dataclass
+class FrameLengthMismatchEvent(ServerActionEvent):
+
+    expected_length: int
+    actual_length: int
+
+
+@dataclass
+class StreamTimeoutEvent(ServerActionEvent):
+
+    offset: int
+
+
+@dataclass
+class StreamClosedEvent(ServerActionEvent):
+
+    offset: int
+
+
+@dataclass
+class ScriptCompletedEvent(ServerActionEvent):
+    pass
+
+
+@dataclass
+class ScriptStepFailedEvent(ServerActionEvent):
+
+    expected_event: ServerActionEvent
+    actual_event: ServerActionEvent
+
+
+@dataclass
+class RepeatedExchangesCompletedEvent(ServerActionEvent):
+
+    count: int
+
+
+@dataclass
+class RepeatedExchangeFailedEvent(ServerActionEvent):
+    """Exchange `index` (from 0) of `count` failed."""
+
+    index: int
+    count: int
+    expected_event: ServerActionEvent
+    actual_event: ServerActionEvent
+
+
+@dataclass
+class MessagesMatchedEvent(ServerActionEvent):
+    """As an expected event, `count` messages that match `expected`."""
+
+    count: int
+    expected: object = None
+
+
+@dataclass
+class MessageFailedEvent(ServerActionEvent):
+    """Message `index` (from 0) of `count` failed with `actual_event`."""
+
+    index: int
+    count: int
+    actual_event: ServerActionEvent
+
+
+@dataclass
+class MessageMismatchEvent(ServerActionEvent):
+
+    data: bytes
+    mismatch: object
+
+
+@dataclass
+class MessageDecodeErrorEvent(ServerActionEvent):
+
+    data: bytes
+    exception: Exception
+
+
+@dataclass
+class HandledMessageEvent(ServerActionEvent):
+    """As an expected event, a message that a handler added by `on_frame` or `on_bytes`
+    (which is `kind`) replies to.
+    """
+
+    kind: str
+
+
+@dataclass
+class HandlerFailedEvent(ServerActionEvent):
+    """The handler raised `exception` for `message`."""
+
+    message: bytes
+    exception: Exception
+
+
+@dataclass
+class ClientPausedWritingEvent(ServerActionEvent):
+
+    buffer_size: int = None
+
+
+@dataclass
+class ClientResumedWritingEvent(ServerActionEvent):
+
+    buffer_size: int = None
+
+
+@dataclass
+class FlowControlTransition:
+    """The client's transport paused or resumed writing at `time` (the event loop's
+    clock) with `buffer_size` bytes in its write buffer.
+    """
+
+    paused: bool
+    time: float
+    buffer_size: int
+
+
 @dataclass
 class TimeoutEvent(ServerActionEvent):
     pass
 
 
+@dataclass
+class LatencyExceededEvent(ServerActionEvent):
+    """The expected event happened but `latency` seconds after the `previous` event
+    (e.g. "send_frame"), which is more than the bound of `within` seconds. `previous`
+    is `None` if there was no previous event on the connection.
+    """
+
+    latency: float
+    within: float
+    previous: str
+
+
 @dataclass
 class IncompleteReadEvent(ServerActionEvent):
 
     partial: bytes
 
 
+@dataclass
+class MessageReadEvent(ServerActionEvent):
+    """As an expected event, data ending with `delimiter` that starts with `prefix` or
+    matches `pattern` if they are given. `expectation` is the name of the method that
+    added the expectation. As an actual event, only `data` is set.
+    """
+
+    data: bytes = None
+    expectation: str = None
+    delimiter: bytes = None
+    prefix: bytes = None
+    pattern: object = None
+
+
 @dataclass
 class UnreadSentBytes(ServerActionEvent):
 
@@ -87,22 +322,117 @@ class UnreadSentBytes(ServerActionEvent):
         self.unread_bytes = unread_bytes
 
 
+def render_event(event):
+    """Render `event` like its `repr` but with its payloads rendered by `render_bytes`
+    and any other value by `render_value`, so that the result is bounded however large
+    the payloads are.
+    """
+    if not isinstance(event, ServerActionEvent):
+        return render_value(event)
+    parts = []
+    for name, value in vars(event).items():
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            parts.append(f"{name}={render_bytes(value)}")
+        else:
+            parts.append(f"{name}={render_event(value)}")
+    return f"{type(event).__name__}({', '.join(parts)})"
+
+
 class UnexpectedEventError(Exception):
 
     def __init__(self, expected_event, actual_event):
-        super().__init__(
-            f"UnexpectedEventError(expected_event={expected_event}, actual_event={actual_event}"
-        )
+        super().__init__(expected_event, actual_event)
         self.expected_event = expected_event
         self.actual_event = actual_event
 
+    def __str__(self):
+        # Formatted on demand because the events can hold large payloads
+        return f"UnexpectedEventError(expected_event={render_event(self.expected_event)}, " + \
+            f"actual_event={render_event(self.actual_event)})"
+
+
+async def wait_for(awaitable, timeout):
+    """Like `asyncio.wait_for` but awaits `awaitable` in the current task.
+
+    `asyncio.wait_for` wraps a coroutine in a new task, which costs a task and a few
+    turns of the event loop even when the result is already available. Here the timeout
+    cancels the current task instead and the cancellation is turned into
+    `asyncio.TimeoutError`. As with `asyncio.wait_for`, a `timeout` of `None` waits
+    forever.
+    """
+    if timeout is None:
+        return await awaitable
+
+    task = asyncio.current_task()
+    timed_out = False
+
+    def on_timeout():
+        nonlocal timed_out
+        timed_out = True
+        task.cancel()
+
+    handle = asyncio.get_running_loop().call_later(timeout, on_timeout)
+    try:
+        return await awaitable
+    except asyncio.CancelledError:
+        if not timed_out:
+            raise
+        if hasattr(task, "uncancel"):
+            # Python 3.11+ counts cancellation requests
+            task.uncancel()
+        raise asyncio.TimeoutError()
+    finally:
+        handle.cancel()
+
+
+class StepTimeout:
+    """A timeout on each step of a loop of many short steps, e.g. reading a message,
+    that costs one timer every `timeout` seconds rather than one per step as `wait_for`
+    would. Call `step` at the start of each step. When the timer fires, it cancels the
+    current task if the current step has taken `timeout` seconds and otherwise waits for
+    the rest of that step's time. Use it as a context manager, which turns the
+    cancellation into `asyncio.TimeoutError`.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.timed_out = False
+        self.step_started = self.loop.time()
+        self.handle = None
+
+    def step(self):
+        self.step_started = self.loop.time()
+
+    def on_timer(self):
+        deadline = self.step_started + self.timeout
+        if self.loop.time() < deadline:
+            self.handle = self.loop.call_at(deadline, self.on_timer)
+            return
+        self.timed_out = True
+        self.task.cancel()
+
+    def __enter__(self):
+        self.handle = self.loop.call_at(self.step_started + self.timeout, self.on_timer)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.handle.cancel()
+        if exc_type is asyncio.CancelledError and self.timed_out:
+            if hasattr(self.task, "uncancel"):
+                # Python 3.11+ counts cancellation requests
+                self.task.uncancel()
+            raise asyncio.TimeoutError()
+
 
 class ExpectConnect:
 
-    def __init__(self, server, timeout):
+    def __init__(self, server, timeout, within=None):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.server = server
         self.timeout = timeout
+        self.within = within
 
     async def server_action(self):
         # See `MockTcpServer.start` for why this method cannot itself generate
@@ -113,9 +443,10 @@ class ExpectConnect:
         # Since `server_action` does nothing, it cannot generate an error event in the
         # case of a timeout. We have to do that here.
 
+        start_time = asyncio.get_running_loop().time()
         try:
             self.logger.debug("Expecting connection from client.")
-            next_event = await asyncio.wait_for(
+            next_event = await wait_for(
                 self.server.server_event_queue.get(),
                 timeout=self.timeout,
             )
@@ -127,6 +458,31 @@ class ExpectConnect:
             raise UnexpectedEventError(ClientConnectedEvent(), next_event)
 
         self.logger.debug("Client connected")
+        connected_at = self.server.stats.connected_at
+        # The previous event was snapshotted when the client connected because, in
+        # multi-connection mode, other connections may have had events since.
+        previous = self.server.event_before_connect
+        self.server.mark_event("connect", connected_at)
+        check_latency(
+            self.within,
+            ClientConnectedEvent(),
+            max(connected_at, start_time) if previous is None else connected_at,
+            previous or (start_time, None),
+        )
+
+
+def check_latency(within, expected_event, event_time, previous):
+    """Raise `UnexpectedEventError` if `event_time` is more than `within` seconds after
+    the time of the `(time, description)` of the `previous` event.
+    """
+    if within is None:
+        return
+    previous_time, previous_description = previous
+    latency = event_time - previous_time
+    if latency > within:
+        raise UnexpectedEventError(
+            expected_event, LatencyExceededEvent(latency, within, previous_description)
+        )
 
 
 class ExpectIsConnected:
@@ -157,7 +513,7 @@ class ExpectClientCalledWriterClose:
 
     async def server_action(self):
         try:
-            await asyncio.wait_for(
+            await wait_for(
                 self.server.client_called_writer_close.wait(),
                 timeout=self.timeout,
             )
@@ -179,7 +535,7 @@ class ExpectClientCalledWriterWaitClosed:
 
     async def server_action(self):
         try:
-            await asyncio.wait_for(
+            await wait_for(
                 self.server.client_called_writer_waited_closed.wait(),
                 timeout=self.timeout,
             )
@@ -195,27 +551,32 @@ class ExpectClientCalledWriterWaitClosed:
 
 class ExpectBytes:
 
-    def __init__(self, server, expected_bytes, timeout):
+    def __init__(self, server, expected_bytes, timeout, within=None):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.server = server
         self.expected_bytes = expected_bytes
         self.timeout = timeout
+        self.within = within
+        self.previous_event = None
+        self.read_time = None
 
     async def server_action(self):
         try:
-            self.logger.debug("Expecting to read bytes: %s", self.expected_bytes)
-            received = await asyncio.wait_for(
+            self.logger.debug("Expecting to read bytes: %s", LazyBytes(self.expected_bytes))
+            self.previous_event = self.server.previous_event()
+            received = await wait_for(
                 self.server.reader.readexactly(len(self.expected_bytes)),
                 timeout=self.timeout,
             )
-            self.logger.debug("Bytes read: %s", received)
+            self.read_time = self.server.mark_event("expect_bytes")
+            self.logger.debug("Bytes read: %s", LazyBytes(received))
             return BytesReadEvent(received)
         except asyncio.TimeoutError as e:
-            self.logger.debug("Timed out waiting to read bytes %s", self.expected_bytes)
+            self.logger.debug("Timed out waiting to read bytes %s", LazyBytes(self.expected_bytes))
             return TimeoutEvent()
         except asyncio.IncompleteReadError as e:
             self.logger.debug(
-                "Incomplete read while trying to read bytes %s", self.expected_bytes
+                "Incomplete read while trying to read bytes %s", LazyBytes(self.expected_bytes)
             )
             return IncompleteReadEvent(e.partial)
 
@@ -225,28 +586,38 @@ class ExpectBytes:
             raise UnexpectedEventError(BytesReadEvent(self.expected_bytes), next_event)
         if next_event.bytes_read != self.expected_bytes:
             raise UnexpectedEventError(BytesReadEvent(self.expected_bytes), next_event)
-        self.logger.debug("Expected bytes were received: %s", self.expected_bytes)
+        self.logger.debug("Expected bytes were received: %s", LazyBytes(self.expected_bytes))
+        check_latency(
+            self.within, BytesReadEvent(self.expected_bytes), self.read_time, self.previous_event
+        )
 
 
 class ExpectFrame:
 
-    def __init__(self, server, expected_payload, timeout):
+    def __init__(self, server, expected_payload, timeout, within=None):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.server = server
         self.expected_payload = expected_payload
         self.timeout = timeout
+        self.within = within
+        self.previous_event = None
+        self.read_time = None
 
     async def server_action(self):
         try:
-            self.logger.debug("Expecting to read frame: %s", self.expected_payload)
-            payload = await asyncio.wait_for(
-                read_frame(self.server.reader),
+            self.logger.debug("Expecting to read frame: %s", LazyBytes(self.expected_payload))
+            self.previous_event = self.server.previous_event()
+            payload = await wait_for(
+                read_frame(self.server.reader, self.server.codec),
                 timeout=self.timeout,
             )
-            self.logger.debug("Payload read: %s", payload)
+            self.read_time = self.server.mark_event("expect_frame")
+            self.logger.debug("Payload read: %s", LazyBytes(payload))
             return FrameReadEvent(payload)
         except asyncio.TimeoutError as e:
-            self.logger.debug("Timed out waiting to read frame %s", self.expected_payload)
+            self.logger.debug(
+                "Timed out waiting to read frame %s", LazyBytes(self.expected_payload)
+            )
             return TimeoutEvent()
 
     async def evaluate(self):
@@ -255,7 +626,184 @@ class ExpectFrame:
             raise UnexpectedEventError(FrameReadEvent(self.expected_payload), next_event)
         if next_event.payload != self.expected_payload:
             raise UnexpectedEventError(FrameReadEvent(self.expected_payload), next_event)
-        self.logger.debug("Expected frame was received: %s", self.expected_payload)
+        self.server.stats.frames_received += 1
+        self.logger.debug("Expected frame was received: %s", LazyBytes(self.expected_payload))
+        check_latency(
+            self.within,
+            FrameReadEvent(self.expected_payload),
+            self.read_time,
+            self.previous_event,
+        )
+
+
+class ExpectFramesUnordered:
+    """Reads as many frames as there are `payloads` and checks that they have those
+    payloads in any order. The payloads are counted in a multiset so each frame is
+    matched with a single lookup.
+    """
+
+    def __init__(self, server, payloads, timeout):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.server = server
+        self.expected = Counter(payloads)
+        self.count = len(payloads)
+        self.timeout = timeout
+
+    async def server_action(self):
+        self.logger.debug("Expecting %s frames in any order", self.count)
+        reader = self.server.reader
+        codec = self.server.codec
+        remaining = self.expected.copy()
+        try:
+            with StepTimeout(self.timeout) as timeout:
+                for index in range(self.count):
+                    timeout.step()
+                    payload = await read_payload(reader, codec)
+                    left = remaining[payload]
+                    if not left:
+                        return UnexpectedFrameEvent(index, payload, payload in self.expected)
+                    if left == 1:
+                        del remaining[payload]
+                    else:
+                        remaining[payload] = left - 1
+        except asyncio.TimeoutError:
+            return FramesMissingEvent(remaining, TimeoutEvent())
+        except asyncio.IncompleteReadError as e:
+            return FramesMissingEvent(remaining, IncompleteReadEvent(e.partial))
+        self.server.mark_event("expect_frames_unordered")
+        return UnorderedFramesReadEvent(self.count)
+
+    async def evaluate(self):
+        next_event = await self.server.server_event_queue.get()
+        if not isinstance(next_event, UnorderedFramesReadEvent):
+            raise UnexpectedEventError(
+                UnorderedFramesReadEvent(self.count, self.expected), next_event
+            )
+        self.server.stats.frames_received += self.count
+        self.logger.debug("Expected frames were received")
+
+
+class ExpectAnyFrame:
+    """Reads a frame and checks that it has one of `payloads`."""
+
+    def __init__(self, server, payloads, timeout):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.server = server
+        self.payloads = payloads
+        self.timeout = timeout
+
+    async def server_action(self):
+        try:
+            payload = await wait_for(
+                read_payload(self.server.reader, self.server.codec), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            return TimeoutEvent()
+        except asyncio.IncompleteReadError as e:
+            return IncompleteReadEvent(e.partial)
+        self.server.mark_event("expect_any_of")
+        self.logger.debug("Payload read: %s", LazyBytes(payload))
+        return FrameReadEvent(payload)
+
+    async def evaluate(self):
+        next_event = await self.server.server_event_queue.get()
+        if not isinstance(next_event, FrameReadEvent) or \
+                next_event.payload not in self.payloads:
+            raise UnexpectedEventError(AnyFrameReadEvent(self.payloads), next_event)
+        self.server.stats.frames_received += 1
+
+
+class ExpectStream:
+
+    def __init__(self, server, source, chunk_size, timeout):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.server = server
+        self.source = source
+        self.chunk_size = chunk_size
+        # Applies to each chunk rather than to the whole stream
+        self.timeout = timeout
+        self.offset = 0
+
+    async def server_action(self):
+        self.logger.debug("Expecting to read stream in chunks of %s bytes", self.chunk_size)
+        try:
+            if isinstance(self.source, StreamDigest):
+                return await self.read_digest()
+            for expected in iter_expected_chunks(self.source, self.chunk_size):
+                received = await self.read(len(expected))
+                if received != expected:
+                    index = first_difference(received, expected)
+                    self.logger.debug("Stream mismatch at offset %s", self.offset + index)
+                    return StreamMismatchEvent(
+                        self.offset + index,
+                        bytes(expected[index:index + MISMATCH_WINDOW]),
+                        received[index:index + MISMATCH_WINDOW],
+                    )
+                self.offset += len(received)
+        except asyncio.TimeoutError:
+            self.logger.debug("Timed out waiting for stream after %s bytes", self.offset)
+            return StreamTimeoutEvent(self.offset)
+        except asyncio.IncompleteReadError as e:
+            self.logger.debug("Stream closed after %s bytes", self.offset + len(e.partial))
+            return StreamClosedEvent(self.offset + len(e.partial))
+        self.logger.debug("Stream read: %s bytes", self.offset)
+        return StreamReadEvent(self.offset)
+
+    async def read(self, length):
+        return await wait_for(
+            self.server.reader.readexactly(length),
+            timeout=self.timeout,
+        )
+
+    async def read_digest(self):
+        source = self.source
+        chunk_size = source.chunk_size or self.chunk_size
+        digest = source.new_hash()
+        chunk_index = 0
+        while self.offset < source.length:
+            received = await self.read(min(chunk_size, source.length - self.offset))
+            digest.update(received)
+            if source.chunk_hexdigests is not None:
+                chunk_digest = source.new_hash()
+                chunk_digest.update(received)
+                actual = chunk_digest.hexdigest()
+                expected = source.chunk_hexdigests[chunk_index]
+                if actual != expected:
+                    self.logger.debug("Digest mismatch in chunk %s", chunk_index)
+                    return StreamDigestMismatchEvent(expected, actual, chunk_index, self.offset)
+                chunk_index += 1
+            self.offset += len(received)
+        if source.hexdigest is not None and digest.hexdigest() != source.hexdigest:
+            return StreamDigestMismatchEvent(source.hexdigest, digest.hexdigest())
+        return StreamReadEvent(self.offset)
+
+    async def evaluate(self):
+        next_event = await self.server.server_event_queue.get()
+        if not isinstance(next_event, StreamReadEvent):
+            raise UnexpectedEventError(StreamReadEvent(None), next_event)
+        self.logger.debug("Expected stream was received: %s bytes", next_event.length)
+
+
+class ExpectFrameDigest(ExpectStream):
+
+    async def server_action(self):
+        self.logger.debug("Expecting to read frame of %s bytes", self.source.length)
+        try:
+            length = await wait_for(
+                self.server.codec.read_header(self.server.reader),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            return StreamTimeoutEvent(0)
+        except asyncio.IncompleteReadError:
+            return StreamClosedEvent(0)
+        if length != self.source.length:
+            return FrameLengthMismatchEvent(self.source.length, length)
+        return await super().server_action()
+
+    async def evaluate(self):
+        await super().evaluate()
+        self.server.stats.frames_received += 1
 
 
 class ExpectReadZeroBytes:
@@ -266,7 +814,7 @@ class ExpectReadZeroBytes:
 
     async def server_action(self):
         try:
-            received = await asyncio.wait_for(
+            received = await wait_for(
                 self.server.reader.read(),
                 timeout=self.timeout,
             )
@@ -283,6 +831,34 @@ class ExpectReadZeroBytes:
             raise UnexpectedEventError(ReadZeroBytes(), next_event)
 
 
+class ExpectClientFlowControl:
+
+    def __init__(self, server, paused, timeout):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.server = server
+        self.paused = paused
+        self.timeout = timeout
+
+    def event_class(self, paused):
+        return ClientPausedWritingEvent if paused else ClientResumedWritingEvent
+
+    async def server_action(self):
+        self.logger.debug("Expecting client to %s writing", "pause" if self.paused else "resume")
+        try:
+            transition = await wait_for(
+                self.server.next_flow_control_transition(),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            return TimeoutEvent()
+        return self.event_class(transition.paused)(transition.buffer_size)
+
+    async def evaluate(self):
+        next_event = await self.server.server_event_queue.get()
+        if not isinstance(next_event, self.event_class(self.paused)):
+            raise UnexpectedEventError(self.event_class(self.paused)(), next_event)
+
+
 class ExpectClientReadAllSentBytes:
 
     def __init__(self, server, timeout):
@@ -292,12 +868,12 @@ class ExpectClientReadAllSentBytes:
     async def server_action(self):
         sent_bytes = self.server.data_sent_from_server
         read_bytes = self.server.data_read_by_client
-        if read_bytes == sent_bytes:
+        assert sent_bytes.startswith(read_bytes), \
+            f"sent_bytes does not start with read_bytes: {len(sent_bytes)=}, {len(read_bytes)=}"
+        if len(read_bytes) == len(sent_bytes):
             return NoRemainingSentData()
         else:
-            assert sent_bytes.startswith(read_bytes), \
-                f"sent_bytes does not start with read_bytes: {sent_bytes=}, {read_bytes=}"
-            return UnreadSentBytes(sent_bytes[len(read_bytes):])
+            return UnreadSentBytes(sent_bytes.tail(len(read_bytes)))
 
     async def evaluate(self):
         next_event = await self.server.server_event_queue.get()
@@ -307,15 +883,17 @@ class ExpectClientReadAllSentBytes:
 
 class SendBytes:
 
-    def __init__(self, server, data):
+    def __init__(self, server, data, delay=0):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.server = server
         self.data = data
+        self.delay = delay
 
     async def server_action(self):
-        self.logger.debug("Sending bytes %s", self.data)
-        self.server.writer.write(self.data)
-        await self.server.writer.drain()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.logger.debug("Sending bytes %s", LazyBytes(self.data))
+        await self.server.send(self.data, "send_bytes")
 
     async def evaluate(self):
         pass
@@ -323,15 +901,338 @@ class SendBytes:
 
 class SendFrame:
 
-    def __init__(self, server, payload):
+    def __init__(self, server, payload, delay=0):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.server = server
         self.payload = payload
+        self.delay = delay
 
     async def server_action(self):
-        self.logger.debug("Send frame %s", self.payload)
-        write_frame(self.server.writer, self.payload)
-        await self.server.writer.drain()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.logger.debug("Send frame %s", LazyBytes(self.payload))
+        if self.server.shaping is None:
+            write_frame(self.server.writer, self.payload, self.server.codec)
+            self.server.mark_event("send_frame")
+            await self.server.drain()
+        else:
+            await self.server.send(
+                b"".join(frame_parts(self.payload, self.server.codec)), "send_frame"
+            )
+        self.server.stats.frames_sent += 1
+
+    async def evaluate(self):
+        pass
+
+
+class RunScript:
+    """Runs all the steps of a compiled `script.Plan` as a single expectation."""
+
+    def __init__(self, server, plan):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.server = server
+        self.plan = plan
+
+    async def server_action(self):
+        self.logger.debug("Running script of %s steps", len(self.plan.steps))
+        loop = asyncio.get_running_loop()
+        # Timed sends are scheduled from the loop's monotonic clock at the time that the
+        # last timed expectation was met. Deadlines are absolute so that oversleeping
+        # doesn't accumulate over a long script.
+        anchor_time = loop.time()
+        anchor_at = 0
+        for step in self.plan.steps:
+            if isinstance(step, SendStep):
+                if step.delay:
+                    await asyncio.sleep(step.delay)
+                if step.at is not None:
+                    delay = anchor_time + step.at - anchor_at - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await self.server.send(step.data, "run_script")
+                self.server.stats.frames_sent += step.frames
+                continue
+            if isinstance(step, ExpectBytesStep):
+                expected_event = BytesReadEvent(step.data)
+                actual_event = await self.read_bytes(step)
+                self.server.mark_event("run_script")
+                if step.at is not None:
+                    anchor_time = loop.time()
+                    anchor_at = step.at
+            else:
+                expected_event = FrameReadEvent(step.payload)
+                actual_event = await self.read_frame(step)
+                self.server.mark_event("run_script")
+            if actual_event != expected_event:
+                self.logger.debug("Script step failed: %s", actual_event)
+                return ScriptStepFailedEvent(expected_event, actual_event)
+            if isinstance(actual_event, FrameReadEvent):
+                self.server.stats.frames_received += 1
+        return ScriptCompletedEvent()
+
+    async def read_bytes(self, step):
+        try:
+            received = await wait_for(
+                self.server.reader.readexactly(len(step.data)),
+                timeout=step.timeout,
+            )
+        except asyncio.TimeoutError:
+            return TimeoutEvent()
+        except asyncio.IncompleteReadError as e:
+            return IncompleteReadEvent(e.partial)
+        return BytesReadEvent(received)
+
+    async def read_frame(self, step):
+        try:
+            payload = await wait_for(
+                read_frame(self.server.reader, self.plan.codec),
+                timeout=step.timeout,
+            )
+        except asyncio.TimeoutError:
+            return TimeoutEvent()
+        except asyncio.IncompleteReadError as e:
+            return IncompleteReadEvent(e.partial)
+        return FrameReadEvent(payload)
+
+    async def evaluate(self):
+        next_event = await self.server.server_event_queue.get()
+        if isinstance(next_event, ScriptStepFailedEvent):
+            raise UnexpectedEventError(next_event.expected_event, next_event.actual_event)
+        if not isinstance(next_event, ScriptCompletedEvent):
+            raise UnexpectedEventError(ScriptCompletedEvent(), next_event)
+        self.logger.debug("Script completed")
+
+
+class ServeRepeated:
+    """Reads `request` and sends `response`, `count` times, as a single expectation.
+    The latency of each request after the first, from the response before it, is added
+    to `report`.
+    """
+
+    def __init__(self, server, request, response, count, timeout, report):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.server = server
+        self.request = request
+        self.response = response
+        self.count = count
+        self.timeout = timeout
+        self.report = report
+
+    async def server_action(self):
+        self.logger.debug("Serving %s exchanges", self.count)
+        server = self.server
+        loop = asyncio.get_running_loop()
+        request = self.request
+        size = len(request)
+        add_sample = self.report.add
+        # The first request has no response before it
+        sent_at = None
+        for index in range(self.count):
+            try:
+                received = await wait_for(server.reader.readexactly(size), self.timeout)
+            except asyncio.TimeoutError:
+                return self.failed(index, TimeoutEvent())
+            except asyncio.IncompleteReadError as e:
+                return self.failed(index, IncompleteReadEvent(e.partial))
+            received_at = loop.time()
+            if received != request:
+                return self.failed(index, BytesReadEvent(received))
+            if sent_at is not None:
+                add_sample(received_at - sent_at)
+            await server.send(self.response, "serve_repeated")
+            sent_at = server.last_event[0]
+        return RepeatedExchangesCompletedEvent(self.count)
+
+    def failed(self, index, actual_event):
+        self.logger.debug("Exchange %s failed: %s", index, actual_event)
+        return RepeatedExchangeFailedEvent(
+            index, self.count, BytesReadEvent(self.request), actual_event
+        )
+
+    async def evaluate(self):
+        next_event = await self.server.server_event_queue.get()
+        if not isinstance(next_event, RepeatedExchangesCompletedEvent):
+            raise UnexpectedEventError(RepeatedExchangesCompletedEvent(self.count), next_event)
+        self.logger.debug("Exchanges completed: %s", self.report)
+
+
+class ExpectMessage:
+    """Reads data up to and including `delimiter`, of any length, and checks that it
+    starts with `prefix` or that the data before the delimiter matches `pattern`. A
+    prefix is compared as the data arrives so that a mismatch fails without waiting
+    for the delimiter. The data, and the match, are stored in `received`.
+    """
+
+    def __init__(
+        self, server, expectation, delimiter, timeout, received, prefix=None, pattern=None
+    ):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.server = server
+        self.expected_event = MessageReadEvent(
+            expectation=expectation, delimiter=delimiter, prefix=prefix, pattern=pattern
+        )
+        self.timeout = timeout
+        self.received = received
+
+    async def server_action(self):
+        expected_event = self.expected_event
+        self.logger.debug("Expecting to read %s", describe_message(expected_event))
+        try:
+            event = await wait_for(self.read(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.logger.debug("Timed out waiting for %s", describe_message(expected_event))
+            return TimeoutEvent()
+        except asyncio.IncompleteReadError as e:
+            self.logger.debug("Incomplete read of %s", describe_message(expected_event))
+            return IncompleteReadEvent(e.partial)
+        self.server.mark_event(expected_event.expectation)
+        return event
+
+    async def read(self):
+        reader = self.server.reader
+        prefix = self.expected_event.prefix
+        head = b""
+        if prefix:
+            head = await read_prefix(reader, prefix)
+            if head != prefix:
+                return BytesReadEvent(head)
+        try:
+            data = await read_until(reader, self.expected_event.delimiter)
+        except asyncio.IncompleteReadError as e:
+            raise asyncio.IncompleteReadError(head + e.partial, None)
+        self.logger.debug("Message read: %s", LazyBytes(data))
+        return MessageReadEvent(head + data if head else data)
+
+    async def evaluate(self):
+        next_event = await self.server.server_event_queue.get()
+        expected_event = self.expected_event
+        if not isinstance(next_event, MessageReadEvent):
+            raise UnexpectedEventError(expected_event, next_event)
+        data = next_event.data
+        if expected_event.pattern is not None:
+            match = expected_event.pattern.fullmatch(
+                data, 0, len(data) - len(expected_event.delimiter)
+            )
+            if match is None:
+                raise UnexpectedEventError(expected_event, next_event)
+            self.received.match = match
+        self.received.data = data
+        self.logger.debug("Expected message was received: %s", LazyBytes(data))
+
+
+class ExpectMessages:
+    """Reads `count` messages in `message_format`, one at a time, and checks that each
+    decoded message matches `expected`, which is compiled into a matcher once.
+    """
+
+    def __init__(self, server, message_format, expected, count, timeout):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.server = server
+        self.message_format = message_format
+        self.expected = expected
+        self.matcher = compile_matcher(expected)
+        self.count = count
+        self.timeout = timeout
+
+    async def server_action(self):
+        self.logger.debug("Expecting %s messages", self.count)
+        server = self.server
+        reader = server.reader
+        codec = server.codec
+        read = self.message_format.read
+        decode = self.message_format.decode
+        matcher = self.matcher
+        index = 0
+        try:
+            with StepTimeout(self.timeout) as timeout:
+                for index in range(self.count):
+                    timeout.step()
+                    data = await read(reader, codec)
+                    try:
+                        message = decode(data)
+                    except Exception as e:
+                        return self.failed(index, MessageDecodeErrorEvent(data, e))
+                    if matcher is not None:
+                        mismatch = matcher(message)
+                        if mismatch is not None:
+                            return self.failed(index, MessageMismatchEvent(data, mismatch))
+        except asyncio.TimeoutError:
+            return self.failed(index, TimeoutEvent())
+        except asyncio.IncompleteReadError as e:
+            return self.failed(index, IncompleteReadEvent(e.partial))
+        server.mark_event("expect_message")
+        return MessagesMatchedEvent(self.count)
+
+    def failed(self, index, actual_event):
+        self.logger.debug("Message %s failed: %s", index, actual_event)
+        return MessageFailedEvent(index, self.count, actual_event)
+
+    async def evaluate(self):
+        next_event = await self.server.server_event_queue.get()
+        if not isinstance(next_event, MessagesMatchedEvent):
+            raise UnexpectedEventError(
+                MessagesMatchedEvent(self.count, self.expected), next_event
+            )
+        if self.message_format.delimiter is None:
+            self.server.stats.frames_received += self.count
+        self.logger.debug("Expected messages were received")
+
+
+class Handler:
+    """Replies to the messages that `matcher` (compiled by `messages.compile_matcher`)
+    matches with what `function` returns. Messages are frames if `delimiter` is `None`
+    and otherwise end with it.
+    """
+
+    def __init__(self, kind, matcher, function, delimiter=None):
+        if not callable(function):
+            raise TypeError(f"`handler` must be callable, not {function!r}")
+        self.kind = kind
+        self.matcher = matcher
+        self.function = function
+        self.delimiter = delimiter
+
+    def matches(self, message):
+        return self.matcher is None or self.matcher(message) is None
+
+
+class StartHandlers:
+    """Starts dispatching to handlers that were added after the client connected. It's
+    queued so that no expectation is reading when the stream is taken over.
+    """
+
+    def __init__(self, server):
+        self.server = server
+
+    async def server_action(self):
+        if self.server.dispatcher_task is None:
+            self.server.start_dispatching()
+
+    async def evaluate(self):
+        pass
+
+
+class ThrottleReading:
+
+    def __init__(self, server, rate):
+        self.server = server
+        self.rate = rate
+
+    async def server_action(self):
+        self.server.set_read_rate(self.rate)
+
+    async def evaluate(self):
+        pass
+
+
+class Shape:
+
+    def __init__(self, server, shaping):
+        self.server = server
+        self.shaping = shaping
+
+    async def server_action(self):
+        self.server.set_shaping(self.shaping)
 
     async def evaluate(self):
         pass
@@ -345,6 +1246,8 @@ class Disconnect:
 
     async def server_action(self):
         self.logger.debug("Server disconnecting")
+        self.server.mark_event("disconnect")
+        self.server.connection_closed()
         self.server.writer.close()
         await self.server.writer.wait_closed()
 
@@ -363,7 +1266,7 @@ def interpret_error(exception):
     if isinstance(expected_event, ReadZeroBytes):
         if isinstance(actual_event, BytesReadEvent):
             return "Received unexpected data while waiting for client to disconnect. " + \
-                    f"Data is {actual_event.bytes_read}."
+                    f"Data is {render_bytes(actual_event.bytes_read)}."
     elif isinstance(expected_event, ClientCalledWriterClose):
         if isinstance(actual_event, SecondClientConnectionAttempted):
             return "While waiting for client to disconnect a " + \
@@ -377,99 +1280,390 @@ def interpret_error(exception):
     elif isinstance(expected_event, ClientConnectedEvent):
         if isinstance(actual_event, TimeoutEvent):
             return "Timed out waiting for client to connect."
+        elif isinstance(actual_event, TooManyClientConnectionsAttempted):
+            return f"More than {actual_event.limit} client connections were attempted."
         elif isinstance(actual_event, ClientNotConnectedEvent):
             return "Client is not connected. " + \
                 "Did you forget to call `asyncio.open_connection`?"
+        elif isinstance(actual_event, LatencyExceededEvent):
+            return describe_latency("Expected client to connect", actual_event)
     elif isinstance(expected_event, BytesReadEvent):
         if isinstance(actual_event, TimeoutEvent):
-            return f"Timed out waiting for {expected_event.bytes_read}"
+            return f"Timed out waiting for {render_bytes(expected_event.bytes_read)}"
         elif isinstance(actual_event, ClientConnectedEvent):
             return "Missing `expect_connect()` before " + \
-                    f"`expect_bytes({expected_event.bytes_read})`"
+                    f"`expect_bytes({render_bytes(expected_event.bytes_read)})`"
         elif isinstance(actual_event, BytesReadEvent):
-            return f"Expected to read {expected_event.bytes_read} " + \
-                    f"but actually read {actual_event.bytes_read}"
+            return render_mismatch(
+                f"Expected to read {render_bytes(expected_event.bytes_read)} " +
+                f"but actually read {render_bytes(actual_event.bytes_read)}",
+                expected_event.bytes_read,
+                actual_event.bytes_read,
+            )
+        elif isinstance(actual_event, LatencyExceededEvent):
+            return describe_latency(
+                f"Expected to read {render_bytes(expected_event.bytes_read)}", actual_event
+            )
         elif isinstance(actual_event, IncompleteReadEvent):
-            if not actual_event.partial:
-                return f"Expected to read {expected_event.bytes_read} " + \
-                        f"but only read {actual_event.partial} " + \
-                        f"before the connection was closed."
+            return f"Expected to read {render_bytes(expected_event.bytes_read)} " + \
+                    f"but only read {render_bytes(actual_event.partial)} " + \
+                    "before the connection was closed."
     elif isinstance(expected_event, FrameReadEvent):
         if isinstance(actual_event, TimeoutEvent):
-            return f"Timed out waiting for frame {expected_event.payload}"
+            return f"Timed out waiting for frame {render_bytes(expected_event.payload)}"
         # elif isinstance(actual_event, ClientConnectedEvent):
         #     return "Missing `expect_connect()` before " + \
         #             f"`expect_bytes({expected_event.bytes_read})`"
         elif isinstance(actual_event, FrameReadEvent):
-            return f"Expected to get frame {expected_event.payload} " + \
-                    f"but actually got frame {actual_event.payload}"
+            return render_mismatch(
+                f"Expected to get frame {render_bytes(expected_event.payload)} " +
+                f"but actually got frame {render_bytes(actual_event.payload)}",
+                expected_event.payload,
+                actual_event.payload,
+            )
+        elif isinstance(actual_event, LatencyExceededEvent):
+            return describe_latency(
+                f"Expected to get frame {render_bytes(expected_event.payload)}", actual_event
+            )
+        elif isinstance(actual_event, IncompleteReadEvent):
+            return f"Expected to get frame {render_bytes(expected_event.payload)} " + \
+                    f"but only read {render_bytes(actual_event.partial)} " + \
+                    "before the connection was closed."
+    elif isinstance(expected_event, MessageReadEvent):
+        description = describe_message(expected_event)
+        if isinstance(actual_event, TimeoutEvent):
+            return f"Timed out waiting for {description}"
+        elif isinstance(actual_event, ClientConnectedEvent):
+            return f"Missing `expect_connect()` before `{expected_event.expectation}(...)`"
+        elif isinstance(actual_event, MessageReadEvent):
+            return f"Expected {description} but actually read " + \
+                    f"{render_bytes(actual_event.data)}"
+        elif isinstance(actual_event, BytesReadEvent):
+            return render_mismatch(
+                f"Expected {description} but actually read " +
+                f"{render_bytes(actual_event.bytes_read)}",
+                expected_event.prefix,
+                actual_event.bytes_read,
+            )
+        elif isinstance(actual_event, IncompleteReadEvent):
+            return f"Expected {description} but only read " + \
+                    f"{render_bytes(actual_event.partial)} before the connection was closed."
+    elif isinstance(expected_event, MessagesMatchedEvent):
+        if isinstance(actual_event, ClientConnectedEvent):
+            return "Missing `expect_connect()` before `expect_message(...)`"
+        elif isinstance(actual_event, MessageFailedEvent):
+            failure = actual_event.actual_event
+            description = f"a message matching {render_value(expected_event.expected)}"
+            if actual_event.count == 1:
+                prefix = ""
+            else:
+                prefix = f"Message {actual_event.index + 1} of {actual_event.count} failed. "
+            if isinstance(failure, TimeoutEvent):
+                return f"{prefix}Timed out waiting for {description}"
+            elif isinstance(failure, IncompleteReadEvent):
+                return f"{prefix}Expected {description} but only read " + \
+                        f"{render_bytes(failure.partial)} before the connection was closed."
+            elif isinstance(failure, MessageDecodeErrorEvent):
+                return f"{prefix}Could not decode message {render_bytes(failure.data)}: " + \
+                        f"{type(failure.exception).__name__}: {failure.exception}"
+            elif isinstance(failure, MessageMismatchEvent):
+                return f"{prefix}Expected {description} but {failure.mismatch}. " + \
+                        f"Message was {render_bytes(failure.data)}"
+    elif isinstance(expected_event, HandledMessageEvent):
+        if isinstance(actual_event, HandlerFailedEvent):
+            exception = actual_event.exception
+            return f"`{expected_event.kind}` handler raised {type(exception).__name__}: " + \
+                f"{exception} for {render_bytes(actual_event.message)}"
+    elif isinstance(expected_event, UnorderedFramesReadEvent):
+        if isinstance(actual_event, ClientConnectedEvent):
+            return "Missing `expect_connect()` before `expect_frames_unordered(...)`"
+        elif isinstance(actual_event, UnexpectedFrameEvent):
+            problem = "was received more times than expected" if actual_event.duplicate \
+                else "was not expected"
+            return f"Frame {actual_event.index + 1} of {expected_event.count}, " + \
+                f"{render_bytes(actual_event.payload)}, {problem}"
+        elif isinstance(actual_event, FramesMissingEvent):
+            missing = sum(actual_event.missing.values())
+            if isinstance(actual_event.actual_event, TimeoutEvent):
+                reason = "Timed out waiting for"
+            else:
+                reason = "Connection was closed before receiving"
+            return f"{reason} {missing} of {expected_event.count} frames: " + \
+                render_counts(actual_event.missing)
+    elif isinstance(expected_event, AnyFrameReadEvent):
+        expected = "a frame with any of " + \
+            render_counts(Counter(sorted(expected_event.payloads)))
+        if isinstance(actual_event, TimeoutEvent):
+            return f"Timed out waiting for {expected}"
+        elif isinstance(actual_event, FrameReadEvent):
+            return f"Expected {expected} but actually got frame " + \
+                render_bytes(actual_event.payload)
+        elif isinstance(actual_event, IncompleteReadEvent):
+            return f"Expected {expected} but only read {render_bytes(actual_event.partial)} " + \
+                "before the connection was closed."
+    elif isinstance(expected_event, StreamReadEvent):
+        if isinstance(actual_event, StreamMismatchEvent):
+            return f"Stream differs from expected at offset {actual_event.offset}. " + \
+                    f"Expected {actual_event.expected} but actually read {actual_event.actual}"
+        elif isinstance(actual_event, StreamDigestMismatchEvent):
+            if actual_event.chunk_index is not None:
+                return "Stream digest differs from expected in chunk " + \
+                        f"{actual_event.chunk_index} at offset {actual_event.chunk_offset}. " + \
+                        f"Expected {actual_event.expected_hexdigest} " + \
+                        f"but actually got {actual_event.actual_hexdigest}"
+            else:
+                return "Stream digest differs from expected. " + \
+                        f"Expected {actual_event.expected_hexdigest} " + \
+                        f"but actually got {actual_event.actual_hexdigest}"
+        elif isinstance(actual_event, FrameLengthMismatchEvent):
+            return f"Expected a frame of {actual_event.expected_length} bytes " + \
+                    f"but actually got a frame of {actual_event.actual_length} bytes"
+        elif isinstance(actual_event, StreamTimeoutEvent):
+            return f"Timed out waiting for stream after {actual_event.offset} bytes"
+        elif isinstance(actual_event, StreamClosedEvent):
+            return "Connection was closed after reading " + \
+                    f"{actual_event.offset} bytes of the expected stream"
+    elif isinstance(expected_event, (ClientPausedWritingEvent, ClientResumedWritingEvent)):
+        action = "pause" if isinstance(expected_event, ClientPausedWritingEvent) else "resume"
+        if isinstance(actual_event, TimeoutEvent):
+            return f"Timed out waiting for client to {action} writing."
+        elif isinstance(actual_event, (ClientPausedWritingEvent, ClientResumedWritingEvent)):
+            return f"Expected client to {action} writing but it did the opposite " + \
+                    f"with {actual_event.buffer_size} bytes in its write buffer."
+    elif isinstance(expected_event, ScriptCompletedEvent):
+        if isinstance(actual_event, ClientConnectedEvent):
+            return "Missing `expect_connect()` before `run_script(...)`"
+    elif isinstance(expected_event, RepeatedExchangesCompletedEvent):
+        if isinstance(actual_event, ClientConnectedEvent):
+            return "Missing `expect_connect()` before `serve_repeated(...)`"
+        elif isinstance(actual_event, RepeatedExchangeFailedEvent):
+            return f"Exchange {actual_event.index + 1} of {actual_event.count} failed. " + \
+                interpret_error(UnexpectedEventError(
+                    actual_event.expected_event, actual_event.actual_event
+                ))
     elif isinstance(expected_event, ClientCalledWriterWaitClosed):
         if isinstance(actual_event, TimeoutEvent):
             return "Timed out waiting for client to call `await writer.wait_closed()`."
     elif isinstance(expected_event, NoRemainingSentData):
         if isinstance(actual_event, UnreadSentBytes):
             return "There is data sent by server that was not read by client: " + \
-                    f"unread_bytes={actual_event.unread_bytes}."
+                    f"unread_bytes={render_bytes(actual_event.unread_bytes)}."
+
+    return f"Cannot interpret {exception}, {type(exception)=}"
 
-    return f"Cannot interpret {exception}, {type(exception)=}"  # pragma: no cover
+
+def describe_latency(expectation, event):
+    if event.previous is None:
+        previous = "the start of the expectation"
+    else:
+        previous = f"`{event.previous}`"
+    return f"{expectation} within {format_seconds(event.within)} of {previous} " + \
+        f"but it took {format_seconds(event.latency)}."
+
+
+def describe_message(event):
+    ending = f"ending with {render_bytes(event.delimiter)}"
+    if event.prefix is not None:
+        return f"data starting with {render_bytes(event.prefix)} and {ending}"
+    if event.pattern is not None:
+        return f"data matching {event.pattern.pattern!r} and {ending}"
+    return f"data {ending}"
 
 
 class InterceptorProtocol:
 
-    def __init__(self, server, original_protocol):
+    def __init__(self, server, original_protocol, address=None):
         self.server = server
         self.original_protocol = original_protocol
+        # The client's address, by which its connection is found in multi-connection
+        # mode. By default, it's the transport's `sockname`.
+        self.address = address
 
     def connection_made(self, transport):
+        self.transport = transport
+        # The server for this connection, which is one of the connections of `server`
+        # in multi-connection mode. Looked up when it is first needed because the
+        # server may not have accepted the connection yet.
+        self.connection = None
         self.original_protocol.connection_made(transport)
 
     def connection_lost(self, exc):
         self.original_protocol.connection_lost(exc)
 
-    def pause_writing(self):  # pragma: no cover
+    def get_connection(self):
+        if self.connection is None and self.server is not None:
+            address = self.address
+            if address is None:
+                address = self.transport.get_extra_info("sockname")
+            self.connection = self.server.connection_for_client(address)
+        return self.connection
+
+    def pause_writing(self):
+        connection = self.get_connection()
+        if connection is not None:
+            connection.record_client_flow_control(self.transport, True)
         self.original_protocol.pause_writing()
 
-    def resume_writing(self):  # pragma: no cover
+    def resume_writing(self):
+        connection = self.get_connection()
+        if connection is not None:
+            connection.record_client_flow_control(self.transport, False)
         self.original_protocol.resume_writing()
 
     def data_received(self, data):
+        connection = self.get_connection()
+        if connection is not None:
+            connection.stats.client_chunk_sizes.add(len(data))
         self.original_protocol.data_received(data)
 
     def eof_received(self):
         self.original_protocol.eof_received()
 
 
+class RecordingProtocol(InterceptorProtocol):
+    """Records the traffic of a client connection to a real server."""
+
+    def __init__(self, recorder, original_protocol):
+        super().__init__(None, original_protocol)
+        self.recorder = recorder
+
+    def connection_made(self, transport):
+        original_write = transport.write
+
+        def write(data):
+            self.recorder.record(SENT_BY_CLIENT, data)
+            original_write(data)
+
+        def writelines(data):
+            write(b"".join(data))
+
+        transport.write = write
+        transport.writelines = writelines
+        super().connection_made(transport)
+
+    def data_received(self, data):
+        self.recorder.record(SENT_BY_SERVER, data)
+        super().data_received(data)
+
+
+def stream_digest(length, digest, algorithm, chunk_size, chunk_digests):
+    if isinstance(digest, StreamDigest):
+        if digest.length != length:
+            raise ValueError(
+                f"`length` is {length} but the digest is of {digest.length} bytes"
+            )
+        return digest
+    return StreamDigest(length, digest, algorithm, chunk_size, chunk_digests)
+
+
 class MockTcpServer:
 
-    def __init__(self, service_port, mocker):
+    def __init__(
+        self, service_port, mocker, sock=None, connections=None, codec=None, shaping=None,
+        transport="tcp", service_path=None,
+    ):
         self.logger = logging.getLogger(self.__class__.__name__)
+        if transport not in TRANSPORTS:
+            raise ValueError(f"`transport` must be one of {TRANSPORTS}, not {transport!r}")
+        # How clients connect: to `service_port` over TCP, to the Unix socket at
+        # `service_path` or, with "socketpair", only through `open_connection`
+        self.transport = transport
         self.service_port = service_port
+        self.service_path = service_path
         self.mocker = mocker
+        self.sock = sock
+        # The framing codec used by `expect_frame` and `send_frame`
+        self.codec = get_codec(codec)
+        # How data is sent. `None` means as fast as possible.
+        self.shaping = None
+        self.token_bucket = None
+        self.set_shaping(shaping)
         self.connected = False
         self.errors = []
         self.join_already_failed = False
         self.stopped = False
         self.instructions = []
         self.server_event_queue = asyncio.Queue()
-        self.server_actions = asyncio.Queue()
         self.expecations_queue = asyncio.Queue()
 
         self.evaluator_task = None
+        # `send_bytes` and `send_frame` run in tasks of their own, each after the one
+        # before, and a write that the client is slow to read is drained in
+        # `drain_task`. See `perform_server_action`.
+        self.send_task = None
+        self.drain_task = None
         self.server = None
         self.reader = None
         self.writer = None
         self.client_reader = None
         self.client_writer = None
 
+        # Reading at full speed unless set by `set_read_rate`
+        self.read_throttle = None
+
+        # The client's transport pausing and resuming writing. Flow control
+        # expectations consume them in order.
+        self.flow_control_transitions = []
+        self.flow_control_transitions_seen = 0
+        self.flow_control_changed = asyncio.Event()
+
+        self.stats = ConnectionStats()
+
+        # Handlers added by `on_frame` and `on_bytes`. Once the client has connected and
+        # there are handlers, `dispatcher_task` reads all the messages from the client.
+        # It replies to those that a handler matches and passes the rest on to `reader`,
+        # from which the expectations read, instead of the client's stream, `raw_reader`.
+        self.handlers = []
+        self.dispatcher_task = None
+        self.raw_reader = None
+        # The tasks of handlers that reply asynchronously
+        self.handler_tasks = set()
+
+        # `(time, description)` of the last event on the connection, for latency bounds.
+        # A connection of a multi-connection server falls back to its parent's last
+        # event until it has one of its own.
+        self.parent = None
+        self.last_event = None
+        self.event_before_connect = None
+
         self.client_called_writer_close = asyncio.Event()
         self.client_called_writer_waited_closed = asyncio.Event()
-        self.data_read_by_client = b""
-        self.data_sent_from_server = b""
-
-    def protocol_factory(self, original_protocol):
-        return InterceptorProtocol(self, original_protocol)
+        self.data_read_by_client = CaptureBuffer()
+        self.data_sent_from_server = CaptureBuffer()
+
+        # In multi-connection mode, each accepted connection is handed to its own
+        # `MockTcpServer` that doesn't listen but has its own streams, queues and tasks.
+        # The client streams are matched to the server streams by address because the
+        # client and the server side of a connection may be established in either order.
+        self.connections = [
+            MockTcpServer(
+                service_port, mocker, codec=self.codec, shaping=shaping,
+                transport=transport, service_path=service_path,
+            )
+            for _ in range(connections or 0)
+        ]
+        for connection in self.connections:
+            connection.parent = self
+        # The address of the client of a connection in multi-connection mode
+        self.client_address = None
+        self.next_connection_index = 0
+        self.socketpair_ids = itertools.count()
+        # See `accepted`
+        self.accepted_clients = {}
+        self.accepted_connections = {}
+        self.pending_client_streams = {}
+
+    def protocol_factory(self, original_protocol, address=None):
+        return InterceptorProtocol(self, original_protocol, address)
+
+    def register_client_streams(self, client_reader, client_writer, address=None):
+        if self.connections:
+            if address is None:
+                address = client_writer.get_extra_info("sockname")
+            self.pending_client_streams[address] = (client_reader, client_writer)
+            self.match_client_streams(address)
+            return
 
-    def register_client_streams(self, client_reader, client_writer):
         if self.client_reader is not None:
             return
 
@@ -497,28 +1691,32 @@ class MockTcpServer:
 
     async def client_read(self, *args, **kwargs):
         data = await self.original_client_reader_read(*args, **kwargs)
-        self.data_read_by_client += data
+        self.data_read_by_client.append(data)
+        self.stats.client_read(len(data))
         return data
 
     # async def client_readline(self, *args, **kwargs):
     #     data = await self.original_client_reader_readline(*args, **kwargs)
-    #     self.data_read_by_client += data
+    #     self.data_read_by_client.append(data)
     #     return data
 
     async def client_readexactly(self, *args, **kwargs):
         try:
             data = await self.original_client_reader_readexactly(*args, **kwargs)
-            self.data_read_by_client += data
+            self.data_read_by_client.append(data)
+            self.stats.client_read(len(data))
             return data
         except asyncio.IncompleteReadError as e:
             # Have to record the bytes we did read so that we don't wrongly accuse client
             # of not reading them.
-            self.data_read_by_client += e.partial
+            self.data_read_by_client.append(e.partial)
+            self.stats.client_read(len(e.partial))
             raise
 
     async def client_readuntil(self, *args, **kwargs):
         data = await self.original_client_reader_readuntil(*args, **kwargs)
-        self.data_read_by_client += data
+        self.data_read_by_client.append(data)
+        self.stats.client_read(len(data))
         return data
 
     def client_writer_close(self):
@@ -530,8 +1728,9 @@ class MockTcpServer:
         await self.original_client_writer_wait_closed()
 
     async def start(self):
-        self.evaluator_task = asyncio.create_task(self.evaluate_expectations())
-        self.server_action_task = asyncio.create_task(self.execute_server_actions())
+        self.start_tasks()
+        for connection in self.connections:
+            connection.start_tasks()
 
         # I thought it would be neater to have `ExpectConnect.server_action`
         # method call `start_accepting_connections` but then there's a race
@@ -548,37 +1747,318 @@ class MockTcpServer:
         # fixture.
         await self.start_accepting_connections()
 
+    def start_tasks(self):
+        self.evaluator_task = asyncio.create_task(self.evaluate_expectations())
+
+    def handle_client_connection(self, reader, writer, address=None):
+        self.logger.debug("client connection established")
+        if self.transport == "unix":
+            accepted = self.accepted(writer.get_extra_info("peername"))
+            if not accepted.done():
+                accepted.set_result(None)
+        if self.connections:
+            self.dispatch_connection(reader, writer, address)
+        else:
+            self.connection_established(reader, writer)
+
+    def accepted(self, address):
+        """Return a future that is done when the Unix socket connection from the client
+        at `address` has been accepted.
+        """
+        accepted = self.accepted_clients.get(address)
+        if accepted is None:
+            accepted = self.accepted_clients[address] = \
+                asyncio.get_running_loop().create_future()
+        return accepted
+
     async def start_accepting_connections(self):
+        if self.transport == "socketpair":
+            # Each connection is made by `open_connection`
+            return
+        if self.transport == "unix":
+            self.server = await asyncio.start_unix_server(
+                self.handle_client_connection,
+                path=self.service_path,
+                backlog=max(100, len(self.connections)),
+                start_serving=True,
+            )
+        elif self.sock is not None:
+            # The socket is already bound and listening so there is no window in which
+            # a client could connect before the server is ready.
+            self.server = await asyncio.start_server(
+                self.handle_client_connection,
+                sock=self.sock,
+                start_serving=True,
+            )
+        else:
+            self.server = await asyncio.start_server(
+                self.handle_client_connection,
+                port=self.service_port,
+                backlog=max(100, len(self.connections)),
+                start_serving=True,
+            )
+
+    async def open_connection(self):
+        """Connect a client to this server with the server's transport and return the
+        client's `(reader, writer)` streams, as `asyncio.open_connection` does. It's the
+        only way to connect to a "socketpair" server.
+        """
+        if self.transport == "tcp":
+            return await asyncio.open_connection(None, self.service_port)
+        if self.transport == "unix":
+            return await asyncio.open_unix_connection(self.service_path)
+        return await self.open_socketpair_connection()
+
+    async def open_socketpair_connection(self):
+        loop = asyncio.get_running_loop()
+        server_sock, client_sock = socket.socketpair()
+        # Both ends of a socket pair are unnamed so the connection is identified by a
+        # made-up address instead
+        address = ("socketpair", next(self.socketpair_ids))
+
+        def server_protocol():
+            return asyncio.StreamReaderProtocol(
+                asyncio.StreamReader(),
+                lambda reader, writer: self.handle_client_connection(reader, writer, address),
+            )
+
+        await loop.connect_accepted_socket(server_protocol, sock=server_sock)
+
+        # The same as `asyncio.open_connection`
+        reader = asyncio.StreamReader()
+        protocol = asyncio.StreamReaderProtocol(reader)
+        transport, _ = await loop.connect_accepted_socket(
+            lambda: self.protocol_factory(protocol, address), sock=client_sock
+        )
+        writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        self.register_client_streams(reader, writer, address)
+        return reader, writer
+
+    def connection_established(self, reader, writer):
+        if self.connected:
+            self.server_event_queue.put_nowait(SecondClientConnectionAttempted())
+            return
+        self.connected = True
+        self.stats.connected_at = asyncio.get_running_loop().time()
+        self.event_before_connect = self.previous_event()
+        self.reader = reader
+
+        self.writer = writer
+
+        # Capture all data sent from the server by patching `write` method of
+        # the writer
+        self.original_writer_write = self.writer.write
+        self.mocker.patch.object(self.writer, "write", self.intercept_sent_data)
+        self.original_writer_writelines = self.writer.writelines
+        self.mocker.patch.object(self.writer, "writelines", self.intercept_sent_lines)
+        self.original_reader_feed_data = self.reader.feed_data
+        self.mocker.patch.object(self.reader, "feed_data", self.intercept_received_data)
+        self.original_reader_feed_eof = self.reader.feed_eof
+        self.mocker.patch.object(self.reader, "feed_eof", self.intercept_received_eof)
+
+        if self.handlers:
+            self.start_dispatching()
+
+        self.server_event_queue.put_nowait(ClientConnectedEvent())
+
+    def start_dispatching(self):
+        self.raw_reader = self.reader
+        self.reader = asyncio.StreamReader()
+        self.dispatcher_task = asyncio.create_task(self.dispatch_to_handlers())
+
+    async def dispatch_to_handlers(self):
+        reader = self.raw_reader
+        expectation_reader = self.reader
+        codec = self.codec
+        # All the handlers read the same kind of message
+        delimiter = self.handlers[0].delimiter
+        try:
+            while True:
+                if delimiter is None:
+                    length = await codec.read_header(reader)
+                    try:
+                        message = await reader.readexactly(length)
+                    except asyncio.IncompleteReadError as e:
+                        raise asyncio.IncompleteReadError(
+                            codec.encode_header(length) + e.partial, None
+                        )
+                else:
+                    data = await read_until(reader, delimiter)
+                    message = data[:-len(delimiter)]
+                for handler in self.handlers:
+                    if handler.matches(message):
+                        self.handle(handler, message)
+                        break
+                else:
+                    if delimiter is None:
+                        data = codec.encode_header(len(message)) + message
+                    expectation_reader.feed_data(data)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                expectation_reader.feed_data(e.partial)
+            expectation_reader.feed_eof()
+        except Exception as e:
+            # E.g. the connection was reset
+            expectation_reader.set_exception(e)
+
+    def handle(self, handler, message):
+        if handler.delimiter is None:
+            self.stats.frames_received += 1
+        try:
+            reply = handler.function(message)
+        except Exception as e:
+            self.handler_failed(handler, message, e)
+            return
+        if inspect.isawaitable(reply):
+            # Asynchronous handlers run concurrently so replies can be out of order
+            task = asyncio.ensure_future(self.reply_later(handler, message, reply))
+            self.handler_tasks.add(task)
+            task.add_done_callback(self.handler_tasks.discard)
+        else:
+            self.reply(handler, reply)
 
-        def handle_client_connection(reader, writer):
+    async def reply_later(self, handler, message, reply):
+        try:
+            reply = await reply
+        except Exception as e:
+            self.handler_failed(handler, message, e)
+            return
+        self.reply(handler, reply)
 
-            self.logger.debug("client connection established")
-            if self.connected:
-                self.server_event_queue.put_nowait(SecondClientConnectionAttempted())
-                return
-            self.connected = True
-            self.reader = reader
+    def reply(self, handler, reply):
+        if reply is None:
+            return
+        # Replies don't wait for the client to read them, since the expectations may be
+        # draining the same writer, and aren't shaped
+        if handler.delimiter is None:
+            write_frame(self.writer, reply, self.codec)
+            self.stats.frames_sent += 1
+        else:
+            self.writer.write(reply)
+        self.mark_event(handler.kind)
 
-            self.writer = writer
+    def handler_failed(self, handler, message, exception):
+        self.logger.debug("%s handler failed: %s", handler.kind, exception)
+        self.error(UnexpectedEventError(
+            HandledMessageEvent(handler.kind), HandlerFailedEvent(message, exception)
+        ))
 
-            # Capture all data sent from the server by patching `write` method of
-            # the writer
-            self.original_writer_write = self.writer.write
-            self.mocker.patch.object(self.writer, "write", self.intercept_sent_data)
+    def dispatch_connection(self, reader, writer, address=None):
+        if self.next_connection_index == len(self.connections):
+            self.error(UnexpectedEventError(
+                ClientConnectedEvent(),
+                TooManyClientConnectionsAttempted(len(self.connections)),
+            ))
+            return
+        connection = self.connections[self.next_connection_index]
+        self.next_connection_index += 1
+        connection.connection_established(reader, writer)
 
-            self.server_event_queue.put_nowait(ClientConnectedEvent())
+        if address is None:
+            address = writer.get_extra_info("peername")
+        connection.client_address = address
+        self.accepted_connections[address] = connection
+        self.match_client_streams(address)
 
-        self.server = await asyncio.start_server(
-            handle_client_connection,
-            port=self.service_port,
-            start_serving=True,
-        )
+    def match_client_streams(self, address):
+        if address in self.accepted_connections and address in self.pending_client_streams:
+            connection = self.accepted_connections.pop(address)
+            connection.register_client_streams(*self.pending_client_streams.pop(address))
 
     def intercept_sent_data(self, data):
-        self.data_sent_from_server += data
+        self.data_sent_from_server.append(data)
+        self.stats.sent(len(data))
         self.original_writer_write(data)
 
+    def intercept_received_data(self, data):
+        self.stats.received(len(data), asyncio.get_running_loop().time())
+        if self.read_throttle is None:
+            self.original_reader_feed_data(data)
+        else:
+            self.read_throttle.data_received(data)
+
+    def intercept_received_eof(self):
+        self.connection_closed()
+        if self.read_throttle is None:
+            self.original_reader_feed_eof()
+        else:
+            self.read_throttle.eof_received()
+
+    def set_read_rate(self, rate):
+        """Read from the client at full speed if `rate` is `None`, not at all if it is
+        0 and otherwise at `rate` bytes per second.
+        """
+        if self.read_throttle is not None:
+            self.read_throttle.cancel()
+            self.read_throttle = None
+        transport = self.writer.transport
+        if rate is None:
+            transport.resume_reading()
+            return
+        self.read_throttle = ReadThrottle(
+            transport,
+            rate,
+            asyncio.get_running_loop(),
+            self.original_reader_feed_data,
+            self.original_reader_feed_eof,
+        )
+
+    def connection_for_client(self, address):
+        """Return the server of the connection of the client at `address`. In
+        multi-connection mode, that's `None` until the connection has been accepted.
+        """
+        if not self.connections:
+            return self
+        for connection in self.connections:
+            if connection.client_address == address:
+                return connection
+        return None
+
+    def record_client_flow_control(self, transport, paused):
+        self.flow_control_transitions.append(FlowControlTransition(
+            paused, asyncio.get_running_loop().time(), transport.get_write_buffer_size()
+        ))
+        self.flow_control_changed.set()
+
+    async def next_flow_control_transition(self):
+        while self.flow_control_transitions_seen == len(self.flow_control_transitions):
+            self.flow_control_changed.clear()
+            await self.flow_control_changed.wait()
+        transition = self.flow_control_transitions[self.flow_control_transitions_seen]
+        self.flow_control_transitions_seen += 1
+        return transition
+
+    def intercept_sent_lines(self, data):
+        data = list(data)
+        size = 0
+        for chunk in data:
+            self.data_sent_from_server.append(chunk)
+            size += len(chunk)
+        self.stats.sent(size)
+        self.original_writer_writelines(data)
+
+    def mark_event(self, description, time=None):
+        """Record that the event described by `description` happened at `time`, which
+        is now by default, and return the time.
+        """
+        if time is None:
+            time = asyncio.get_running_loop().time()
+        self.last_event = (time, description)
+        if self.parent is not None:
+            self.parent.last_event = self.last_event
+        return time
+
+    def previous_event(self):
+        if self.last_event is None and self.parent is not None:
+            return self.parent.last_event
+        return self.last_event
+
+    def connection_closed(self):
+        if self.stats.connected_at is not None and self.stats.closed_at is None:
+            self.stats.closed_at = asyncio.get_running_loop().time()
+
     async def evaluate_expectations(self):
+        loop = asyncio.get_running_loop()
         while True:
 
             # If there are already errors, there's no point evaluating the expectation.
@@ -588,31 +2068,51 @@ class MockTcpServer:
             expectation = await self.expecations_queue.get()
             self.logger.debug("evaluating expectation: %s", expectation)
             if not self.errors:
-                # Asynchronously, we want to generate the server event that corresponds to
-                # this expectation. We have to do it asynchronously because there may already
-                # be other actions from previous expectations. If everything goes well, the
-                # call to `evaluate` will match up with the event generated by the server
-                # action.
-                self.server_actions.put_nowait(expectation.server_action)
+                start_time = loop.time()
+                # The server action and the evaluation run in the same task, one after the
+                # other. The action's event goes through `server_event_queue` because
+                # events from the connection handler, such as `ClientConnectedEvent`, may
+                # already be waiting there and must be evaluated first. Since the event is
+                # already in the queue, `evaluate` gets it without a task switch.
+                server_event = await self.perform_server_action(expectation)
+                if server_event is not None:
+                    self.server_event_queue.put_nowait(server_event)
                 try:
                     await expectation.evaluate()
                 except Exception as e:
                     self.error(e)
+                else:
+                    self.stats.expectation_durations.append(
+                        (type(expectation).__name__, loop.time() - start_time)
+                    )
             self.expecations_queue.task_done()
 
-    async def execute_server_actions(self):
-        while True:
-            server_action = await self.server_actions.get()
-            self.logger.debug("performing server action: %s", server_action)
-            if self.errors:
-                # Just drop the server action. It's irrelevant now
-                continue
-            try:
-                server_event = await server_action()
-            except Exception as e:
-                server_event = ExceptionEvent(e)
-            if server_event is not None:
-                self.server_event_queue.put_nowait(server_event)
+    async def perform_server_action(self, expectation):
+        self.logger.debug("performing server action: %s", expectation)
+        if isinstance(expectation, (SendBytes, SendFrame)):
+            # A send doesn't hold up the expectations after it, so `join` can return
+            # before the client reads what was sent. Like any action, it runs after the
+            # expectations before it, including anything the test did before the
+            # evaluator got to run, such as the client closing its writer.
+            self.send_task = asyncio.create_task(self.send_after(self.send_task, expectation))
+            return None
+        if self.send_task is not None:
+            # Everything else happens after what was sent has been written
+            await self.send_task
+            self.send_task = None
+        try:
+            return await expectation.server_action()
+        except Exception as e:
+            return ExceptionEvent(e)
+
+    async def send_after(self, previous_send_task, expectation):
+        if previous_send_task is not None:
+            await previous_send_task
+        try:
+            await expectation.server_action()
+        except Exception as e:
+            # Evaluated by the next expectation, since a send has no event of its own
+            self.server_event_queue.put_nowait(ExceptionEvent(e))
 
     def error(self, exception):
         self.errors.append(exception)
@@ -623,22 +2123,82 @@ class MockTcpServer:
             await self.join()
         finally:
             self.stopped = True
-            # Cancel evaluator_task
-            self.evaluator_task.cancel()
-            try:
-                await self.evaluator_task
-            except asyncio.CancelledError:
-                pass
+            await self.cancel_tasks()
+            for connection in self.connections:
+                connection.stopped = True
+                await connection.cancel_tasks()
+
+            if self.server is not None:
+                self.server.close()
+                await self.server.wait_closed()
+
+    def set_shaping(self, shaping):
+        self.shaping = shaping
+        # Created when the first shaped chunk is sent
+        self.token_bucket = None
+
+    async def send(self, data, description):
+        if self.shaping is None:
+            self.writer.write(data)
+        else:
+            await self.send_shaped(data)
+        self.mark_event(description)
+        await self.drain()
+
+    async def drain(self):
+        transport = self.writer.transport
+        low_water, _ = transport.get_write_buffer_limits()
+        if transport.get_write_buffer_size() <= low_water:
+            # Doesn't wait but raises if the connection has been lost
+            await self.writer.drain()
+        elif self.drain_task is None or self.drain_task.done():
+            # The client may only read after `join` returns so wait for it in the
+            # background. Later writes are covered by the same drain.
+            self.drain_task = asyncio.create_task(self.drain_in_background())
+
+    async def drain_in_background(self):
+        try:
+            await self.writer.drain()
+        except Exception as e:
+            self.server_event_queue.put_nowait(ExceptionEvent(e))
+
+    async def send_shaped(self, data):
+        loop = asyncio.get_running_loop()
+        if self.token_bucket is None:
+            self.token_bucket = self.shaping.new_token_bucket(loop.time())
+        view = memoryview(data).cast("B")
+        chunk_size = self.shaping.effective_chunk_size(len(view))
+        for start in range(0, len(view), chunk_size):
+            chunk = view[start:start + chunk_size]
+            # One sleep covers both the delay and the wait for the bucket to refill
+            wait = self.shaping.chunk_delay
+            if self.token_bucket is not None:
+                wait = max(wait, self.token_bucket.consume(len(chunk), loop.time()))
+            if wait >= MIN_SLEEP:
+                await asyncio.sleep(wait)
+            self.writer.write(chunk)
+            await self.writer.drain()
+
+    async def cancel_tasks(self):
+        # Cancel evaluator_task
+        self.evaluator_task.cancel()
+        try:
+            await self.evaluator_task
+        except asyncio.CancelledError:
+            pass
 
-            # Cancel server_action_task
-            self.server_action_task.cancel()
-            try:
-                await self.server_action_task
-            except asyncio.CancelledError:
-                pass
+        if self.read_throttle is not None:
+            self.read_throttle.cancel()
 
-            self.server.close()
-            await self.server.wait_closed()
+        for task in [self.send_task, self.drain_task, self.dispatcher_task, *self.handler_tasks]:
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+        self.connection_closed()
 
     async def join(self):
         __tracebackhide__ = True
@@ -653,54 +2213,366 @@ class MockTcpServer:
             self.join_already_failed = True
             pytest.fail(interpret_error(self.errors[0]))
 
+        for connection in self.connections:
+            await connection.join()
+
     def check_not_stopped(self):
         if self.stopped:  # pragma: no cover
             raise Exception("Fixture is stopped")
 
-    def expect_connect(self, timeout=1):
+    # `within` is a bound, in seconds, on the latency of the expected event: the time
+    # since the previous event on the connection, which is the server connecting,
+    # reading, sending or disconnecting. The expectation still waits up to `timeout` so
+    # that the latency can be reported if it's exceeded. Times are from the event loop's
+    # monotonic clock.
+
+    def expect_connect(self, timeout=1, within=None):
+        """Expect the client to connect. With `within`, it must connect within that many
+        seconds of the previous event, which, for a connection of a multi-connection
+        server, can be an event on another connection. That's how a reconnection time
+        is bounded.
+        """
         self.check_not_stopped()
-        self.expecations_queue.put_nowait(ExpectConnect(self, timeout=timeout))
+        self.expecations_queue.put_nowait(ExpectConnect(
+            self, timeout=timeout, within=check_positive(within, "within")
+        ))
 
-    def expect_bytes(self, expected_bytes, timeout=1):
+    def expect_bytes(self, expected_bytes, timeout=1, within=None):
         self.check_not_stopped()
         self.expecations_queue.put_nowait(ExpectBytes(
-            self, expected_bytes=expected_bytes, timeout=timeout
+            self,
+            expected_bytes=expected_bytes,
+            timeout=timeout,
+            within=check_positive(within, "within"),
         ))
 
-    def send_bytes(self, data):
+    def send_bytes(self, data, delay=0):
+        """Send `data` to the client, after waiting `delay` seconds."""
         self.check_not_stopped()
-        self.expecations_queue.put_nowait(SendBytes(self, data))
+        self.expecations_queue.put_nowait(SendBytes(self, data, check_delay(delay)))
 
-    def expect_frame(self, expected_payload, timeout=1):
+    def expect_frame(self, expected_payload, timeout=1, within=None):
         self.check_not_stopped()
         self.expecations_queue.put_nowait(ExpectFrame(
-            self, expected_payload=expected_payload, timeout=timeout
+            self,
+            expected_payload=expected_payload,
+            timeout=timeout,
+            within=check_positive(within, "within"),
+        ))
+
+    # The message expectations read data of any length up to and including a delimiter.
+    # Each returns a `matching.ReceivedMessage` that holds what was read once the
+    # expectation is met, so look at it after `join()`. `timeout` applies to the whole
+    # message.
+
+    def expect_until(self, delimiter, timeout=1):
+        """Expect the client to send any data ending with `delimiter`."""
+        self.check_not_stopped()
+        received = ReceivedMessage()
+        self.expecations_queue.put_nowait(ExpectMessage(
+            self, "expect_until", as_delimiter(delimiter), timeout, received
+        ))
+        return received
+
+    def expect_prefix(self, prefix, delimiter=b"\r\n", timeout=1):
+        """Expect the client to send data that starts with `prefix` and ends with
+        `delimiter`, e.g. a status line whose first word is known.
+        """
+        self.check_not_stopped()
+        delimiter = as_delimiter(delimiter)
+        prefix = check_prefix(as_bytes(prefix, "prefix"), delimiter)
+        received = ReceivedMessage()
+        self.expecations_queue.put_nowait(ExpectMessage(
+            self, "expect_prefix", delimiter, timeout, received, prefix=prefix
         ))
+        return received
 
-    def send_frame(self, payload):
+    def expect_regex(self, pattern, delimiter=b"\r\n", timeout=1):
+        """Expect the client to send data ending with `delimiter` where the data before
+        the delimiter matches `pattern`, a bytes regular expression, in full. The
+        `re.Match` is in the returned message's `match`.
+        """
         self.check_not_stopped()
-        self.expecations_queue.put_nowait(SendFrame(self, payload))
+        received = ReceivedMessage()
+        self.expecations_queue.put_nowait(ExpectMessage(
+            self,
+            "expect_regex",
+            as_delimiter(delimiter),
+            timeout,
+            received,
+            pattern=as_pattern(pattern),
+        ))
+        return received
+
+    def expect_message(self, expected, message_format=DEFAULT_FORMAT, count=1, timeout=1):
+        """Expect the client to send `count` messages that, once decoded, match
+        `expected`. See `messages` for how values are matched, e.g. with `ANY`.
+
+        `message_format` is a `messages.MessageFormat` or the name of one:
+        `"json-lines"`, `"lines"`, `"json-frames"`, `"frames"` or `"msgpack-frames"`
+        (which requires the `msgpack` package). Frames use this server's codec.
+        `timeout` applies to each message.
+        """
+        self.check_not_stopped()
+        if isinstance(count, bool) or not isinstance(count, int) or count <= 0:
+            raise ValueError(f"`count` must be a positive integer, not {count!r}")
+        self.expecations_queue.put_nowait(ExpectMessages(
+            self, get_format(message_format), expected, count, check_timeout(timeout)
+        ))
+
+    def expect_frames_unordered(self, payloads, timeout=1):
+        """Expect a frame for each of `payloads`, in any order, e.g. the requests of a
+        pipelining client that reorders them. Payloads can be repeated. `timeout`
+        applies to each frame.
+        """
+        self.check_not_stopped()
+        payloads = [bytes(as_bytes(payload, "payloads")) for payload in payloads]
+        if not payloads:
+            raise ValueError("`payloads` must not be empty")
+        self.expecations_queue.put_nowait(ExpectFramesUnordered(
+            self, payloads, check_timeout(timeout)
+        ))
+
+    def expect_any_of(self, payloads, timeout=1):
+        """Expect a single frame with any of `payloads`."""
+        self.check_not_stopped()
+        payloads = frozenset(bytes(as_bytes(payload, "payloads")) for payload in payloads)
+        if not payloads:
+            raise ValueError("`payloads` must not be empty")
+        self.expecations_queue.put_nowait(ExpectAnyFrame(
+            self, payloads, check_timeout(timeout)
+        ))
+
+    def expect_stream(self, source, chunk_size=DEFAULT_CHUNK_SIZE, timeout=1):
+        """Expect the client to send the bytes from `source`, which is compared with the
+        incoming data `chunk_size` bytes at a time so that neither needs to be held in
+        memory in full. See `streaming.iter_expected_chunks` for the types of `source`.
+        `source` can also be a `streaming.StreamDigest`. `timeout` applies to each chunk.
+        """
+        self.check_not_stopped()
+        self.expecations_queue.put_nowait(ExpectStream(
+            self, source=source, chunk_size=chunk_size, timeout=timeout
+        ))
+
+    def expect_bytes_digest(
+        self, length, digest=None, algorithm="sha256", chunk_size=DEFAULT_CHUNK_SIZE,
+        chunk_digests=None, timeout=1,
+    ):
+        """Expect `length` bytes with the given digests. `digest` can also be a whole
+        `streaming.StreamDigest`, in which case its algorithm, chunk size and chunk
+        digests are used.
+        """
+        self.check_not_stopped()
+        source = stream_digest(length, digest, algorithm, chunk_size, chunk_digests)
+        self.expecations_queue.put_nowait(ExpectStream(
+            self, source=source, chunk_size=source.chunk_size, timeout=timeout,
+        ))
+
+    def expect_frame_digest(
+        self, length, digest=None, algorithm="sha256", chunk_size=DEFAULT_CHUNK_SIZE,
+        chunk_digests=None, timeout=1,
+    ):
+        """Like `expect_bytes_digest` but for the payload of a frame."""
+        self.check_not_stopped()
+        source = stream_digest(length, digest, algorithm, chunk_size, chunk_digests)
+        self.expecations_queue.put_nowait(ExpectFrameDigest(
+            self, source=source, chunk_size=source.chunk_size, timeout=timeout,
+        ))
+
+    def send_frame(self, payload, delay=0):
+        """Send a frame containing `payload` to the client, after waiting `delay`
+        seconds.
+        """
+        self.check_not_stopped()
+        self.expecations_queue.put_nowait(SendFrame(self, payload, check_delay(delay)))
+
+    def run_script(self, script):
+        """Run a whole conversation, given as a `script.Script` or as the list of steps
+        that a `Script` is built from, as a single expectation. The script is compiled
+        for this server's codec the first time and the plan is reused after that.
+        """
+        self.check_not_stopped()
+        if not isinstance(script, Script):
+            script = Script(script)
+        self.expecations_queue.put_nowait(RunScript(self, script.compile(self.codec)))
+
+    def serve_repeated(self, request, response, count, timeout=1):
+        """Expect `request` from the client and reply with `response`, `count` times,
+        without an expectation per exchange. `timeout` applies to each request.
+
+        Return a `stats.LatencyReport` of the time from each response to the next
+        request, i.e. the client's turnaround time, so it has `count - 1` samples. It
+        is filled in as the exchanges happen so assert on its percentiles after
+        `join()`.
+        """
+        self.check_not_stopped()
+        if isinstance(count, bool) or not isinstance(count, int) or count <= 0:
+            raise ValueError(f"`count` must be a positive integer, not {count!r}")
+        report = LatencyReport()
+        self.expecations_queue.put_nowait(ServeRepeated(
+            self,
+            as_bytes(request, "request"),
+            as_bytes(response, "response"),
+            count,
+            timeout,
+            report,
+        ))
+        return report
 
     def expect_disconnect(self, timeout=1):
         self.check_not_stopped()
+        if self.connections:
+            for connection in self.connections:
+                if not connection.join_already_failed:
+                    connection.expect_disconnect(timeout)
+            return
         self.expecations_queue.put_nowait(ExpectIsConnected(self))
         self.expecations_queue.put_nowait(ExpectClientCalledWriterClose(self, timeout))
         self.expecations_queue.put_nowait(ExpectClientCalledWriterWaitClosed(self, timeout))
         self.expecations_queue.put_nowait(ExpectReadZeroBytes(self, timeout))
         self.expecations_queue.put_nowait(ExpectClientReadAllSentBytes(self, timeout))
 
+    # Handlers reply to whatever the client sends, in any order, without an expectation
+    # per message. A message that no handler matches is left for the expectations. A
+    # handler is called with the message and returns the reply, or `None` for no reply,
+    # or an awaitable of the reply. Handlers are tried in the order in which they were
+    # added and all of them must read the same kind of message.
+
+    def on_frame(self, matcher, handler):
+        """Reply to each frame whose payload matches `matcher` with a frame containing
+        the payload that `handler` returns. See `messages` for the kinds of matcher,
+        e.g. bytes, a compiled pattern, a predicate or `ANY`.
+        """
+        self.add_handler(Handler("on_frame", compile_matcher(matcher), handler))
+
+    def on_bytes(self, matcher, handler, delimiter=b"\n"):
+        """Reply to each message ending with `delimiter` that, without the delimiter,
+        matches `matcher`, with the bytes that `handler` returns.
+        """
+        self.add_handler(Handler(
+            "on_bytes", compile_matcher(matcher), handler, as_delimiter(delimiter)
+        ))
+
+    def add_handler(self, handler):
+        self.check_not_stopped()
+        if self.handlers and self.handlers[0].delimiter != handler.delimiter:
+            raise ValueError(
+                "All the handlers of a server must read frames, or data ending with the "
+                "same delimiter"
+            )
+        self.handlers.append(handler)
+        if self.connections:
+            for connection in self.connections:
+                connection.add_handler(handler)
+        elif self.connected and self.dispatcher_task is None:
+            self.expecations_queue.put_nowait(StartHandlers(self))
+
+    def pause_reading(self):
+        """Stop reading from the client so that its writes back up."""
+        self.check_not_stopped()
+        self.expecations_queue.put_nowait(ThrottleReading(self, 0))
+
+    def resume_reading(self):
+        """Read from the client at full speed again."""
+        self.check_not_stopped()
+        self.expecations_queue.put_nowait(ThrottleReading(self, None))
+
+    def throttle_reading(self, rate):
+        """Read from the client at no more than `rate` bytes per second."""
+        self.check_not_stopped()
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)) or rate <= 0:
+            raise ValueError(f"`rate` must be a positive number, not {rate!r}")
+        self.expecations_queue.put_nowait(ThrottleReading(self, rate))
+
+    def expect_client_paused(self, timeout=1):
+        """Expect the client's transport to pause writing because its write buffer has
+        reached the high-water mark. Pauses and resumes are expected in the order in
+        which they happen and are all recorded in `flow_control_transitions`.
+        """
+        self.check_not_stopped()
+        self.expecations_queue.put_nowait(ExpectClientFlowControl(self, True, timeout))
+
+    def expect_client_resumed(self, timeout=1):
+        """Expect the client's transport to resume writing after a pause."""
+        self.check_not_stopped()
+        self.expecations_queue.put_nowait(ExpectClientFlowControl(self, False, timeout))
+
+    def shape(self, chunk_size=None, bandwidth=None, chunk_delay=0, burst=None):
+        """Shape the sends that follow. See `shaping.SendShaping` for the parameters.
+        Call it with no arguments to go back to sending as fast as possible. While
+        sends are shaped, `join` waits until they have been written.
+        """
+        self.check_not_stopped()
+        shaping = None
+        if chunk_size is not None or bandwidth is not None or chunk_delay or burst:
+            shaping = SendShaping(chunk_size, bandwidth, chunk_delay, burst)
+        self.expecations_queue.put_nowait(Shape(self, shaping))
+
     def disconnect(self):
         self.check_not_stopped()
         self.expecations_queue.put_nowait(Disconnect(self))
 
 
+TRANSPORTS = ("tcp", "unix", "socketpair")
+
+
+class BrokeredPool:
+    """The listening sockets of a `pytest-xdist` worker, which are bound by the
+    `broker.ListenerBroker` of the controller and shared by all of the worker's tests.
+
+    `asyncio` servers belong to the event loop that created them and `pytest-asyncio`
+    creates a new event loop for every test, so the pool holds the listening sockets
+    themselves. Each `MockTcpServer` serves a duplicate of a pooled socket and closes
+    that duplicate when it stops, leaving the pooled socket listening for the next
+    test. A socket is only requested from the broker when none is idle.
+    """
+
+    def __init__(self, client):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.client = client
+        self.sockets = []
+        self.idle_sockets = []
+
+    def acquire(self):
+        if self.idle_sockets:
+            return self.idle_sockets.pop()
+        sock = self.client.acquire()
+        self.logger.debug("acquired pooled socket on port %s", sock.getsockname()[1])
+        self.sockets.append(sock)
+        return sock
+
+    def release(self, sock):
+        # A connection still waiting in the backlog belongs to the test that has just
+        # finished. Discard it so that the next test doesn't accept it.
+        sock.setblocking(False)
+        while True:
+            try:
+                connection, _ = sock.accept()
+            except BlockingIOError:
+                break
+            self.logger.debug("discarding stale connection on pooled socket")
+            connection.close()
+        self.idle_sockets.append(sock)
+
+    def close(self):
+        for sock in self.sockets:
+            sock.close()
+        self.sockets = []
+        self.idle_sockets = []
+        self.client.close()
+
+
 class MockTcpServerFactory:
 
-    def __init__(self, unused_tcp_port_factory, mocker):
+    def __init__(self, unused_tcp_port_factory, mocker, pool=None):
         self.logger = logging.getLogger(self.__class__.__name__)
+        # No longer used to pick ports (see `__call__`) but kept for existing callers
         self.unused_tcp_port_factory = unused_tcp_port_factory
         self.mocker = mocker
+        self.pool = pool
+        self.pooled_sockets = []
         self.servers = {}
+        self.recorders = {}
         self.original_open_connection = asyncio.open_connection
         self.mocker.patch(
             "asyncio.open_connection",
@@ -712,22 +2584,112 @@ class MockTcpServerFactory:
             "create_connection",
             self.intercept_create_connection
         )
+        # Created when the first Unix socket server is
+        self.unix_directory = None
+        self.unix_socket_ids = itertools.count()
+        self.socketpair_ids = itertools.count()
+        if hasattr(asyncio, "open_unix_connection"):
+            self.original_open_unix_connection = asyncio.open_unix_connection
+            self.mocker.patch(
+                "asyncio.open_unix_connection",
+                self.intercept_open_unix_connection
+            )
+            self.original_create_unix_connection = \
+                asyncio.get_event_loop().create_unix_connection
+            self.mocker.patch.object(
+                asyncio.get_event_loop(),
+                "create_unix_connection",
+                self.intercept_create_unix_connection
+            )
 
-    async def __call__(self):
-        server = MockTcpServer(self.unused_tcp_port_factory(), self.mocker)
+    async def __call__(self, connections=None, codec=None, shaping=None, transport="tcp"):
+        """Start a server. `transport` is "tcp", "unix" for a Unix domain socket at
+        `server.service_path` or "socketpair" for connections made with
+        `server.open_connection()` over `socket.socketpair()`. The last two use no TCP
+        port. The servers are keyed in `servers` by port, path or a made-up key.
+        """
+        if transport == "unix":
+            server = MockTcpServer(
+                None,
+                self.mocker,
+                connections=connections,
+                codec=codec,
+                shaping=shaping,
+                transport=transport,
+                service_path=self.new_unix_socket_path("server"),
+            )
+            await server.start()
+            self.servers[server.service_path] = server
+            return server
+        if transport == "socketpair":
+            server = MockTcpServer(
+                None,
+                self.mocker,
+                connections=connections,
+                codec=codec,
+                shaping=shaping,
+                transport=transport,
+            )
+            await server.start()
+            self.servers[("socketpair", next(self.socketpair_ids))] = server
+            return server
+        if self.pool is not None:
+            sock = self.pool.acquire()
+            self.pooled_sockets.append(sock)
+            server = MockTcpServer(
+                sock.getsockname()[1],
+                self.mocker,
+                sock=sock.dup(),
+                connections=connections,
+                codec=codec,
+                shaping=shaping,
+                transport=transport,
+            )
+        else:
+            # Bound here, to a port that the kernel picks, rather than to a port from
+            # `unused_tcp_port_factory` so that there is no window between finding a
+            # free port and binding it in which another process, such as another
+            # `pytest-xdist` worker, can take it.
+            sock = broker.create_listening_socket(max(100, connections or 0))
+            server = MockTcpServer(
+                sock.getsockname()[1],
+                self.mocker,
+                sock=sock,
+                connections=connections,
+                codec=codec,
+                shaping=shaping,
+                transport=transport,
+            )
         await server.start()
         self.servers[server.service_port] = server
         return server
 
+    def record(self, port, path):
+        """Record the first connection that the client makes to the real server on
+        `port` to the file `path`. Load the recording with `recording.Recording` and
+        replay it with `Recording.to_script`.
+        """
+        recorder = SessionRecorder(path)
+        self.recorders[port] = recorder
+        return recorder
+
     async def intercept_open_connection(self, host, port):
         client_reader, client_writer = await self.original_open_connection(host, port)
-        server = self.servers[port]
-        server.register_client_streams(client_reader, client_writer)
+        if port not in self.recorders:
+            server = self.servers[port]
+            server.register_client_streams(client_reader, client_writer)
         return client_reader, client_writer
 
     async def intercept_create_connection(
         self, protocol_factory, host, port, *args, **kwargs
     ):
+        recorder = self.recorders.get(port)
+        if recorder is not None:
+            return await self.orignal_create_connection(
+                lambda: self.recording_protocol(recorder, protocol_factory()),
+                host, port, *args, **kwargs
+            )
+
         server = self.servers[port]
 
         def factory():
@@ -737,8 +2699,67 @@ class MockTcpServerFactory:
             factory, host, port, *args, **kwargs
         )
 
+    def new_unix_socket_path(self, kind):
+        # Kept short because of the limit of about 100 bytes on Unix socket paths
+        if self.unix_directory is None:
+            self.unix_directory = tempfile.mkdtemp(prefix="tcpserver-")
+        return os.path.join(self.unix_directory, f"{kind}-{next(self.unix_socket_ids)}")
+
+    async def intercept_open_unix_connection(self, path=None, *args, **kwargs):
+        client_reader, client_writer = await self.original_open_unix_connection(
+            path, *args, **kwargs
+        )
+        server = self.servers.get(path)
+        if server is not None:
+            # Connecting to a Unix socket completes without waiting for the server to
+            # accept the connection. Until it has, the client's streams can't be
+            # matched with the server's in multi-connection mode and reads would go
+            # uncaptured.
+            address = client_writer.get_extra_info("sockname")
+            await server.accepted(address)
+            del server.accepted_clients[address]
+            server.register_client_streams(client_reader, client_writer)
+        return client_reader, client_writer
+
+    async def intercept_create_unix_connection(
+        self, protocol_factory, path=None, *args, **kwargs
+    ):
+        server = self.servers.get(path)
+        if server is None or kwargs.get("sock") is not None:
+            return await self.original_create_unix_connection(
+                protocol_factory, path, *args, **kwargs
+            )
+
+        # A client's Unix socket is unnamed unless it is bound. It's bound to a path
+        # of its own so that, as with TCP, the server and the client can tell which
+        # connection is which by its address.
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.setblocking(False)
+            sock.bind(self.new_unix_socket_path("client"))
+            await asyncio.get_running_loop().sock_connect(sock, path)
+        except BaseException:
+            sock.close()
+            raise
+
+        def factory():
+            return server.protocol_factory(protocol_factory())
+
+        return await self.original_create_unix_connection(
+            factory, *args, sock=sock, **kwargs
+        )
+
+    def recording_protocol(self, recorder, original_protocol):
+        if recorder.connected:
+            self.logger.debug("not recording another connection to %s", recorder.path)
+            return original_protocol
+        recorder.connected = True
+        return RecordingProtocol(recorder, original_protocol)
+
     async def stop(self):
         __tracebackhide__ = True
+        for recorder in self.recorders.values():
+            recorder.close()
         errors = []
         for server in self.servers.values():
             try:
@@ -750,14 +2771,189 @@ class MockTcpServerFactory:
                 # is a subclass of `BaseException`. `OutcomeException` is not public
                 # so we can rely on it's existence.
                 errors.append(e)
+        for sock in self.pooled_sockets:
+            self.pool.release(sock)
+        if self.unix_directory is not None:
+            shutil.rmtree(self.unix_directory, ignore_errors=True)
         if errors:
             raise errors[0]
 
+    def stats(self):
+        """Yield `(connection index, ConnectionStats)` for each connection of each
+        server. The index is `None` for a single-connection server.
+        """
+        for server in self.servers.values():
+            if server.connections:
+                for index, connection in enumerate(server.connections):
+                    yield index, connection.stats
+            else:
+                yield None, server.stats
+
+
+def pytest_addoption(parser):
+    parser.addini(
+        "tcpserver_bytes_repr_limit",
+        default=str(rendering.DEFAULT_MAX_LENGTH),
+        help="Payloads longer than this are truncated in failure messages and debug logs.",
+    )
+    parser.addini(
+        "tcpserver_broker",
+        type="bool",
+        default=False,
+        help="Under pytest-xdist, have the controller bind the listening sockets of all "
+             "workers' `tcpserver` fixtures.",
+    )
+    group = parser.getgroup("tcpclient")
+    group.addoption(
+        "--tcpserver-stats",
+        action="store_true",
+        default=False,
+        help="Report the traffic on each `tcpserver` connection at the end of the session.",
+    )
+    group.addoption(
+        "--tcpserver-stats-json",
+        metavar="PATH",
+        default=None,
+        help="Write the traffic on each `tcpserver` connection to PATH as JSON.",
+    )
+
+
+previous_bytes_repr_limit_key = pytest.StashKey[int]()
+
+# `(test id, connection index, ConnectionStats)` for each connection, if stats have
+# been asked for
+stats_records_key = pytest.StashKey[list]()
+
+# The records, as returned by `stats.as_record`, that `pytest-xdist` workers sent to
+# the controller
+worker_stats_records_key = pytest.StashKey[list]()
+
+listener_broker_key = pytest.StashKey[broker.ListenerBroker]()
+
+# The key of the broker's path in the `workerinput` of `pytest-xdist` workers
+BROKER_PATH = "tcpserver_broker_path"
+
+# The key of the stats records in the `workeroutput` of `pytest-xdist` workers
+STATS_RECORDS = "tcpserver_stats_records"
+
+
+class ListenerBrokerHooks:
+    """`pytest-xdist` hooks, registered only when it is in use."""
+
+    def __init__(self, listener_broker):
+        self.listener_broker = listener_broker
+
+    def pytest_configure_node(self, node):
+        node.workerinput[BROKER_PATH] = self.listener_broker.path
+
+
+class StatsHooks:
+    """`pytest-xdist` hooks that collect the stats records of the workers on the
+    controller. Registered only when it is in use.
+    """
+
+    def __init__(self, records):
+        self.records = records
+
+    def pytest_testnodedown(self, node, error):
+        self.records.extend(getattr(node, "workeroutput", {}).get(STATS_RECORDS, []))
+
+
+def is_xdist_controller(config):
+    # Only the controller of a `pytest-xdist` run has `numprocesses` and no
+    # `workerinput`
+    return bool(config.getoption("numprocesses", None)) and \
+        not hasattr(config, "workerinput")
+
+
+def pytest_configure(config):
+    # `pytester` runs nested sessions in the same process so the previous limit is
+    # restored when this session ends.
+    config.stash[previous_bytes_repr_limit_key] = rendering.max_length
+    rendering.configure(int(config.getini("tcpserver_bytes_repr_limit")))
+    if config.getoption("tcpserver_stats") or config.getoption("tcpserver_stats_json"):
+        config.stash[stats_records_key] = []
+        config.stash[worker_stats_records_key] = []
+        if is_xdist_controller(config):
+            config.pluginmanager.register(StatsHooks(config.stash[worker_stats_records_key]))
+    if config.getini("tcpserver_broker") and is_xdist_controller(config):
+        if not broker.is_supported():
+            raise pytest.UsageError("`tcpserver_broker` needs Unix domain sockets")
+        listener_broker = broker.ListenerBroker()
+        config.stash[listener_broker_key] = listener_broker
+        config.pluginmanager.register(ListenerBrokerHooks(listener_broker))
+
+
+def pytest_unconfigure(config):
+    rendering.configure(config.stash[previous_bytes_repr_limit_key])
+    listener_broker = config.stash.get(listener_broker_key, None)
+    if listener_broker is not None:
+        listener_broker.close()
+
+
+def stats_records(config):
+    """Return the records of this process's connections and of those that workers
+    sent, or `None` if stats haven't been asked for.
+    """
+    records = config.stash.get(stats_records_key, None)
+    if records is None:
+        return None
+    return [
+        *(as_record(test_id, index, stats) for test_id, index, stats in records),
+        *config.stash[worker_stats_records_key],
+    ]
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    records = stats_records(config)
+    if records is None:
+        return
+    workeroutput = getattr(config, "workeroutput", None)
+    if workeroutput is not None:
+        # A `pytest-xdist` worker. The controller reports the stats of all workers.
+        workeroutput[STATS_RECORDS] = records
+        return
+    path = config.getoption("tcpserver_stats_json")
+    if path is not None:
+        with open(path, "w") as f:
+            json.dump(records, f, indent=2)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not config.getoption("tcpserver_stats") or hasattr(config, "workerinput"):
+        return
+    terminalreporter.write_sep("=", "tcpserver stats")
+    for line in summary_lines(stats_records(config)):
+        terminalreporter.write_line(line)
+
+
+@pytest.fixture(scope="session")
+def tcpserver_broker_pool(request):
+    """The `BrokeredPool` of a `pytest-xdist` worker when `tcpserver_broker` is in use,
+    otherwise `None`.
+    """
+    broker_path = getattr(request.config, "workerinput", {}).get(BROKER_PATH)
+    if broker_path is None:
+        yield None
+        return
+    pool = BrokeredPool(broker.BrokerClient(broker_path))
+    yield pool
+    pool.close()
+
 
 @pytest_asyncio.fixture
-async def tcpserver_factory(unused_tcp_port_factory, mocker):
-    factory = MockTcpServerFactory(unused_tcp_port_factory, mocker)
+async def tcpserver_factory(request, unused_tcp_port_factory, mocker, tcpserver_broker_pool):
+    factory = MockTcpServerFactory(
+        unused_tcp_port_factory, mocker, pool=tcpserver_broker_pool
+    )
     yield factory
+    records = request.config.stash.get(stats_records_key, None)
+    if records is not None:
+        # Collected before stopping because stopping can fail. The stats of each
+        # connection are still updated until it has stopped.
+        for index, stats in factory.stats():
+            records.append((request.node.nodeid, index, stats))
     await factory.stop()
 
 
@@ -0,0 +1,150 @@
+"""Recordings of the traffic between a client and a real server, for replaying with
+`tcpserver`.
+
+A recording file starts with `MAGIC` and is followed by one record per chunk of data
+in the order in which the chunks were seen. Each record is a `RECORD_HEADER` (the
+direction, the time in seconds since the recording started and the length of the
+chunk) followed by the chunk itself.
+"""
+import logging
+import mmap
+import os
+import struct
+import time
+
+from dataclasses import dataclass
+
+from .script import ExpectBytesStep, Script, SendStep, as_bytes, check_timeout
+
+MAGIC = b"TCPREC\x00\x01"
+
+RECORD_HEADER = struct.Struct("<BdI")
+
+SENT_BY_CLIENT = 0
+SENT_BY_SERVER = 1
+
+
+@dataclass(frozen=True)
+class Chunk:
+
+    direction: int
+    timestamp: float
+    data: memoryview
+
+
+class SessionRecorder:
+    """Writes the chunks of one connection to a recording file as they are seen."""
+
+    def __init__(self, path):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.start_time = None
+        # Only the first connection is recorded
+        self.connected = False
+
+    def record(self, direction, data):
+        if not data:
+            return
+        now = time.monotonic()
+        if self.start_time is None:
+            self.start_time = now
+        self.file.write(RECORD_HEADER.pack(direction, now - self.start_time, len(data)))
+        self.file.write(data)
+
+    def close(self):
+        """Finish the recording. It is closed anyway when the test ends."""
+        self.file.close()
+
+
+class Recording:
+    """A recording file, memory mapped. The data of each chunk is a read-only
+    `memoryview` of the mapping so loading and replaying a recording doesn't copy it.
+
+    Close it, or use it as a context manager, when it is no longer needed.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < len(MAGIC):
+                raise ValueError(f"{path} is not a recording")
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mapping)
+        self.chunks = []
+        try:
+            if self.view[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a recording")
+            self.chunks = list(parse_chunks(self.view, len(MAGIC)))
+        except ValueError:
+            self.close()
+            raise
+
+    def close(self):
+        """Unmap the file. The chunks can't be used afterwards. Scripts made by
+        `to_script` share the mapping, so if any are still around it is only unmapped
+        once they are gone too.
+        """
+        if self.mapping is None:
+            return
+        for chunk in self.chunks:
+            chunk.data.release()
+        self.chunks = []
+        self.view.release()
+        try:
+            self.mapping.close()
+        except BufferError:
+            # Still exported to a script
+            pass
+        self.mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def to_script(self, timeout=1, time_scale=0):
+        """Return a `Script` in which the chunks sent by the client are expected with
+        `expect_bytes` and the chunks sent by the server are sent with `send_bytes`.
+        Each chunk stays a separate step.
+
+        With a `time_scale` of 0, the server sends as soon as it can. Otherwise, it
+        reproduces the recorded timing with the intervals multiplied by `time_scale`,
+        so 1 is real time and 0.01 is a hundred times faster. The server sends each
+        chunk at its recorded interval after the chunk that the server last received,
+        and each expectation's `timeout` is extended by the interval since the chunk
+        before it.
+        """
+        if time_scale < 0:
+            raise ValueError(f"`time_scale` must not be negative, not {time_scale!r}")
+        script = Script(merge=False)
+        previous_timestamp = 0
+        for chunk in self.chunks:
+            at = None
+            chunk_timeout = timeout
+            if time_scale:
+                at = chunk.timestamp * time_scale
+                chunk_timeout += (chunk.timestamp - previous_timestamp) * time_scale
+            previous_timestamp = chunk.timestamp
+            if chunk.direction == SENT_BY_CLIENT:
+                script.add(ExpectBytesStep(
+                    as_bytes(chunk.data, "data"), check_timeout(chunk_timeout), at
+                ))
+            else:
+                script.add(SendStep(as_bytes(chunk.data, "data"), at=at))
+        return script
+
+
+def parse_chunks(view, offset):
+    while offset < len(view):
+        if len(view) - offset < RECORD_HEADER.size:
+            raise ValueError(f"Truncated record header at offset {offset}")
+        direction, timestamp, length = RECORD_HEADER.unpack_from(view, offset)
+        if direction not in (SENT_BY_CLIENT, SENT_BY_SERVER):
+            raise ValueError(f"Invalid direction {direction} in record at offset {offset}")
+        start = offset + RECORD_HEADER.size
+        if len(view) - start < length:
+            raise ValueError(f"Truncated record at offset {offset}")
+        yield Chunk(direction, timestamp, view[start:start + length])
+        offset = start + length
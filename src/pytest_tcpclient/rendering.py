@@ -0,0 +1,109 @@
+"""Bounded rendering of bytes for failure messages and debug logs.
+
+Payloads can be many megabytes so they are never rendered in full. Anything longer
+than `max_length` bytes is truncated and, where two payloads differ, the first
+difference is shown as a hexdump.
+"""
+from .streaming import first_difference
+
+DEFAULT_MAX_LENGTH = 64
+
+# Can be changed with the `tcpserver_bytes_repr_limit` ini option
+max_length = DEFAULT_MAX_LENGTH
+
+HEXDUMP_WIDTH = 16
+
+# Rows of the hexdump shown before and after the row containing the first difference
+HEXDUMP_CONTEXT_ROWS = 1
+
+# How many different payloads `render_counts` lists before summarising the rest
+MAX_LISTED_PAYLOADS = 8
+
+
+def configure(limit):
+    global max_length
+    max_length = limit
+
+
+def is_truncated(data):
+    return len(data) > max_length
+
+
+def render_bytes(data):
+    """Return the `repr` of `data` truncated to `max_length` bytes."""
+    if not is_truncated(data):
+        return repr(bytes(data))
+    return f"{bytes(data[:max_length])!r}... ({len(data)} bytes)"
+
+
+def render_value(value):
+    """Return the `repr` of any value truncated to `max_length` characters."""
+    text = repr(value)
+    if len(text) <= max_length:
+        return text
+    return f"{text[:max_length]}... ({len(text)} characters)"
+
+
+def render_counts(counts):
+    """Render a `collections.Counter` of payloads, most common first, listing no more
+    than `MAX_LISTED_PAYLOADS` of them.
+    """
+    items = counts.most_common()
+    parts = [
+        render_bytes(payload) if count == 1 else f"{render_bytes(payload)} x{count}"
+        for payload, count in items[:MAX_LISTED_PAYLOADS]
+    ]
+    if len(items) > MAX_LISTED_PAYLOADS:
+        parts.append(f"and {len(items) - MAX_LISTED_PAYLOADS} more")
+    return ", ".join(parts)
+
+
+class LazyBytes:
+    """Defers `render_bytes` until formatted, so that debug logging of a payload costs
+    nothing unless debug logging is enabled.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return render_bytes(self.data)
+
+
+def hexdump(data, start, end):
+    rows = []
+    for row_start in range(start, min(end, len(data)), HEXDUMP_WIDTH):
+        row = bytes(data[row_start:row_start + HEXDUMP_WIDTH])
+        hex_bytes = " ".join(f"{byte:02x}" for byte in row)
+        text = "".join(chr(byte) if 32 <= byte < 127 else "." for byte in row)
+        rows.append(f"  {row_start:08x}  {hex_bytes:<{3 * HEXDUMP_WIDTH - 1}}  |{text}|")
+    return rows or ["  (no data)"]
+
+
+def render_difference(expected, actual):
+    """Describe where `actual` first differs from `expected`: the offset, the lengths
+    and a hexdump of both around the offset.
+    """
+    offset = first_difference(expected, actual)
+    row = offset - offset % HEXDUMP_WIDTH
+    start = max(0, row - HEXDUMP_CONTEXT_ROWS * HEXDUMP_WIDTH)
+    end = row + (HEXDUMP_CONTEXT_ROWS + 1) * HEXDUMP_WIDTH
+    return "\n".join([
+        f"First difference at offset {offset}. "
+        f"Expected {len(expected)} bytes, actually got {len(actual)} bytes.",
+        "Expected:",
+        *hexdump(expected, start, end),
+        "Actual:",
+        *hexdump(actual, start, end),
+    ])
+
+
+def render_mismatch(message, expected, actual):
+    """Append the difference between `expected` and `actual` to `message` if either
+    of them was too long to render in full.
+    """
+    if is_truncated(expected) or is_truncated(actual):
+        return message + "\n" + render_difference(expected, actual)
+    return message
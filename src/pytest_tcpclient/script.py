@@ -0,0 +1,170 @@
+from dataclasses import dataclass, field
+from numbers import Real
+
+from .capture import is_read_only_mapping
+from .framing import get_codec
+
+
+# `delay` is how long to wait before sending. `at` is only set by a timed replay. It is
+# the time of the step in the (scaled) recording. A send with an `at` is scheduled
+# relative to the last byte expectation with an `at`.
+
+
+@dataclass(frozen=True)
+class SendStep:
+
+    data: bytes
+    delay: float = 0
+    at: float = None
+    # The number of frames in `data`, for `MockTcpServer.stats`
+    frames: int = field(default=0, compare=False)
+
+
+@dataclass(frozen=True)
+class SendFrameStep:
+
+    payload: bytes
+    delay: float = 0
+
+
+@dataclass(frozen=True)
+class ExpectBytesStep:
+
+    data: bytes
+    timeout: float
+    at: float = None
+
+
+@dataclass(frozen=True)
+class ExpectFrameStep:
+
+    payload: bytes
+    timeout: float
+
+
+@dataclass(frozen=True)
+class Plan:
+    """The compiled form of a `Script` for one codec. `steps` contains only `SendStep`,
+    `ExpectBytesStep` and `ExpectFrameStep`. Unless the script was created with
+    `merge=False`, no two sends or two byte expectations are next to each other.
+    """
+
+    steps: tuple
+    codec: object
+
+
+def as_bytes(data, name):
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        raise TypeError(f"`{name}` must be bytes-like, not {type(data).__name__}")
+    if is_read_only_mapping(data):
+        return data.cast("B")
+    # Copied so that the caller can't change a compiled plan
+    return bytes(data)
+
+
+def check_timeout(timeout):
+    if isinstance(timeout, bool) or not isinstance(timeout, Real) or timeout <= 0:
+        raise ValueError(f"`timeout` must be a positive number, not {timeout!r}")
+    return timeout
+
+
+def check_delay(delay):
+    if isinstance(delay, bool) or not isinstance(delay, Real) or delay < 0:
+        raise ValueError(f"`delay` must be a non-negative number, not {delay!r}")
+    return delay
+
+
+class Script:
+    """A whole conversation with the client, built once and then run by any number of
+    servers with `MockTcpServer.run_script`.
+
+    Build it with the methods of the same names as those of `MockTcpServer` or from a
+    list of `(method_name, *args)` tuples, e.g. `("expect_bytes", b"Hello", 2)`. Each
+    step is validated as it is added. If `merge` is false, adjacent steps are not
+    merged when the script is compiled.
+    """
+
+    STEP_NAMES = ("expect_bytes", "send_bytes", "expect_frame", "send_frame")
+
+    def __init__(self, steps=(), merge=True):
+        self.steps = []
+        self.merge = merge
+        # Compiled plans by codec
+        self.plans = {}
+        for step in steps:
+            name, *args = step
+            if name not in self.STEP_NAMES:
+                raise ValueError(f"Unknown script step {name!r}")
+            getattr(self, name)(*args)
+
+    def add(self, step):
+        self.steps.append(step)
+        self.plans.clear()
+        return self
+
+    def expect_bytes(self, expected_bytes, timeout=1):
+        return self.add(ExpectBytesStep(
+            as_bytes(expected_bytes, "expected_bytes"), check_timeout(timeout)
+        ))
+
+    def send_bytes(self, data, delay=0):
+        return self.add(SendStep(as_bytes(data, "data"), check_delay(delay)))
+
+    def expect_frame(self, expected_payload, timeout=1):
+        return self.add(ExpectFrameStep(
+            as_bytes(expected_payload, "expected_payload"), check_timeout(timeout)
+        ))
+
+    def send_frame(self, payload, delay=0):
+        return self.add(SendFrameStep(as_bytes(payload, "payload"), check_delay(delay)))
+
+    def compile(self, codec=None):
+        """Return the `Plan` for `codec`. Plans are cached so compiling the same script
+        for the same codec again is free.
+        """
+        codec = get_codec(codec)
+        plan = self.plans.get(codec)
+        if plan is None:
+            plan = self.plans[codec] = Plan(
+                tuple(compile_steps(self.steps, codec, self.merge)), codec
+            )
+        return plan
+
+
+def compile_steps(steps, codec, merge=True):
+    """Merge adjacent sends, including frames, into a single `SendStep` and adjacent
+    byte expectations into a single `ExpectBytesStep`. A merged expectation allows the
+    sum of the timeouts of the expectations that it replaces. Frames are encoded even
+    if `merge` is false. A send with a delay or a step with a time is never merged into
+    the step before it.
+    """
+    groups = []
+    for step in steps:
+        if isinstance(step, SendFrameStep):
+            step = SendStep(
+                codec.encode_header(len(step.payload)) + step.payload, step.delay, frames=1
+            )
+        mergeable = merge and isinstance(step, (SendStep, ExpectBytesStep)) and \
+            not getattr(step, "delay", 0) and step.at is None
+        if mergeable and groups and type(groups[-1][0]) is type(step):
+            groups[-1].append(step)
+        else:
+            groups.append([step])
+
+    for group in groups:
+        first = group[0]
+        if len(group) == 1:
+            yield first
+        elif isinstance(first, SendStep):
+            yield SendStep(
+                b"".join(step.data for step in group),
+                first.delay,
+                first.at,
+                sum(step.frames for step in group),
+            )
+        else:
+            yield ExpectBytesStep(
+                b"".join(step.data for step in group),
+                sum(step.timeout for step in group),
+                first.at,
+            )
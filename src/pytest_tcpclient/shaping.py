@@ -0,0 +1,173 @@
+"""Shaping of the data that the mock server sends (the size of each write, a delay
+before each write and a cap on the bandwidth) and throttling of the rate at which it
+reads.
+"""
+from collections import deque
+from dataclasses import dataclass
+from numbers import Real
+
+# Waits shorter than this are not slept. The token bucket goes into debt instead and
+# the debt is repaid by the next wait that is long enough.
+MIN_SLEEP = 0.001
+
+# Without a `chunk_size`, a bandwidth-limited send is split into chunks of about this
+# many seconds' worth of data so that the data is paced rather than sent in one burst.
+PACING_INTERVAL = 0.01
+
+
+def check_positive(value, name, allow_none=True):
+    if value is None and allow_none:
+        return value
+    if isinstance(value, bool) or not isinstance(value, Real) or value <= 0:
+        raise ValueError(f"`{name}` must be a positive number, not {value!r}")
+    return value
+
+
+@dataclass(frozen=True)
+class SendShaping:
+    """How the mock server sends data.
+
+    Each send is split into writes of at most `chunk_size` bytes. `chunk_delay` seconds
+    pass before each write. `bandwidth`, in bytes per second, caps the average rate
+    over all sends. Up to `burst` bytes (by default, one chunk) can be sent at once
+    after the server has been idle.
+    """
+
+    chunk_size: int = None
+    bandwidth: float = None
+    chunk_delay: float = 0
+    burst: int = None
+
+    def __post_init__(self):
+        if self.chunk_size is not None and (
+            isinstance(self.chunk_size, bool) or not isinstance(self.chunk_size, int)
+            or self.chunk_size <= 0
+        ):
+            raise ValueError(
+                f"`chunk_size` must be a positive integer, not {self.chunk_size!r}"
+            )
+        check_positive(self.bandwidth, "bandwidth")
+        if isinstance(self.chunk_delay, bool) or not isinstance(self.chunk_delay, Real) \
+                or self.chunk_delay < 0:
+            raise ValueError(
+                f"`chunk_delay` must be a non-negative number, not {self.chunk_delay!r}"
+            )
+        check_positive(self.burst, "burst")
+
+    def effective_chunk_size(self, length):
+        if self.chunk_size is not None:
+            return self.chunk_size
+        if self.bandwidth is not None:
+            return max(1, int(self.bandwidth * PACING_INTERVAL))
+        return max(1, length)
+
+    def new_token_bucket(self, now):
+        if self.bandwidth is None:
+            return None
+        capacity = self.burst or self.effective_chunk_size(0)
+        return TokenBucket(self.bandwidth, capacity, now)
+
+
+class TokenBucket:
+    """Tokens, one per byte, accumulate at `rate` per second up to `capacity`. Sending
+    takes tokens and, if there aren't enough, the bucket goes into debt and tells the
+    sender how long to wait for the debt to be repaid.
+    """
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def consume(self, count, now):
+        """Take `count` tokens at time `now`. Return how many seconds to wait before
+        sending them.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= count
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+
+class ReadThrottle:
+    """Holds back the data received from `transport` and passes it on to `feed_data`
+    at no more than `rate` bytes per second, or not at all if `rate` is 0. While data
+    is held back, reading from the transport is paused so that the client's writes
+    back up. The end of the stream is passed on to `feed_eof` after the data.
+
+    Pausing the transport alone isn't enough because the stream reader resumes it
+    whenever its buffer has been read.
+    """
+
+    def __init__(self, transport, rate, loop, feed_data, feed_eof):
+        self.transport = transport
+        self.loop = loop
+        self.feed_data = feed_data
+        self.feed_eof = feed_eof
+        self.bucket = None
+        self.piece_size = None
+        if rate:
+            self.piece_size = max(1, int(rate * PACING_INTERVAL))
+            self.bucket = TokenBucket(rate, self.piece_size, loop.time())
+        self.backlog = deque()
+        self.eof_pending = False
+        self.feed_handle = None
+
+    def data_received(self, data):
+        self.backlog.append(memoryview(data).cast("B"))
+        self.transport.pause_reading()
+        if self.feed_handle is None:
+            self.feed()
+
+    def eof_received(self):
+        if self.backlog:
+            self.eof_pending = True
+        else:
+            self.feed_eof()
+
+    def feed(self):
+        self.feed_handle = None
+        if self.bucket is None:
+            return
+        while self.backlog:
+            piece = self.take_piece()
+            wait = self.bucket.consume(len(piece), self.loop.time())
+            if wait >= MIN_SLEEP:
+                # Paid for but held back until the rate has caught up
+                self.backlog.appendleft(piece)
+                self.feed_handle = self.loop.call_later(wait, self.feed_paid_piece)
+                return
+            self.feed_data(piece)
+        self.caught_up()
+
+    def take_piece(self):
+        data = self.backlog.popleft()
+        piece, rest = data[:self.piece_size], data[self.piece_size:]
+        if rest:
+            self.backlog.appendleft(rest)
+        return piece
+
+    def feed_paid_piece(self):
+        self.feed_data(self.backlog.popleft())
+        self.feed()
+
+    def caught_up(self):
+        self.transport.resume_reading()
+        self.feed_pending_eof()
+
+    def feed_pending_eof(self):
+        if self.eof_pending:
+            self.eof_pending = False
+            self.feed_eof()
+
+    def cancel(self):
+        """Pass on everything that has been held back."""
+        if self.feed_handle is not None:
+            self.feed_handle.cancel()
+            self.feed_handle = None
+        while self.backlog:
+            self.feed_data(self.backlog.popleft())
+        self.feed_pending_eof()
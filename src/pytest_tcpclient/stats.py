@@ -0,0 +1,190 @@
+"""Traffic metrics for each connection to a mock server."""
+import math
+
+
+class Histogram:
+    """Counts of sizes in power-of-two buckets. Bucket `n` counts the sizes from
+    `2 ** (n - 1)` to `2 ** n - 1`, so bucket 0 counts zero sizes only.
+    """
+
+    def __init__(self):
+        self.counts = []
+
+    def add(self, size):
+        bucket = size.bit_length()
+        counts = self.counts
+        if bucket >= len(counts):
+            counts.extend([0] * (bucket + 1 - len(counts)))
+        counts[bucket] += 1
+
+    def as_dict(self):
+        """Return the non-empty buckets keyed by the largest size that each holds."""
+        return {(1 << bucket) - 1: count for bucket, count in enumerate(self.counts) if count}
+
+
+class ConnectionStats:
+    """What happened on one connection. Times are those of the event loop's clock.
+
+    "Sent" and "received" are from the server's point of view. The client's reads are
+    counted by its `read`, `readexactly` and `readuntil` calls and the chunks that
+    arrive at the client by its protocol's `data_received`.
+    """
+
+    def __init__(self):
+        self.bytes_sent = 0
+        self.writes = 0
+        self.frames_sent = 0
+        self.sent_chunk_sizes = Histogram()
+
+        self.bytes_received = 0
+        self.reads = 0
+        self.frames_received = 0
+        self.received_chunk_sizes = Histogram()
+
+        self.client_reads = 0
+        self.client_bytes_read = 0
+        self.client_chunk_sizes = Histogram()
+
+        self.connected_at = None
+        self.first_byte_at = None
+        self.closed_at = None
+        # `(expectation class name, seconds)` in the order in which they were met
+        self.expectation_durations = []
+
+    def sent(self, size):
+        self.bytes_sent += size
+        self.writes += 1
+        self.sent_chunk_sizes.add(size)
+
+    def received(self, size, now):
+        if self.first_byte_at is None:
+            self.first_byte_at = now
+        self.bytes_received += size
+        self.reads += 1
+        self.received_chunk_sizes.add(size)
+
+    def client_read(self, size):
+        self.client_reads += 1
+        self.client_bytes_read += size
+
+    @property
+    def time_to_first_byte(self):
+        """Seconds from the client connecting to the server receiving its first byte."""
+        if self.connected_at is None or self.first_byte_at is None:
+            return None
+        return self.first_byte_at - self.connected_at
+
+    @property
+    def duration(self):
+        """Seconds from the client connecting to the server closing the connection."""
+        if self.connected_at is None or self.closed_at is None:
+            return None
+        return self.closed_at - self.connected_at
+
+    def as_dict(self):
+        return {
+            "bytes_sent": self.bytes_sent,
+            "writes": self.writes,
+            "frames_sent": self.frames_sent,
+            "sent_chunk_sizes": self.sent_chunk_sizes.as_dict(),
+            "bytes_received": self.bytes_received,
+            "reads": self.reads,
+            "frames_received": self.frames_received,
+            "received_chunk_sizes": self.received_chunk_sizes.as_dict(),
+            "client_reads": self.client_reads,
+            "client_bytes_read": self.client_bytes_read,
+            "client_chunk_sizes": self.client_chunk_sizes.as_dict(),
+            "time_to_first_byte": self.time_to_first_byte,
+            "duration": self.duration,
+            "expectation_durations": self.expectation_durations,
+        }
+
+
+class LatencyReport:
+    """Latencies, in seconds, of repeated exchanges. The percentiles are by the
+    nearest-rank method, so each one is one of the samples, and are `None` if there
+    are no samples.
+    """
+
+    def __init__(self):
+        self.samples = []
+        self.sorted_samples = None
+
+    def add(self, latency):
+        self.samples.append(latency)
+        self.sorted_samples = None
+
+    def __len__(self):
+        return len(self.samples)
+
+    def percentile(self, percent):
+        if not 0 < percent <= 100:
+            raise ValueError(f"`percent` must be in (0, 100], not {percent!r}")
+        if not self.samples:
+            return None
+        if self.sorted_samples is None:
+            self.sorted_samples = sorted(self.samples)
+        rank = math.ceil(percent / 100 * len(self.sorted_samples))
+        return self.sorted_samples[rank - 1]
+
+    @property
+    def p50(self):
+        return self.percentile(50)
+
+    @property
+    def p90(self):
+        return self.percentile(90)
+
+    @property
+    def p99(self):
+        return self.percentile(99)
+
+    @property
+    def max(self):
+        return self.percentile(100)
+
+    def as_dict(self):
+        return {
+            "count": len(self), "p50": self.p50, "p90": self.p90, "p99": self.p99,
+            "max": self.max,
+        }
+
+    def __str__(self):
+        return f"{len(self)} samples: p50={format_seconds(self.p50)} " + \
+            f"p90={format_seconds(self.p90)} p99={format_seconds(self.p99)} " + \
+            f"max={format_seconds(self.max)}"
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    return f"{seconds * 1000:.1f}ms"
+
+
+def as_record(test_id, index, stats):
+    """Return the stats of connection `index` of test `test_id` as a record of plain
+    values, as written to the JSON report and sent from `pytest-xdist` workers.
+    """
+    return {"test": test_id, "connection": index, **stats.as_dict()}
+
+
+def summary_lines(records):
+    """Format records, as returned by `as_record`, as a table."""
+    header = (
+        f"{'sent':>10} {'writes':>7} {'frames':>7} {'received':>10} {'reads':>7} "
+        f"{'frames':>7} {'ttfb':>9} {'duration':>9} {'slowest':>9}  test"
+    )
+    lines = [header]
+    for record in records:
+        slowest = max((d for _, d in record["expectation_durations"]), default=None)
+        name = record["test"]
+        if record["connection"] is not None:
+            name = f"{name} [connection {record['connection']}]"
+        lines.append(
+            f"{record['bytes_sent']:>10} {record['writes']:>7} {record['frames_sent']:>7} "
+            f"{record['bytes_received']:>10} {record['reads']:>7} "
+            f"{record['frames_received']:>7} "
+            f"{format_seconds(record['time_to_first_byte']):>9} "
+            f"{format_seconds(record['duration']):>9} {format_seconds(slowest):>9}  {name}"
+        )
+    return lines
@@ -0,0 +1,159 @@
+import hashlib
+import math
+import mmap
+import os
+import zlib
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class Crc32:
+    """`zlib.crc32` with the interface of a `hashlib` hash."""
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+
+def new_hash(algorithm):
+    """Return a new hash object for `algorithm`, which is `"crc32"`, one of the `xxhash`
+    algorithms (e.g. `"xxh64"`, which requires the `xxhash` package) or any algorithm
+    supported by `hashlib`.
+    """
+    if algorithm == "crc32":
+        return Crc32()
+    if algorithm.startswith("xxh"):
+        try:
+            import xxhash
+        except ImportError:
+            raise ValueError(f"The `xxhash` package is required for {algorithm!r}")
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+
+class StreamDigest:
+    """Describes an expected stream by its length and digest rather than its contents.
+    Use it when the stream is too large to hold or even to store in a file.
+
+    `chunk_hexdigests`, if given, are the digests of consecutive `chunk_size` chunks of
+    the stream. They allow a mismatch to be detected as soon as the chunk that
+    contains it has been read and for that chunk to be reported. `hexdigest` can be
+    `None` if they are given. `chunk_size` must be the size that they were calculated
+    with, so pass the whole digest returned by `of` where one is accepted rather than
+    its parts.
+    """
+
+    def __init__(
+        self, length, hexdigest=None, algorithm="sha256", chunk_size=None,
+        chunk_hexdigests=None,
+    ):
+        if hexdigest is None and chunk_hexdigests is None:
+            raise ValueError("Either `hexdigest` or `chunk_hexdigests` is required")
+        if chunk_hexdigests is not None and chunk_size is None:
+            raise ValueError("`chunk_size` is required with `chunk_hexdigests`")
+        if chunk_hexdigests is not None:
+            chunks = math.ceil(length / chunk_size)
+            if len(chunk_hexdigests) != chunks:
+                raise ValueError(
+                    f"A stream of {length} bytes has {chunks} chunks of {chunk_size} bytes "
+                    f"but {len(chunk_hexdigests)} chunk digests were given. Were they "
+                    "calculated with a different `chunk_size`?"
+                )
+        self.length = length
+        self.hexdigest = hexdigest
+        self.algorithm = algorithm
+        self.chunk_size = chunk_size
+        self.chunk_hexdigests = chunk_hexdigests
+
+    @classmethod
+    def of(cls, source, algorithm="sha256", chunk_size=DEFAULT_CHUNK_SIZE):
+        """Calculate the digests of `source`, which can be anything accepted by
+        `iter_expected_chunks`. Do it once, save the result and use it in tests
+        instead of `source`.
+        """
+        digest = new_hash(algorithm)
+        chunk_hexdigests = []
+        length = 0
+
+        def add_chunk(chunk):
+            chunk_digest = new_hash(algorithm)
+            chunk_digest.update(chunk)
+            chunk_hexdigests.append(chunk_digest.hexdigest())
+
+        # The chunks of an iterable source can be any size so they are regrouped into
+        # exactly `chunk_size` chunks, which is how the stream will be read.
+        pending = bytearray()
+        for chunk in iter_expected_chunks(source, chunk_size):
+            digest.update(chunk)
+            length += len(chunk)
+            pending += chunk
+            if len(pending) >= chunk_size:
+                add_chunk(pending[:chunk_size])
+                del pending[:chunk_size]
+        if pending:
+            add_chunk(pending)
+        return cls(length, digest.hexdigest(), algorithm, chunk_size, chunk_hexdigests)
+
+    def new_hash(self):
+        return new_hash(self.algorithm)
+
+
+def iter_expected_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the contents of `source` in chunks of at most `chunk_size` bytes.
+
+    `source` is a bytes-like object, the path of a file or an iterable of bytes-like
+    objects. Files are memory mapped and only one chunk at a time is copied out of the
+    mapping so memory use does not depend on the size of the file.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield from split_chunks(source, chunk_size)
+    elif isinstance(source, (str, os.PathLike)):
+        yield from iter_file_chunks(source, chunk_size)
+    else:
+        for data in source:
+            yield from split_chunks(data, chunk_size)
+
+
+def split_chunks(data, chunk_size):
+    view = memoryview(data).cast("B")
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+
+def iter_file_chunks(path, chunk_size):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # An empty file cannot be mapped
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            for start in range(0, size, chunk_size):
+                yield mapping[start:start + chunk_size]
+
+
+# The block size in which `first_difference` compares buffers before it looks for the
+# differing byte
+DIFFERENCE_BLOCK_SIZE = 64 * 1024
+
+
+def first_difference(a, b):
+    """Return the index of the first byte that differs between `a` and `b`.
+
+    Whole blocks are compared as `bytes`, which is much faster than comparing
+    `memoryview`s, so only the block that differs is scanned a byte at a time.
+    """
+    a = memoryview(a).cast("B")
+    b = memoryview(b).cast("B")
+    length = min(len(a), len(b))
+    for start in range(0, length, DIFFERENCE_BLOCK_SIZE):
+        end = min(start + DIFFERENCE_BLOCK_SIZE, length)
+        if a[start:end].tobytes() != b[start:end].tobytes():
+            for index in range(start, end):
+                if a[index] != b[index]:
+                    return index
+    return length
@@ -0,0 +1,152 @@
+import errno
+import os
+import select
+import socket
+import time
+
+import pytest
+
+from pytest_tcpclient.broker import (
+    ACQUIRE, PORT, BrokerClient, ListenerBroker, create_listening_socket, is_supported
+)
+
+
+@pytest.fixture
+def listener_broker():
+    listener_broker = ListenerBroker(spare=2)
+    yield listener_broker
+    listener_broker.close()
+
+
+def test_is_supported():
+    # The tests only run where Unix sockets can pass descriptors
+    assert is_supported()
+
+
+def test_acquire(listener_broker):
+    client = BrokerClient(listener_broker.path)
+    try:
+        sockets = [client.acquire() for _ in range(4)]
+        ports = {sock.getsockname()[1] for sock in sockets}
+        assert len(ports) == 4
+
+        # The sockets are listening
+        for sock in sockets:
+            connection = socket.create_connection(("localhost", sock.getsockname()[1]))
+            accepted, _ = sock.accept()
+            connection.close()
+            accepted.close()
+            sock.close()
+    finally:
+        client.close()
+
+
+def test_acquire_without_spare_sockets():
+    listener_broker = ListenerBroker(spare=0)
+    client = BrokerClient(listener_broker.path)
+    try:
+        client.acquire().close()
+    finally:
+        client.close()
+        listener_broker.close()
+
+
+def test_broker_closes_connection(tmp_path):
+    path = str(tmp_path / "broker")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(path)
+        listener.listen()
+        client = BrokerClient(path)
+        try:
+            connection, _ = listener.accept()
+            with connection:
+                # Closed for replies only, so that the request can still be sent
+                connection.shutdown(socket.SHUT_WR)
+                with pytest.raises(ConnectionError, match="closed the connection"):
+                    client.acquire()
+        finally:
+            client.close()
+
+
+def test_close_removes_socket_file():
+    listener_broker = ListenerBroker()
+    BrokerClient(listener_broker.path).close()
+    listener_broker.close()
+    assert not os.path.exists(listener_broker.path)
+
+
+def test_acquire_after_broker_closed():
+    listener_broker = ListenerBroker()
+    client = BrokerClient(listener_broker.path)
+    try:
+        client.acquire().close()
+        listener_broker.close()
+        with pytest.raises(ConnectionError):
+            client.acquire()
+    finally:
+        client.close()
+
+
+def wait_until_closed(listener_broker):
+    # The broker's end of the first connection to it
+    deadline = time.monotonic() + 5
+    while not listener_broker.clients or listener_broker.clients[0].fileno() != -1:
+        assert time.monotonic() < deadline, "The broker didn't close the connection"
+        time.sleep(0.01)
+
+
+def test_client_reset(listener_broker):
+    client = BrokerClient(listener_broker.path)
+    client.sock.sendall(ACQUIRE)
+    # Closing with the reply unread resets the broker's end of the connection
+    select.select([client.sock], [], [], 5)
+    client.close()
+    wait_until_closed(listener_broker)
+
+
+def test_client_stops_reading(listener_broker):
+    client = BrokerClient(listener_broker.path)
+    try:
+        # The broker can't send the reply
+        client.sock.shutdown(socket.SHUT_RD)
+        client.sock.sendall(ACQUIRE)
+        wait_until_closed(listener_broker)
+    finally:
+        client.close()
+
+
+def test_broker_sends_no_socket(tmp_path):
+    path = str(tmp_path / "broker")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(path)
+        listener.listen()
+        client = BrokerClient(path)
+        try:
+            connection, _ = listener.accept()
+            with connection:
+                connection.sendall(PORT.pack(8080))
+                with pytest.raises(ConnectionError, match="didn't send a socket for port 8080"):
+                    client.acquire()
+        finally:
+            client.close()
+
+
+def test_listening_socket_without_dual_stack(monkeypatch):
+    monkeypatch.setattr(socket, "has_dualstack_ipv6", lambda: False)
+    with create_listening_socket() as sock:
+        assert sock.family == socket.AF_INET
+        with socket.create_connection(("127.0.0.1", sock.getsockname()[1])):
+            sock.accept()[0].close()
+
+
+def test_close_where_listener_cannot_be_shut_down(monkeypatch):
+    listener_broker = ListenerBroker()
+    # Wakes the thread in `accept`, as closing does on such platforms
+    listener_broker.listener.shutdown(socket.SHUT_RDWR)
+
+    def shutdown(self, how):
+        raise OSError(errno.ENOTCONN, "Socket is not connected")
+
+    monkeypatch.setattr(socket.socket, "shutdown", shutdown)
+    listener_broker.close()
+    assert not os.path.exists(listener_broker.path)
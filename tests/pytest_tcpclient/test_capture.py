@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from pytest_tcpclient.capture import CaptureBuffer
+from pytest_tcpclient.framing import read_frame
+
+
+def make_buffer(*chunks):
+    buffer = CaptureBuffer()
+    for chunk in chunks:
+        buffer.append(chunk)
+    return buffer
+
+
+def test_append():
+    buffer = make_buffer(b"One", bytearray(b"Two"), memoryview(b"Three"), b"")
+    assert len(buffer) == 11
+    assert bytes(buffer) == b"OneTwoThree"
+    assert all(isinstance(chunk, bytes) for chunk in buffer.chunks)
+    assert len(buffer.chunks) == 3
+
+
+def test_append_copies_mutable_data():
+    data = bytearray(b"Hello")
+    buffer = make_buffer(data)
+    data[0:1] = b"J"
+    assert bytes(buffer) == b"Hello"
+
+
+def test_clear():
+    buffer = make_buffer(b"Hello")
+    buffer.clear()
+    assert len(buffer) == 0
+    assert bytes(buffer) == b""
+
+
+def test_startswith_different_chunking():
+    sent = make_buffer(b"OneT", b"woThr", b"ee")
+    assert sent.startswith(make_buffer())
+    assert sent.startswith(make_buffer(b"On", b"eTwoTh"))
+    assert sent.startswith(make_buffer(b"OneTwoThree"))
+    assert not sent.startswith(make_buffer(b"OneTwoThreeFour"))
+    assert not sent.startswith(make_buffer(b"One", b"Tw", b"X"))
+
+
+def test_tail():
+    buffer = make_buffer(b"One", b"Two", b"Three")
+    assert buffer.tail(0) == b"OneTwoThree"
+    assert buffer.tail(3) == b"TwoThree"
+    assert buffer.tail(4) == b"woThree"
+    assert buffer.tail(11) == b""
+
+
+@pytest.mark.asyncio()
+async def test_sent_frame_payload_is_not_copied(tcpserver):
+    payload = b"Hello" * 1000
+    tcpserver.expect_connect()
+    tcpserver.send_frame(payload)
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    assert await read_frame(reader) == payload
+    await tcpserver.join()
+
+    assert any(chunk is payload for chunk in tcpserver.data_sent_from_server.chunks)
+
+    writer.close()
+    await writer.wait_closed()
@@ -1,8 +1,12 @@
 import asyncio
+import struct
 
 import pytest
 
-from pytest_tcpclient.framing import write_frame, read_frame
+from pytest_tcpclient.framing import (
+    CODECS, FrameDecoder, LengthPrefixCodec, VarintCodec, get_codec, iter_frames, read_frame,
+    read_payload, register_codec, write_frame, write_frames
+)
 
 
 @pytest.mark.asyncio()
@@ -68,3 +72,197 @@ async def test_partial_payload(tcpserver):
 
     writer.close()
     await writer.wait_closed()
+
+
+def test_write_frame_makes_one_write(mocker):
+    writer = mocker.Mock()
+    write_frame(writer, bytearray(b"Hello"))
+    writer.write.assert_not_called()
+    writer.writelines.assert_called_once()
+    header, payload = writer.writelines.call_args[0][0]
+    assert header == b"\x00\x00\x00\x05"
+    assert payload == b"Hello"
+
+
+def test_write_frame_passes_bytes_through(mocker):
+    writer = mocker.Mock()
+    payload = b"Hello" * 1000
+    write_frame(writer, payload)
+    assert writer.writelines.call_args[0][0][1] is payload
+
+
+def test_write_frames_makes_one_write(mocker):
+    writer = mocker.Mock()
+    write_frames(writer, [b"One", memoryview(b"Three")])
+    writer.writelines.assert_called_once()
+    assert b"".join(writer.writelines.call_args[0][0]) == \
+        b"\x00\x00\x00\x03One\x00\x00\x00\x05Three"
+
+
+@pytest.mark.asyncio()
+async def test_write_frames(tcpserver):
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    tcpserver.expect_connect()
+    tcpserver.expect_frame(b"One")
+    tcpserver.expect_frame(b"")
+    tcpserver.expect_frame(b"Three")
+
+    write_frames(writer, [b"One", bytearray(), memoryview(b"Three")])
+    await tcpserver.join()
+
+    writer.close()
+    await writer.wait_closed()
+
+
+FRAMES = [b"One", b"", b"Three" * 100]
+ENCODED = b"".join(struct.pack(">I", len(payload)) + payload for payload in FRAMES)
+
+
+def test_frame_decoder_single_chunk():
+    decoder = FrameDecoder()
+    payloads = decoder.feed(ENCODED)
+    assert all(isinstance(payload, memoryview) for payload in payloads)
+    assert payloads == FRAMES
+    assert not decoder.buffer
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 500])
+def test_frame_decoder_arbitrary_chunks(chunk_size):
+    decoder = FrameDecoder()
+    payloads = []
+    for start in range(0, len(ENCODED), chunk_size):
+        payloads.extend(
+            bytes(payload) for payload in decoder.feed(ENCODED[start:start + chunk_size])
+        )
+    assert payloads == FRAMES
+    assert not decoder.buffer
+
+
+@pytest.mark.asyncio()
+async def test_iter_frames(tcpserver):
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    tcpserver.expect_connect()
+    tcpserver.send_bytes(ENCODED)
+    tcpserver.disconnect()
+
+    assert [bytes(payload) async for payload in iter_frames(reader)] == FRAMES
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_iter_frames_incomplete(tcpserver):
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    tcpserver.expect_connect()
+    tcpserver.send_bytes(b"\x00\x00\x00\x03One\x00\x00\x00\x07Good")
+    tcpserver.disconnect()
+
+    payloads = []
+    with pytest.raises(asyncio.IncompleteReadError) as e:
+        async for payload in iter_frames(reader):
+            payloads.append(payload)
+    assert payloads == [b"One"]
+    assert e.value.partial == b"\x00\x00\x00\x07Good"
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+@pytest.mark.parametrize("chunk_size", [1, 3, 500])
+def test_frame_decoder_codecs(codec, chunk_size):
+    frames = [b"One", b"", b"Three" * 100]
+    encoded = b"".join(
+        get_codec(codec).encode_header(len(payload)) + payload for payload in frames
+    )
+    decoder = FrameDecoder(codec)
+    payloads = []
+    for start in range(0, len(encoded), chunk_size):
+        payloads.extend(
+            bytes(payload) for payload in decoder.feed(encoded[start:start + chunk_size])
+        )
+    assert payloads == frames
+
+
+def test_varint_codec():
+    codec = VarintCodec()
+    assert codec.encode_header(0) == b"\x00"
+    assert codec.encode_header(300) == b"\xac\x02"
+    assert codec.decode_header(b"\xac\x02") == (300, 2)
+    assert codec.decode_header(b"\xac") is None
+    with pytest.raises(ValueError, match="Varint is longer than 10 bytes"):
+        codec.decode_header(b"\xff" * 10)
+
+
+@pytest.mark.asyncio()
+async def test_varint_partial_header(tcpserver):
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    tcpserver.expect_connect()
+    tcpserver.send_bytes(b"\xac")
+    tcpserver.disconnect()
+
+    with pytest.raises(asyncio.IncompleteReadError) as e:
+        await read_frame(reader, codec="varint")
+    assert e.value.partial == b"\xac"
+
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_varint_header_split_across_reads():
+    codec = VarintCodec()
+    header = codec.encode_header(2**21)
+    reader = asyncio.StreamReader()
+
+    async def feed():
+        for piece in (header[:1], header[1:2], header[2:] + b"\x01"):
+            await asyncio.sleep(0)
+            reader.feed_data(piece)
+
+    feeder = asyncio.create_task(feed())
+    assert await codec.read_header(reader) == 2**21
+    await feeder
+    assert await reader.read(1) == b"\x01"
+
+
+@pytest.mark.asyncio()
+async def test_varint_buffered_header_is_read_at_once(mocker):
+    codec = VarintCodec()
+    reader = asyncio.StreamReader()
+    reader.feed_data(codec.encode_header(300) + codec.encode_header(2**35) + b"\x01")
+    readexactly = mocker.spy(reader, "readexactly")
+
+    assert await codec.read_header(reader) == 300
+    assert await codec.read_header(reader) == 2**35
+    assert [call.args for call in readexactly.call_args_list] == [(2,), (6,)]
+    assert await reader.read(1) == b"\x01"
+
+
+def test_register_codec():
+    codec = LengthPrefixCodec(">B")
+    register_codec("u8", codec)
+    try:
+        assert get_codec("u8") is codec
+        assert get_codec(codec) is codec
+        assert get_codec(None) is CODECS["u32be"]
+        assert FrameDecoder("u8").feed(b"\x02Hi\x00") == [b"Hi", b""]
+    finally:
+        del CODECS["u8"]
+
+
+@pytest.mark.asyncio()
+async def test_read_payload():
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"\x00\x00\x00\x00\x00\x00\x00\x02hi")
+    reader.feed_eof()
+    # Unlike `read_frame`, an empty frame isn't mistaken for the connection being closed
+    assert await read_payload(reader) == b""
+    assert await read_payload(reader) == b"hi"
+    with pytest.raises(asyncio.IncompleteReadError):
+        await read_payload(reader)
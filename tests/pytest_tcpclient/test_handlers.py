@@ -0,0 +1,110 @@
+import asyncio
+import socket
+import struct
+from unittest.mock import ANY
+
+import pytest
+
+from pytest_tcpclient.framing import read_frame, write_frame
+from pytest_tcpclient.plugin import MockTcpServer
+
+
+@pytest.mark.asyncio()
+async def test_handlers_must_read_the_same_messages(mocker):
+    server = MockTcpServer(0, mocker)
+    server.on_bytes(b"PING", lambda message: b"PONG\n")
+    with pytest.raises(ValueError, match="must read frames, or data ending with the same"):
+        server.on_frame(ANY, lambda payload: payload)
+    with pytest.raises(ValueError, match="must read frames, or data ending with the same"):
+        server.on_bytes(ANY, lambda message: message, delimiter=b"\r\n")
+
+
+@pytest.mark.asyncio()
+async def test_handler_must_be_callable(mocker):
+    with pytest.raises(TypeError, match="`handler` must be callable"):
+        MockTcpServer(0, mocker).on_frame(ANY, b"reply")
+
+
+@pytest.mark.asyncio()
+async def test_no_reply(tcpserver):
+    tcpserver.on_frame(b"ignored", lambda payload: None)
+    tcpserver.expect_connect()
+    tcpserver.expect_frame(b"Hello")
+    tcpserver.send_frame(b"Howdy")
+
+    reader, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    write_frame(writer, b"ignored")
+    write_frame(writer, b"Hello")
+    assert await read_frame(reader) == b"Howdy"
+    await tcpserver.join()
+
+    assert tcpserver.stats.frames_received == 2
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_async_handler_fails(tcpserver):
+    async def fail(payload):
+        raise KeyError(payload)
+
+    tcpserver.on_frame(ANY, fail)
+    tcpserver.expect_connect()
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    write_frame(writer, b"GET missing")
+    await asyncio.sleep(0.1)
+
+    with pytest.raises(pytest.fail.Exception, match="`on_frame` handler raised KeyError"):
+        await tcpserver.join()
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_partial_message_is_left_for_expectations(tcpserver):
+    tcpserver.on_frame(ANY, lambda payload: payload)
+    tcpserver.expect_connect()
+    tcpserver.expect_bytes(b"\x00\x00\x00\x05Hel")
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"\x00\x00\x00\x05Hel")
+    writer.close()
+    await writer.wait_closed()
+
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_connection_reset_is_left_for_expectations(tcpserver):
+    tcpserver.on_frame(ANY, lambda payload: payload)
+    tcpserver.expect_connect()
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    await tcpserver.join()
+    # Closing without lingering resets the connection
+    writer.get_extra_info("socket").setsockopt(
+        socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+    )
+    writer.close()
+    await writer.wait_closed()
+
+    # `expect_disconnect` takes a reset for a disconnection
+    tcpserver.expect_disconnect()
+    await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_handlers_of_multi_connection_server(tcpserver_factory):
+    server = await tcpserver_factory(connections=2)
+    server.on_bytes(ANY, lambda message: message.upper() + b"\n")
+
+    for connection, name in zip(server.connections, [b"alice", b"bob"]):
+        connection.expect_connect()
+        reader, writer = await asyncio.open_connection(None, server.service_port)
+        writer.write(name + b"\n")
+        assert await reader.readline() == name.upper() + b"\n"
+        writer.close()
+        await writer.wait_closed()
+
+    await server.join()
@@ -0,0 +1,100 @@
+import asyncio
+import re
+
+import pytest
+
+from pytest_tcpclient.matching import (
+    as_delimiter, as_pattern, check_prefix, read_prefix, read_until
+)
+
+
+async def feed(reader, chunks):
+    for chunk in chunks:
+        reader.feed_data(chunk)
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio()
+async def test_read_until_longer_than_limit():
+    reader = asyncio.StreamReader(limit=16)
+    # The delimiter is split across chunks too
+    chunks = [b"x" * 7] * 100 + [b"\r", b"\nrest"]
+    task = asyncio.create_task(read_until(reader, b"\r\n"))
+    await feed(reader, chunks)
+    assert await task == b"x" * 700 + b"\r\n"
+    assert await reader.read(4) == b"rest"
+
+
+@pytest.mark.asyncio()
+async def test_read_until_delimiter_beyond_limit():
+    reader = asyncio.StreamReader(limit=16)
+    reader.feed_data(b"y" * 100 + b"\n" + b"z\n")
+    assert await read_until(reader, b"\n") == b"y" * 100 + b"\n"
+    assert await read_until(reader, b"\n") == b"z\n"
+
+
+@pytest.mark.asyncio()
+async def test_read_until_connection_closed():
+    reader = asyncio.StreamReader(limit=16)
+    reader.feed_data(b"y" * 40)
+    reader.feed_eof()
+    with pytest.raises(asyncio.IncompleteReadError) as info:
+        await read_until(reader, b"\n")
+    assert info.value.partial == b"y" * 40
+
+
+@pytest.mark.asyncio()
+async def test_read_prefix():
+    reader = asyncio.StreamReader()
+    task = asyncio.create_task(read_prefix(reader, b"+OK"))
+    await feed(reader, [b"+", b"O", b"K rest"])
+    assert await task == b"+OK"
+    assert await reader.read(5) == b" rest"
+
+
+@pytest.mark.asyncio()
+async def test_read_prefix_stops_at_first_difference():
+    reader = asyncio.StreamReader()
+    task = asyncio.create_task(read_prefix(reader, b"+OK"))
+    # Returns without waiting for the third byte
+    await feed(reader, [b"+", b"E"])
+    assert await task == b"+E"
+
+
+@pytest.mark.asyncio()
+async def test_read_prefix_connection_closed():
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"+O")
+    reader.feed_eof()
+    with pytest.raises(asyncio.IncompleteReadError) as info:
+        await read_prefix(reader, b"+OK")
+    assert info.value.partial == b"+O"
+
+
+def test_as_pattern():
+    assert as_pattern(rb"\d+").fullmatch(b"123")
+    compiled = re.compile(rb"\w+")
+    assert as_pattern(compiled) is compiled
+    with pytest.raises(TypeError, match="must be a bytes pattern"):
+        as_pattern(re.compile(r"\w+"))
+    with pytest.raises(TypeError, match="must be bytes or a compiled pattern"):
+        as_pattern(r"\w+")
+
+
+def test_as_delimiter():
+    assert as_delimiter(bytearray(b"\n")) == b"\n"
+    with pytest.raises(ValueError, match="must be non-empty bytes"):
+        as_delimiter(b"")
+    with pytest.raises(ValueError, match="must be non-empty bytes"):
+        as_delimiter("\n")
+
+
+@pytest.mark.parametrize("prefix", [b"OK\r\n", b"OK\r", b"\r\nOK"])
+def test_check_prefix_overlaps_delimiter(prefix):
+    with pytest.raises(ValueError, match="must not contain or end with part of"):
+        check_prefix(prefix, b"\r\n")
+
+
+def test_check_prefix():
+    assert check_prefix(b"+OK", b"\r\n") == b"+OK"
+    assert check_prefix(b"", b"\r\n") == b""
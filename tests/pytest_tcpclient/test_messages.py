@@ -0,0 +1,168 @@
+import asyncio
+import re
+import sys
+import types
+from unittest.mock import ANY
+
+import pytest
+
+from pytest_tcpclient.framing import VarintCodec, get_codec
+from pytest_tcpclient.messages import (
+    FORMATS, MessageFormat, Mismatch, MsgpackFormat, compile_matcher, get_format,
+    register_format
+)
+from pytest_tcpclient.plugin import MockTcpServer, StepTimeout
+
+
+def describe(expected, value):
+    mismatch = compile_matcher(expected)(value)
+    return None if mismatch is None else str(mismatch)
+
+
+def test_any_compiles_to_nothing():
+    assert compile_matcher(ANY) is None
+
+
+def test_equal():
+    assert describe("news", "news") is None
+    assert describe("news", "sports") == "message is 'sports', expected 'news'"
+
+
+def test_dict_is_partial():
+    expected = {"op": "subscribe", "topic": ANY}
+    assert describe(expected, {"op": "subscribe", "topic": "news", "id": 1}) is None
+    assert describe(expected, {"op": "subscribe"}) == "message['topic'] is missing"
+    assert describe(expected, ["subscribe"]) == "message is ['subscribe'], expected a dict"
+
+
+def test_sequence():
+    expected = [1, ANY, {"ok": True}]
+    assert describe(expected, [1, "two", {"ok": True}]) is None
+    assert describe(expected, (1, 2, {"ok": True})) is None
+    assert describe(expected, [1, 2]) == "message has 2 items, expected 3"
+    assert describe(expected, "123") == "message is '123', expected a list"
+    assert describe(expected, [1, 2, {"ok": False}]) == \
+        "message[2]['ok'] is False, expected True"
+
+
+def test_type():
+    assert describe({"id": int}, {"id": 7}) is None
+    assert describe({"id": int}, {"id": "7"}) == \
+        "message['id'] is '7', expected an instance of int"
+
+
+def test_pattern():
+    assert describe(re.compile(r"v\d+"), "v12") is None
+    assert describe(re.compile(rb"v\d+"), b"v12") is None
+    assert describe(re.compile(r"v\d+"), "v12x") == "message is 'v12x', expected to match 'v\\\\d+'"
+    # A str pattern doesn't match bytes
+    assert describe(re.compile(r"v\d+"), b"v12") is not None
+
+
+def test_predicate():
+    def is_even(value):
+        return value % 2 == 0
+
+    assert describe({"seq": is_even}, {"seq": 2}) is None
+    assert describe({"seq": is_even}, {"seq": 3}) == \
+        "message['seq'] is 3, which doesn't satisfy is_even"
+    assert describe(bytes.isdigit, b"x") == "message is b'x', which doesn't satisfy isdigit"
+
+
+def test_path_is_outermost_last():
+    mismatch = compile_matcher({"a": [{"b": 1}]})({"a": [{"b": 2}]})
+    assert mismatch == Mismatch(["b", 0, "a"], "is 2, expected 1")
+
+
+async def read(message_format, data, codec=None):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return await message_format.read(reader, get_codec(codec))
+
+
+@pytest.mark.asyncio()
+async def test_read_lines():
+    assert await read(FORMATS["json-lines"], b'{"a": 1}\n{"b": 2}\n') == b'{"a": 1}'
+    with pytest.raises(asyncio.IncompleteReadError):
+        await read(FORMATS["lines"], b"no newline")
+
+
+@pytest.mark.asyncio()
+async def test_read_frames():
+    assert await read(FORMATS["frames"], b"\x00\x00\x00\x02hi") == b"hi"
+    assert await read(FORMATS["frames"], b"\x02hi", VarintCodec()) == b"hi"
+    # An empty payload is a message, not the connection being closed
+    assert await read(FORMATS["frames"], b"\x00\x00\x00\x00") == b""
+    with pytest.raises(asyncio.IncompleteReadError):
+        await read(FORMATS["frames"], b"")
+
+
+def test_decode():
+    assert FORMATS["json-frames"].decode(b'[1, 2]') == [1, 2]
+    assert FORMATS["lines"].decode(b"hi") == b"hi"
+
+
+def test_decode_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+    assert FORMATS["msgpack-frames"].decode(msgpack.packb({"op": "ping"})) == {"op": "ping"}
+
+
+def test_msgpack_imported_once(monkeypatch):
+    calls = []
+
+    def unpackb(data):
+        calls.append(data)
+        return {"op": "ping"}
+
+    monkeypatch.setitem(sys.modules, "msgpack", types.SimpleNamespace(unpackb=unpackb))
+    message_format = MsgpackFormat()
+    assert message_format.decode(b"first") == {"op": "ping"}
+    assert message_format.decode is unpackb
+    assert message_format.decode(b"second") == {"op": "ping"}
+    assert calls == [b"first", b"second"]
+
+
+def test_msgpack_not_installed(monkeypatch):
+    # `None` in `sys.modules` makes the import raise `ImportError`
+    monkeypatch.setitem(sys.modules, "msgpack", None)
+    with pytest.raises(ValueError, match="The `msgpack` package is required"):
+        MsgpackFormat().decode(b"\x80")
+
+
+def test_get_format():
+    assert get_format("json-lines") is FORMATS["json-lines"]
+    message_format = MessageFormat(bytes.upper, b"\r\n")
+    assert get_format(message_format) is message_format
+    with pytest.raises(ValueError, match="Unknown message format 'xml'"):
+        get_format("xml")
+
+
+def test_register_format():
+    message_format = MessageFormat(bytes.upper, b"\r\n")
+    register_format("upper-crlf", message_format)
+    try:
+        assert get_format("upper-crlf") is message_format
+    finally:
+        del FORMATS["upper-crlf"]
+
+
+@pytest.mark.asyncio()
+async def test_step_timeout_applies_to_each_step():
+    # The steps take longer than the timeout in total but none of them does
+    with StepTimeout(0.05) as timeout:
+        for _ in range(4):
+            timeout.step()
+            await asyncio.sleep(0.02)
+    with pytest.raises(asyncio.TimeoutError):
+        with StepTimeout(0.05) as timeout:
+            timeout.step()
+            await asyncio.sleep(0.02)
+            timeout.step()
+            await asyncio.sleep(1)
+
+
+@pytest.mark.parametrize("count", [0, -1, True, 1.5])
+def test_expect_message_invalid_count(mocker, count):
+    with pytest.raises(ValueError, match="`count` must be a positive integer"):
+        MockTcpServer(0, mocker).expect_message({"op": "ping"}, count=count)
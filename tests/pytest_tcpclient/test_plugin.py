@@ -1,4 +1,7 @@
 import asyncio
+import hashlib
+import json
+
 import pytest
 
 
@@ -175,6 +178,11 @@ def test_expect_frame_success(pytester):
     pytester.runpytest().assert_outcomes(passed=1)
 
 
+def test_timeout_none(pytester):
+    pytester.copy_example("test_timeout_none.py")
+    pytester.runpytest().assert_outcomes(passed=1)
+
+
 def test_expect_frame_times_out(pytester):
     pytester.copy_example("test_expect_frame_times_out.py")
     result = pytester.runpytest()
@@ -264,3 +272,419 @@ def test_tcpserver_factory_two_servers_fail(pytester):
     lines = result.stdout.get_lines_after(">       await tcpserver_factory.stop()")
     assert lines[0] == \
         "E       Failed: Expected to read b'Hello_1' but actually read b'Hello_2'"
+
+
+def test_multiple_connections(pytester):
+    pytester.copy_example("test_multiple_connections.py")
+    pytester.runpytest().assert_outcomes(passed=1)
+
+
+def test_multiple_connections_too_many(pytester):
+    pytester.copy_example("test_multiple_connections_too_many.py")
+    result = pytester.runpytest()
+    assert_failure(
+        result, "More than 2 client connections were attempted.", server_variable_name="server"
+    )
+
+
+def test_multiple_connections_one_fails(pytester):
+    pytester.copy_example("test_multiple_connections_one_fails.py")
+    result = pytester.runpytest()
+    assert_failure(
+        result, "Expected to read b'Hello' but actually read b'Howdy'",
+        server_variable_name="server"
+    )
+
+
+def test_frame_codec(pytester):
+    pytester.copy_example("test_frame_codec.py")
+    pytester.runpytest().assert_outcomes(passed=3)
+
+
+def test_expect_stream_success(pytester):
+    pytester.copy_example("test_expect_stream_success.py")
+    pytester.runpytest().assert_outcomes(passed=1)
+
+
+def test_expect_stream_mismatch(pytester):
+    pytester.copy_example("test_expect_stream_mismatch.py")
+    result = pytester.runpytest()
+    assert_failure(
+        result,
+        "Stream differs from expected at offset 1500. " +
+        f"Expected {b'B' * 16} but actually read {b'C' * 16}"
+    )
+
+
+def test_expect_stream_digest_mismatch(pytester):
+    pytester.copy_example("test_expect_stream_digest_mismatch.py")
+    result = pytester.runpytest()
+    assert_failure(
+        result,
+        "Stream digest differs from expected. " +
+        f"Expected {hashlib.md5(b'Hello').hexdigest()} " +
+        f"but actually got {hashlib.md5(b'Howdy').hexdigest()}"
+    )
+
+
+def test_expect_stream_times_out(pytester):
+    pytester.copy_example("test_expect_stream_times_out.py")
+    result = pytester.runpytest()
+    assert_failure(result, "Timed out waiting for stream after 1000 bytes")
+
+
+def test_expect_stream_connection_closed(pytester):
+    pytester.copy_example("test_expect_stream_connection_closed.py")
+    result = pytester.runpytest()
+    assert_failure(
+        result, "Connection was closed after reading 1500 bytes of the expected stream"
+    )
+
+
+def test_expect_digest_success(pytester):
+    pytester.copy_example("test_expect_digest_success.py")
+    pytester.runpytest().assert_outcomes(passed=1)
+
+
+def test_expect_bytes_digest_chunk_mismatch(pytester):
+    pytester.copy_example("test_expect_bytes_digest_chunk_mismatch.py")
+    result = pytester.runpytest()
+    assert_failure(
+        result,
+        "Stream digest differs from expected in chunk 3 at offset 3000. " +
+        f"Expected {hashlib.sha256(b'A' * 1000).hexdigest()} " +
+        f"but actually got {hashlib.sha256(b'A' * 500 + b'B' + b'A' * 499).hexdigest()}"
+    )
+
+
+def test_expect_frame_digest_wrong_length(pytester):
+    pytester.copy_example("test_expect_frame_digest_wrong_length.py")
+    result = pytester.runpytest()
+    assert_failure(
+        result, "Expected a frame of 1000 bytes but actually got a frame of 999 bytes"
+    )
+
+
+def test_expect_frame_digest_times_out(pytester):
+    pytester.copy_example("test_expect_frame_digest_times_out.py")
+    result = pytester.runpytest()
+    assert_failure(result, "Timed out waiting for stream after 0 bytes")
+
+
+def test_expect_frame_digest_connection_closed(pytester):
+    pytester.copy_example("test_expect_frame_digest_connection_closed.py")
+    result = pytester.runpytest()
+    assert_failure(
+        result, "Connection was closed after reading 0 bytes of the expected stream"
+    )
+
+
+def test_large_payload_mismatch(pytester):
+    pytester.makeini("[pytest]\ntcpserver_bytes_repr_limit = 16\n")
+    pytester.copy_example("test_large_payload_mismatch.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(failed=1)
+    lines = result.stdout.get_lines_after(">       await tcpserver.join()")
+    assert lines[:9] == [
+        f"E       Failed: Expected to read {b'A' * 16}... (2000 bytes) " +
+        f"but actually read {b'A' * 16}... (2000 bytes)",
+        "E       First difference at offset 1000. " +
+        "Expected 2000 bytes, actually got 2000 bytes.",
+        "E       Expected:",
+        "E         000003d0  " + "41 " * 15 + "41  |" + "A" * 16 + "|",
+        "E         000003e0  " + "41 " * 8 + "42 " * 7 + "42  |" + "A" * 8 + "B" * 8 + "|",
+        "E         000003f0  " + "42 " * 15 + "42  |" + "B" * 16 + "|",
+        "E       Actual:",
+        "E         000003d0  " + "41 " * 15 + "41  |" + "A" * 16 + "|",
+        "E         000003e0  " + "41 " * 8 + "43 " * 7 + "43  |" + "A" * 8 + "C" * 8 + "|",
+    ]
+
+
+def test_expect_bytes_connection_reset(pytester):
+    pytester.copy_example("test_expect_bytes_connection_reset.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(failed=1)
+    lines = result.stdout.get_lines_after(">       await tcpserver.join()")
+    assert lines[0].startswith(
+        "E       Failed: Cannot interpret UnexpectedEventError(expected_event=" +
+        f"BytesReadEvent(bytes_read={b'A' * 64}... (200000 bytes)), " +
+        "actual_event=ExceptionEvent(exception=ConnectionResetError("
+    )
+    assert len(lines[0]) < 400
+
+
+def test_large_frame_mismatch(pytester):
+    pytester.copy_example("test_large_frame_mismatch.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(failed=1)
+    lines = result.stdout.get_lines_after(">       await tcpserver.join()")
+    assert lines[0] == \
+        f"E       Failed: Expected to get frame {b'Hello, world!' * 4 + b'Hello, world'}... " + \
+        "(1300 bytes) but actually got frame b''"
+    assert lines[1] == \
+        "E       First difference at offset 0. Expected 1300 bytes, actually got 0 bytes."
+    actual_index = lines.index("E       Actual:")
+    assert lines[actual_index + 1] == "E         (no data)"
+
+
+def test_send_bytes_large(pytester):
+    pytester.copy_example("test_send_bytes_large.py")
+    pytester.runpytest().assert_outcomes(passed=3)
+
+
+def test_send_bytes_large_unread(pytester):
+    pytester.copy_example("test_send_bytes_large_unread.py")
+    result = pytester.runpytest()
+    # `join` reports the second connection without waiting for the first client to
+    # read. Tearing down then reports that the first client closed without reading.
+    result.assert_outcomes(failed=1, errors=1)
+    lines = result.stdout.get_lines_after(">       await server.join()")
+    assert lines[0] == "E       Failed: Expected to read b'Hello' but actually read b'Howdy'"
+    result.stdout.fnmatch_lines(
+        ["E       Failed: Connection was reset. Did client close writer prematurely?"]
+    )
+
+
+def test_run_script_success(pytester):
+    pytester.copy_example("test_run_script_success.py")
+    pytester.runpytest().assert_outcomes(passed=4)
+
+
+def test_run_script_wrong_bytes_sent(pytester):
+    pytester.copy_example("test_run_script_wrong_bytes_sent.py")
+    result = pytester.runpytest()
+    # The two expectations were merged into one read
+    assert_failure(
+        result, "Expected to read b'Hello, server!' but actually read b'Hello, world!!'"
+    )
+
+
+def test_run_script_missing_expect_connect(pytester):
+    pytester.copy_example("test_run_script_missing_expect_connect.py")
+    result = pytester.runpytest()
+    assert_failure(result, "Missing `expect_connect()` before `run_script(...)`")
+
+
+def test_run_script_failures(pytester):
+    pytester.copy_example("test_run_script_failures.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(failed=4)
+    failures = [line for line in result.stdout.lines if line.startswith("E       Failed: ")]
+    assert failures == [
+        "E       Failed: Expected to get frame b'Hello, server!' but only read b'Hello' "
+        "before the connection was closed.",
+        "E       Failed: Expected to read b'Hello, server!' but only read b'Hello' "
+        "before the connection was closed.",
+        "E       Failed: Timed out waiting for b'Hello, server!'",
+        "E       Failed: Timed out waiting for frame b'Hello, server!'",
+    ]
+
+
+def test_record_and_replay(pytester):
+    pytester.copy_example("test_record_and_replay.py")
+    pytester.runpytest().assert_outcomes(passed=2)
+
+
+def test_send_bytes_delay(pytester):
+    pytester.copy_example("test_send_bytes_delay.py")
+    pytester.runpytest().assert_outcomes(passed=2)
+
+
+def test_timed_replay(pytester):
+    pytester.copy_example("test_timed_replay.py")
+    pytester.runpytest().assert_outcomes(passed=1)
+
+
+def test_send_shaping(pytester):
+    pytester.copy_example("test_send_shaping.py")
+    pytester.runpytest().assert_outcomes(passed=3)
+
+
+def test_backpressure(pytester):
+    pytester.copy_example("test_backpressure.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=2, failed=2)
+    lines = result.stdout.get_lines_after(">       await tcpserver.join()")
+    assert "E       Failed: Timed out waiting for client to pause writing." in lines
+    result.stdout.fnmatch_lines([
+        "E*Failed: Expected client to resume writing but it did the opposite with "
+        "* bytes in its write buffer.",
+    ])
+
+
+def test_stats(pytester):
+    pytester.copy_example("test_stats.py")
+    pytester.runpytest().assert_outcomes(passed=1)
+
+
+def test_stats_report(pytester, tmp_path):
+    pytester.copy_example("test_stats.py")
+    json_path = tmp_path / "stats.json"
+    result = pytester.runpytest("--tcpserver-stats", f"--tcpserver-stats-json={json_path}")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines([
+        "*= tcpserver stats =*",
+        "*sent*writes*frames*received*reads*frames*ttfb*duration*slowest*test",
+        "*13*2*1*13*2*1*ms*ms*ms*test_stats.py::test_stats",
+    ])
+    records = json.loads(json_path.read_text())
+    assert [(r["test"], r["connection"], r["bytes_sent"]) for r in records] == [
+        ("test_stats.py::test_stats", None, 13),
+    ]
+
+
+def test_stats_report_xdist(pytester, tmp_path):
+    pytest.importorskip("xdist")
+    pytester.copy_example("test_stats.py")
+    json_path = tmp_path / "stats.json"
+    result = pytester.runpytest_subprocess(
+        "-n", "2", "--tcpserver-stats", f"--tcpserver-stats-json={json_path}"
+    )
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines([
+        "*= tcpserver stats =*",
+        "*13*2*1*13*2*1*ms*ms*ms*test_stats.py::test_stats",
+    ])
+    records = json.loads(json_path.read_text())
+    assert [(r["test"], r["connection"], r["bytes_sent"]) for r in records] == [
+        ("test_stats.py::test_stats", None, 13),
+    ]
+
+
+def test_stats_not_reported_by_default(pytester):
+    pytester.copy_example("test_stats.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+    result.stdout.no_fnmatch_line("*tcpserver stats*")
+
+
+def test_latency_bounds(pytester):
+    pytester.copy_example("test_latency_bounds.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=2, failed=4)
+    result.stdout.fnmatch_lines([
+        "E       Failed: Expected to read b'pong' within 10.0ms of `send_bytes` "
+        "but it took *ms.",
+    ])
+    result.stdout.fnmatch_lines([
+        "E       Failed: Expected client to connect within 10.0ms of `disconnect` "
+        "but it took *ms.",
+    ])
+    result.stdout.fnmatch_lines([
+        "E       Failed: Expected to get frame b'pong' within 10.0ms of `send_frame` "
+        "but it took *ms.",
+    ])
+    result.stdout.fnmatch_lines([
+        "E       Failed: Expected client to connect within 10.0ms of the start of the "
+        "expectation but it took *ms.",
+    ])
+
+
+def test_serve_repeated(pytester):
+    pytester.copy_example("test_serve_repeated.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1, failed=4)
+    failures = [line for line in result.stdout.lines if line.startswith("E       Failed: ")]
+    assert failures == [
+        "E       Failed: Exchange 3 of 10 failed. "
+        "Expected to read b'PING\\n' but actually read b'PONG\\n'",
+        "E       Failed: Exchange 2 of 10 failed. Timed out waiting for b'PING\\n'",
+        "E       Failed: Exchange 2 of 10 failed. "
+        "Expected to read b'PING\\n' but only read b'' before the connection was closed.",
+        "E       Failed: Missing `expect_connect()` before `serve_repeated(...)`",
+    ]
+
+
+def test_unix_and_socketpair(pytester):
+    pytester.copy_example("test_unix_and_socketpair.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=8, failed=2, errors=1)
+    lines = result.stdout.get_lines_after(">       await server.join()")
+    assert lines[0] == "E       Failed: There is data sent by server that was not read " + \
+        "by client: unread_bytes=b'Hola!'."
+    # The connection that failed isn't taken for a client
+    result.stdout.fnmatch_lines([
+        "E       Failed: Client is not connected.*",
+    ])
+
+
+def test_tcpserver_broker(pytester):
+    pytest.importorskip("xdist")
+    pytester.makeini("[pytest]\ntcpserver_broker = true\n")
+    pytester.copy_example("test_tcpserver_broker.py")
+    pytester.runpytest_subprocess("-n", "2").assert_outcomes(passed=9)
+
+
+def test_tcpserver_broker_not_supported(pytester, monkeypatch):
+    pytest.importorskip("xdist")
+    monkeypatch.setattr("pytest_tcpclient.broker.is_supported", lambda: False)
+    pytester.makeini("[pytest]\ntcpserver_broker = true\n")
+    pytester.copy_example("test_tcpserver_broker.py")
+    result = pytester.runpytest("-n", "2")
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines(["*`tcpserver_broker` needs Unix domain sockets"])
+
+
+def test_message_expectations(pytester):
+    pytester.copy_example("test_message_expectations.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=2, failed=5)
+    failures = [line for line in result.stdout.lines if line.startswith("E       Failed: ")]
+    assert failures == [
+        "E       Failed: Expected data matching b'GET /\\\\S* HTTP/1\\\\.1' and ending with "
+        "b'\\r\\n' but actually read b'POST /login HTTP/1.1\\r\\n'",
+        # The prefix is compared without waiting for the delimiter, which never arrives
+        "E       Failed: Expected data starting with b'+OK' and ending with b'\\r\\n' "
+        "but actually read b'-ER'",
+        "E       Failed: Expected data ending with b'\\r\\n\\r\\n' but only read "
+        "b'Host: example.com\\r\\n' before the connection was closed.",
+        "E       Failed: Timed out waiting for data ending with b'\\n'",
+        "E       Failed: Missing `expect_connect()` before `expect_regex(...)`",
+    ]
+
+
+def test_expect_message(pytester):
+    pytester.copy_example("test_expect_message.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=2, failed=6)
+    failures = [line for line in result.stdout.lines if line.startswith("E       Failed: ")]
+    assert failures == [
+        "E       Failed: Message 3 of 3 failed. Expected a message matching "
+        "{'op': 'subscribe', 'topic': <ANY>} but message['op'] is 'unsubscribe', "
+        "expected 'subscribe'. Message was b'{\"op\": \"unsubscribe\", \"topic\": \"news\"}'",
+        "E       Failed: Expected a message matching {'op': 'subscribe', 'args': "
+        "{'topic': <ANY>}} but message['args']['topic'] is missing. "
+        "Message was b'{\"op\": \"subscribe\", \"args\": {}}'",
+        "E       Failed: Could not decode message b'{\"op\": subscribe}': JSONDecodeError: "
+        "Expecting value: line 1 column 8 (char 7)",
+        "E       Failed: Timed out waiting for a message matching {'op': 'subscribe'}",
+        "E       Failed: Message 2 of 2 failed. Expected a message matching "
+        "{'op': 'subscribe'} but only read b'{\"op\": ' before the connection was closed.",
+        "E       Failed: Missing `expect_connect()` before `expect_message(...)`",
+    ]
+
+
+def test_handlers(pytester):
+    pytester.copy_example("test_handlers.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=3, failed=1)
+    lines = result.stdout.get_lines_after(">       await tcpserver.join()")
+    assert lines[0] == "E       Failed: `on_frame` handler raised ValueError: no such key " + \
+        "for b'GET missing'"
+
+
+def test_expect_frames_unordered(pytester):
+    pytester.copy_example("test_expect_frames_unordered.py")
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1, failed=5)
+    failures = [line for line in result.stdout.lines if line.startswith("E       Failed: ")]
+    assert failures == [
+        "E       Failed: Frame 3 of 3, b'a', was received more times than expected",
+        "E       Failed: Timed out waiting for 14 of 23 frames: b'PING' x3, "
+        "b'GET /item/0', b'GET /item/1', b'GET /item/2', b'GET /item/3', b'GET /item/4', "
+        "b'GET /item/5', b'GET /item/6', and 4 more",
+        "E       Failed: Expected a frame with any of b'BYE', b'QUIT' but actually got "
+        "frame b'EXIT'",
+        "E       Failed: Frame 1 of 2, b'z', was not expected",
+        "E       Failed: Connection was closed before receiving 1 of 2 frames: b'a'",
+    ]
@@ -0,0 +1,87 @@
+import asyncio
+import socket
+
+import pytest
+
+from pytest_tcpclient.broker import BrokerClient, ListenerBroker
+from pytest_tcpclient.plugin import BrokeredPool, MockTcpServer, MockTcpServerFactory
+
+
+@pytest.fixture
+def pool():
+    listener_broker = ListenerBroker(spare=2)
+    pool = BrokeredPool(BrokerClient(listener_broker.path))
+    yield pool
+    pool.close()
+    listener_broker.close()
+
+
+def test_acquire_reuses_released_socket(pool):
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first is not second
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.close()
+    assert first.fileno() == -1
+    assert second.fileno() == -1
+    assert pool.client.sock.fileno() == -1
+
+
+def test_release_discards_stale_connections(pool):
+    sock = pool.acquire()
+    client = socket.create_connection(("localhost", sock.getsockname()[1]))
+    pool.release(sock)
+    # The pending connection was accepted and closed by the pool
+    assert client.recv(1) == b""
+    client.close()
+
+
+@pytest.mark.asyncio()
+async def test_factory_returns_sockets_to_pool(unused_tcp_port_factory, mocker, pool):
+    factory = MockTcpServerFactory(unused_tcp_port_factory, mocker, pool=pool)
+    server = await factory()
+    assert server.service_port == pool.sockets[0].getsockname()[1]
+
+    server.expect_connect()
+    server.expect_bytes(b"Hello")
+    reader, writer = await asyncio.open_connection(None, server.service_port)
+    writer.write(b"Hello")
+    writer.close()
+    await writer.wait_closed()
+
+    await factory.stop()
+    assert pool.idle_sockets == pool.sockets
+
+
+@pytest.mark.asyncio()
+async def test_factory_binds_port_picked_by_kernel(mocker):
+
+    def unused_tcp_port_factory():  # pragma: no cover
+        raise AssertionError("A port was picked before binding it")
+
+    factory = MockTcpServerFactory(unused_tcp_port_factory, mocker)
+    server = await factory()
+    assert server.service_port == server.server.sockets[0].getsockname()[1]
+
+    server.expect_connect()
+    reader, writer = await asyncio.open_connection(None, server.service_port)
+    writer.close()
+    await writer.wait_closed()
+    await factory.stop()
+
+
+@pytest.mark.asyncio()
+async def test_server_binds_its_own_port(unused_tcp_port, mocker):
+    # Without a listening socket, as when it isn't started by a factory
+    server = MockTcpServer(unused_tcp_port, mocker)
+    await server.start()
+    server.expect_connect()
+    server.expect_bytes(b"Hello")
+
+    _, writer = await asyncio.open_connection(None, unused_tcp_port)
+    writer.write(b"Hello")
+    await server.stop()
+
+    writer.close()
+    await writer.wait_closed()
@@ -0,0 +1,132 @@
+import mmap
+
+import pytest
+
+from pytest_tcpclient.capture import CaptureBuffer
+from pytest_tcpclient.recording import (
+    MAGIC, RECORD_HEADER, SENT_BY_CLIENT, SENT_BY_SERVER, Recording, SessionRecorder
+)
+from pytest_tcpclient.script import ExpectBytesStep, SendStep
+
+
+def make_recording(path, *chunks):
+    recorder = SessionRecorder(path)
+    for direction, data in chunks:
+        recorder.record(direction, data)
+    recorder.close()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "session.rec"
+    make_recording(
+        path,
+        (SENT_BY_CLIENT, b"Hello"),
+        (SENT_BY_CLIENT, b""),
+        (SENT_BY_SERVER, bytearray(b"Hi")),
+        (SENT_BY_SERVER, b"!"),
+    )
+    recording = Recording(path)
+    assert [(c.direction, bytes(c.data)) for c in recording.chunks] == [
+        (SENT_BY_CLIENT, b"Hello"),
+        (SENT_BY_SERVER, b"Hi"),
+        (SENT_BY_SERVER, b"!"),
+    ]
+    assert recording.chunks[0].timestamp == 0
+    assert recording.chunks[0].timestamp <= recording.chunks[2].timestamp
+
+
+def test_to_script_does_not_copy_or_merge(tmp_path):
+    path = tmp_path / "session.rec"
+    make_recording(path, (SENT_BY_CLIENT, b"Hello"), (SENT_BY_SERVER, b"Hi"),
+                   (SENT_BY_SERVER, b"!"))
+    steps = Recording(path).to_script(timeout=2).compile().steps
+    assert steps == (ExpectBytesStep(b"Hello", 2), SendStep(b"Hi"), SendStep(b"!"))
+    assert all(isinstance(step.data.obj, mmap.mmap) for step in steps)
+
+    # Sending it doesn't copy it either
+    buffer = CaptureBuffer()
+    buffer.append(steps[1].data)
+    assert buffer.chunks[0] is steps[1].data
+
+
+def test_close(tmp_path):
+    path = tmp_path / "session.rec"
+    make_recording(path, (SENT_BY_CLIENT, b"Hello"), (SENT_BY_SERVER, b"Hi"))
+    with Recording(path) as recording:
+        data = recording.chunks[0].data
+        mapping = recording.mapping
+    assert mapping.closed
+    assert recording.chunks == []
+    with pytest.raises(ValueError):
+        bytes(data)
+    # Closing again does nothing
+    recording.close()
+
+
+def test_close_while_script_is_in_use(tmp_path):
+    path = tmp_path / "session.rec"
+    make_recording(path, (SENT_BY_CLIENT, b"Hello"), (SENT_BY_SERVER, b"Hi"))
+    recording = Recording(path)
+    mapping = recording.mapping
+    steps = recording.to_script().compile().steps
+    recording.close()
+    # Unmapped only once the script is gone
+    assert not mapping.closed
+    assert steps == (ExpectBytesStep(b"Hello", 1), SendStep(b"Hi"))
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "session.rec"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError, match="is not a recording"):
+        Recording(path)
+    path.write_bytes(b"Not a recording")
+    with pytest.raises(ValueError, match="is not a recording"):
+        Recording(path)
+
+
+@pytest.mark.parametrize("trailer, message", [
+    (b"\x00\x00", "Truncated record header at offset 8"),
+    (b"\x00" + bytes(8) + b"\x05\x00\x00\x00Hi", "Truncated record at offset 8"),
+    (b"\x02" + bytes(12), "Invalid direction 2 in record at offset 8"),
+])
+def test_corrupt_recording(tmp_path, trailer, message):
+    path = tmp_path / "session.rec"
+    path.write_bytes(MAGIC + trailer)
+    with pytest.raises(ValueError, match=message):
+        Recording(path)
+
+
+def write_recording(path, *chunks):
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for direction, timestamp, data in chunks:
+            f.write(RECORD_HEADER.pack(direction, timestamp, len(data)))
+            f.write(data)
+
+
+def test_timed_script(tmp_path):
+    path = tmp_path / "session.rec"
+    write_recording(
+        path,
+        (SENT_BY_SERVER, 0.0, b"Welcome"),
+        (SENT_BY_CLIENT, 1.0, b"Hello"),
+        (SENT_BY_SERVER, 3.0, b"Hi"),
+        (SENT_BY_CLIENT, 13.0, b"Bye"),
+    )
+    recording = Recording(path)
+    assert recording.to_script(timeout=2, time_scale=0.5).compile().steps == (
+        SendStep(b"Welcome", at=0.0),
+        ExpectBytesStep(b"Hello", 2.5, at=0.5),
+        SendStep(b"Hi", at=1.5),
+        ExpectBytesStep(b"Bye", 7.0, at=6.5),
+    )
+    # As fast as possible
+    assert recording.to_script(timeout=2, time_scale=0).compile().steps == (
+        SendStep(b"Welcome"),
+        ExpectBytesStep(b"Hello", 2),
+        SendStep(b"Hi"),
+        ExpectBytesStep(b"Bye", 2),
+    )
+    with pytest.raises(ValueError):
+        recording.to_script(time_scale=-1)
@@ -0,0 +1,69 @@
+import logging
+import time
+from collections import Counter
+
+from pytest_tcpclient import rendering
+from pytest_tcpclient.plugin import BytesReadEvent, ExceptionEvent, UnexpectedEventError
+from pytest_tcpclient.rendering import (
+    LazyBytes, render_bytes, render_counts, render_mismatch, render_value,
+)
+
+
+def test_render_bytes():
+    assert render_bytes(b"Hello") == "b'Hello'"
+    assert render_bytes(bytearray(b"x" * 100)) == f"{b'x' * 64}... (100 bytes)"
+
+
+def test_configure():
+    try:
+        rendering.configure(4)
+        assert render_bytes(b"Hello") == "b'Hell'... (5 bytes)"
+    finally:
+        rendering.configure(rendering.DEFAULT_MAX_LENGTH)
+
+
+def test_lazy_bytes(caplog):
+    caplog.set_level(logging.DEBUG)
+    logging.getLogger("test").debug("Payload %s", LazyBytes(b"x" * 100))
+    assert caplog.messages == [f"Payload {b'x' * 64}... (100 bytes)"]
+
+
+def test_unexpected_event_error_str():
+    error = UnexpectedEventError(BytesReadEvent(b"Hello"), BytesReadEvent(b"Howdy"))
+    assert str(error) == \
+        "UnexpectedEventError(expected_event=BytesReadEvent(bytes_read=b'Hello'), " + \
+        "actual_event=BytesReadEvent(bytes_read=b'Howdy'))"
+
+
+def test_unexpected_event_error_str_is_bounded():
+    error = UnexpectedEventError(
+        BytesReadEvent(b"x" * 100),
+        ExceptionEvent(ConnectionResetError("y" * 100)),
+    )
+    assert str(error) == \
+        f"UnexpectedEventError(expected_event=BytesReadEvent(bytes_read={b'x' * 64}... " + \
+        "(100 bytes)), actual_event=ExceptionEvent(exception=" + \
+        f"{repr(ConnectionResetError('y' * 100))[:64]}... (124 characters)))"
+
+
+def test_render_value():
+    assert render_value({"op": "ping"}) == "{'op': 'ping'}"
+    assert render_value("x" * 100) == f"{repr('x' * 100)[:64]}... (102 characters)"
+
+
+def test_render_counts():
+    assert render_counts(Counter([b"a", b"b", b"b"])) == "b'b' x2, b'a'"
+    many = Counter(bytes([byte]) for byte in range(b"a"[0], b"a"[0] + 10))
+    assert render_counts(many) == \
+        "b'a', b'b', b'c', b'd', b'e', b'f', b'g', b'h', and 2 more"
+
+
+def test_render_late_mismatch_in_large_payload_is_fast():
+    # Comparing a byte at a time in Python took seconds for this
+    expected = bytes(50 * 1024 * 1024)
+    actual = bytearray(expected)
+    actual[-1] = 1
+    start = time.perf_counter()
+    message = render_mismatch("Mismatch", expected, actual)
+    assert time.perf_counter() - start < 1
+    assert f"First difference at offset {len(expected) - 1}." in message
@@ -0,0 +1,86 @@
+import pytest
+
+from pytest_tcpclient.framing import CODECS
+from pytest_tcpclient.script import (
+    ExpectBytesStep, ExpectFrameStep, Script, SendStep
+)
+
+
+def test_adjacent_sends_are_merged():
+    script = Script().send_bytes(b"Hello").send_frame(b"!").send_bytes(bytearray(b"Bye"))
+    assert script.compile().steps == (SendStep(b"Hello\x00\x00\x00\x01!Bye"),)
+    assert script.compile().steps[0].frames == 1
+
+
+def test_adjacent_expectations_are_merged():
+    script = Script().expect_bytes(b"Hello", timeout=1).expect_bytes(b"World", timeout=2)
+    assert script.compile().steps == (ExpectBytesStep(b"HelloWorld", 3),)
+
+
+def test_frame_expectations_are_not_merged():
+    script = Script([
+        ("expect_bytes", b"a"),
+        ("expect_frame", b"b"),
+        ("expect_frame", b"c"),
+        ("expect_bytes", b"d"),
+        ("send_bytes", b"e"),
+        ("expect_bytes", b"f"),
+    ])
+    assert script.compile().steps == (
+        ExpectBytesStep(b"a", 1),
+        ExpectFrameStep(b"b", 1),
+        ExpectFrameStep(b"c", 1),
+        ExpectBytesStep(b"d", 1),
+        SendStep(b"e"),
+        ExpectBytesStep(b"f", 1),
+    )
+
+
+def test_plans_are_cached_by_codec():
+    script = Script().send_frame(b"Hello")
+    plan = script.compile()
+    assert script.compile(None) is plan
+    assert script.compile("u32be") is plan
+
+    varint_plan = script.compile("varint")
+    assert varint_plan.codec is CODECS["varint"]
+    assert varint_plan.steps == (SendStep(b"\x05Hello"),)
+
+    script.send_bytes(b"!")
+    assert script.compile() is not plan
+    assert script.compile().steps == (SendStep(b"\x00\x00\x00\x05Hello!"),)
+
+
+def test_data_is_copied():
+    data = bytearray(b"Hello")
+    script = Script().send_bytes(data)
+    data[0:1] = b"J"
+    assert script.compile().steps == (SendStep(b"Hello"),)
+
+
+@pytest.mark.parametrize("step, error", [
+    (("send_bytes", "Hello"), TypeError),
+    (("expect_frame", None), TypeError),
+    (("expect_bytes", b"Hello", 0), ValueError),
+    (("expect_bytes", b"Hello", True), ValueError),
+    (("expect_connect",), ValueError),
+])
+def test_invalid_steps(step, error):
+    with pytest.raises(error):
+        Script([step])
+
+
+def test_delayed_sends_are_not_merged():
+    script = Script([
+        ("send_bytes", b"a"),
+        ("send_bytes", b"b", 0.5),
+        ("send_bytes", b"c"),
+        ("send_frame", b"d", 1),
+    ])
+    assert script.compile().steps == (
+        SendStep(b"a"),
+        SendStep(b"bc", 0.5),
+        SendStep(b"\x00\x00\x00\x01d", 1),
+    )
+    with pytest.raises(ValueError):
+        script.send_bytes(b"e", delay=-1)
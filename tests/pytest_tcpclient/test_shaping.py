@@ -0,0 +1,137 @@
+from unittest import mock
+
+import pytest
+
+from pytest_tcpclient.plugin import MockTcpServer
+from pytest_tcpclient.shaping import ReadThrottle, SendShaping, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=100, capacity=10, now=0)
+    assert bucket.consume(10, now=0) == 0
+    # Goes into debt
+    assert bucket.consume(5, now=0) == pytest.approx(0.05)
+    # The debt has been repaid and 5 more tokens have accumulated
+    assert bucket.consume(5, now=0.1) == 0
+    # Tokens don't accumulate beyond the capacity
+    assert bucket.consume(10, now=10) == 0
+    assert bucket.consume(1, now=10) == pytest.approx(0.01)
+
+
+def test_effective_chunk_size():
+    assert SendShaping(chunk_size=7).effective_chunk_size(100) == 7
+    assert SendShaping(bandwidth=10000).effective_chunk_size(100) == 100
+    assert SendShaping(bandwidth=10).effective_chunk_size(100) == 1
+    assert SendShaping(chunk_delay=1).effective_chunk_size(100) == 100
+    assert SendShaping(chunk_delay=1).effective_chunk_size(0) == 1
+
+
+def test_token_bucket_capacity():
+    assert SendShaping(chunk_size=1).new_token_bucket(0) is None
+    assert SendShaping(bandwidth=10000).new_token_bucket(0).capacity == 100
+    assert SendShaping(bandwidth=10000, chunk_size=5).new_token_bucket(0).capacity == 5
+    assert SendShaping(bandwidth=10000, burst=500).new_token_bucket(0).capacity == 500
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"chunk_size": 0},
+    {"chunk_size": 1.5},
+    {"chunk_size": True},
+    {"bandwidth": 0},
+    {"bandwidth": True},
+    {"chunk_delay": -1},
+    {"burst": -1},
+])
+def test_invalid_shaping(kwargs):
+    with pytest.raises(ValueError):
+        SendShaping(**kwargs)
+
+
+class FakeTransport:
+
+    def __init__(self):
+        self.reading = True
+
+    def pause_reading(self):
+        self.reading = False
+
+    def resume_reading(self):
+        self.reading = True
+
+
+class FakeLoop:
+
+    def __init__(self):
+        self.now = 0
+        self.calls = []
+
+    def time(self):
+        return self.now
+
+    def call_later(self, delay, callback):
+        self.calls.append((self.now + delay, callback))
+        return mock.Mock()
+
+    def advance(self):
+        self.now, callback = self.calls.pop(0)
+        callback()
+
+
+def make_read_throttle(rate):
+    transport = FakeTransport()
+    loop = FakeLoop()
+    fed = []
+    throttle = ReadThrottle(
+        transport, rate, loop, lambda data: fed.append(bytes(data)), lambda: fed.append(None)
+    )
+    return throttle, transport, loop, fed
+
+
+def test_read_throttle_holds_back_everything_at_rate_0():
+    throttle, transport, loop, fed = make_read_throttle(0)
+    throttle.data_received(b"Hello")
+    throttle.eof_received()
+    assert fed == []
+    assert not transport.reading
+    assert loop.calls == []
+
+    throttle.cancel()
+    assert fed == [b"Hello", None]
+
+
+def test_read_throttle_feeds_at_rate():
+    # Pieces of 10 bytes, one every 10ms
+    throttle, transport, loop, fed = make_read_throttle(1000)
+    throttle.data_received(b"a" * 25)
+    throttle.eof_received()
+    assert fed == [b"a" * 10]
+    assert not transport.reading
+
+    loop.advance()
+    assert loop.now == pytest.approx(0.01)
+    assert fed == [b"a" * 10] * 2
+
+    loop.advance()
+    assert loop.now == pytest.approx(0.015)
+    assert fed == [b"a" * 10] * 2 + [b"a" * 5, None]
+    assert transport.reading
+
+
+def test_read_throttle_cancel_while_feeding():
+    throttle, transport, loop, fed = make_read_throttle(1000)
+    throttle.data_received(b"a" * 25)
+    throttle.eof_received()
+    assert fed == [b"a" * 10]
+    assert len(loop.calls) == 1
+    feed_handle = throttle.feed_handle
+
+    throttle.cancel()
+    feed_handle.cancel.assert_called_once_with()
+    assert throttle.feed_handle is None
+    assert fed == [b"a" * 10, b"a" * 10, b"a" * 5, None]
+
+
+@pytest.mark.parametrize("rate", [-1, True, "fast"])
+def test_invalid_throttle_rate(mocker, rate):
+    with pytest.raises(ValueError, match="`rate` must be a positive number"):
+        MockTcpServer(0, mocker).throttle_reading(rate)
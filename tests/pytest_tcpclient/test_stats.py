@@ -0,0 +1,76 @@
+import pytest
+
+from pytest_tcpclient.plugin import MockTcpServer
+from pytest_tcpclient.stats import (
+    ConnectionStats, Histogram, LatencyReport, as_record, format_seconds, summary_lines,
+)
+
+
+def test_histogram():
+    histogram = Histogram()
+    for size in (0, 1, 2, 3, 4, 1000, 1023, 1024):
+        histogram.add(size)
+    assert histogram.as_dict() == {0: 1, 1: 1, 3: 2, 7: 1, 1023: 2, 2047: 1}
+
+
+def test_connection_stats():
+    stats = ConnectionStats()
+    assert stats.time_to_first_byte is None
+    assert stats.duration is None
+
+    stats.connected_at = 10
+    stats.sent(5)
+    stats.sent(7)
+    stats.received(3, now=10.25)
+    stats.received(4, now=11)
+    stats.client_read(12)
+    stats.closed_at = 12
+
+    assert (stats.bytes_sent, stats.writes) == (12, 2)
+    assert (stats.bytes_received, stats.reads) == (7, 2)
+    assert (stats.client_bytes_read, stats.client_reads) == (12, 1)
+    assert stats.time_to_first_byte == 0.25
+    assert stats.duration == 2
+    assert stats.as_dict()["sent_chunk_sizes"] == {7: 2}
+
+
+def test_format_seconds():
+    assert format_seconds(None) == "-"
+    assert format_seconds(0.00125) == "1.2ms"
+
+
+def test_summary_lines():
+    stats = ConnectionStats()
+    stats.sent(5)
+    stats.expectation_durations = [("ExpectBytes", 0.002), ("SendBytes", 0.001)]
+    lines = summary_lines([
+        as_record("test_a", None, stats), as_record("test_b", 1, ConnectionStats()),
+    ])
+    assert lines[0].split() == [
+        "sent", "writes", "frames", "received", "reads", "frames", "ttfb", "duration",
+        "slowest", "test",
+    ]
+    assert lines[1].split() == ["5", "1", "0", "0", "0", "0", "-", "-", "2.0ms", "test_a"]
+    assert lines[2].endswith("test_b [connection 1]")
+
+
+def test_latency_report():
+    report = LatencyReport()
+    assert report.p50 is None
+    assert str(report) == "0 samples: p50=- p90=- p99=- max=-"
+    for latency in range(100, 0, -1):
+        report.add(latency / 1000)
+    assert len(report) == 100
+    assert (report.p50, report.p90, report.p99, report.max) == (0.05, 0.09, 0.099, 0.1)
+    assert report.percentile(0.1) == 0.001
+    report.add(0.2)
+    assert report.max == 0.2
+    assert report.as_dict()["count"] == 101
+    with pytest.raises(ValueError):
+        report.percentile(0)
+
+
+@pytest.mark.parametrize("count", [0, -1, True, 1.5])
+def test_serve_repeated_invalid_count(mocker, count):
+    with pytest.raises(ValueError, match="`count` must be a positive integer"):
+        MockTcpServer(0, mocker).serve_repeated(b"PING", b"PONG", count)
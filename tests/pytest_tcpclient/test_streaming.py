@@ -0,0 +1,104 @@
+import sys
+import zlib
+
+import pytest
+
+from pytest_tcpclient.plugin import MockTcpServer
+from pytest_tcpclient.streaming import (
+    DIFFERENCE_BLOCK_SIZE, Crc32, StreamDigest, first_difference, iter_expected_chunks,
+    new_hash,
+)
+
+
+def test_bytes_source():
+    chunks = list(iter_expected_chunks(b"HelloWorld", chunk_size=4))
+    assert chunks == [b"Hell", b"oWor", b"ld"]
+
+
+def test_iterable_source_is_rechunked():
+    chunks = list(iter_expected_chunks(iter([b"Hello", b"", b"World"]), chunk_size=3))
+    assert chunks == [b"Hel", b"lo", b"Wor", b"ld"]
+
+
+def test_file_source(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"HelloWorld")
+    assert list(iter_expected_chunks(path, chunk_size=4)) == [b"Hell", b"oWor", b"ld"]
+    assert b"".join(iter_expected_chunks(str(path))) == b"HelloWorld"
+
+
+def test_empty_file_source(tmp_path):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    assert list(iter_expected_chunks(path)) == []
+
+
+def test_first_difference():
+    assert first_difference(b"Hello", b"Help!") == 3
+    assert first_difference(b"Hello", b"Hello, world") == 5
+    assert first_difference(b"", b"Hello") == 0
+    assert first_difference(b"Hello", bytearray(b"Hello")) == 5
+
+
+def test_first_difference_spanning_blocks():
+    size = 3 * DIFFERENCE_BLOCK_SIZE + 10
+    expected = bytes(size)
+    for index in [0, DIFFERENCE_BLOCK_SIZE - 1, DIFFERENCE_BLOCK_SIZE, size - 1]:
+        actual = bytearray(expected)
+        actual[index] = 1
+        assert first_difference(expected, memoryview(actual)) == index
+
+
+@pytest.mark.parametrize("algorithm", ["sha256", "md5", "crc32", "xxh64"])
+def test_stream_digest_of(algorithm):
+    data = b"HelloWorld" * 10
+    digest = StreamDigest.of(iter([data[:7], data[7:50], data[50:]]), algorithm, chunk_size=32)
+    assert digest.length == 100
+    assert digest.algorithm == algorithm
+    assert digest.chunk_size == 32
+    assert len(digest.chunk_hexdigests) == 4
+
+    expected = new_hash(algorithm)
+    expected.update(data)
+    assert digest.hexdigest == expected.hexdigest()
+
+    expected = new_hash(algorithm)
+    expected.update(data[32:64])
+    assert digest.chunk_hexdigests[1] == expected.hexdigest()
+
+
+def test_xxhash_not_installed(monkeypatch):
+    # `None` in `sys.modules` makes the import raise `ImportError`
+    monkeypatch.setitem(sys.modules, "xxhash", None)
+    with pytest.raises(ValueError, match="The `xxhash` package is required for 'xxh64'"):
+        new_hash("xxh64")
+
+
+def test_crc32():
+    crc = Crc32()
+    crc.update(b"Hello")
+    crc.update(b"World")
+    assert crc.hexdigest() == f"{zlib.crc32(b'HelloWorld'):08x}"
+
+
+def test_stream_digest_requires_a_digest():
+    with pytest.raises(ValueError, match="Either `hexdigest` or `chunk_hexdigests`"):
+        StreamDigest(10)
+    with pytest.raises(ValueError, match="`chunk_size` is required"):
+        StreamDigest(10, chunk_hexdigests=["0"])
+
+
+def test_stream_digest_checks_chunk_count():
+    digest = StreamDigest.of(b"x" * 10, chunk_size=4)
+    assert len(digest.chunk_hexdigests) == 3
+    with pytest.raises(ValueError, match="has 2 chunks of 5 bytes but 3 chunk digests"):
+        StreamDigest(10, chunk_size=5, chunk_hexdigests=digest.chunk_hexdigests)
+    with pytest.raises(ValueError, match="has 4 chunks of 3 bytes but 3 chunk digests"):
+        StreamDigest(10, chunk_size=3, chunk_hexdigests=digest.chunk_hexdigests)
+    assert StreamDigest(0, chunk_size=4, chunk_hexdigests=[]).chunk_hexdigests == []
+
+
+@pytest.mark.parametrize("method", ["expect_bytes_digest", "expect_frame_digest"])
+def test_expect_digest_of_another_length(mocker, method):
+    with pytest.raises(ValueError, match="`length` is 5 but the digest is of 10 bytes"):
+        getattr(MockTcpServer(0, mocker), method)(5, StreamDigest.of(b"x" * 10))
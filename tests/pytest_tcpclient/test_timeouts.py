@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from pytest_tcpclient.plugin import wait_for
+
+
+@pytest.mark.asyncio()
+async def test_wait_for_result():
+    assert await wait_for(asyncio.sleep(0, "done"), timeout=1) == "done"
+
+
+@pytest.mark.asyncio()
+async def test_wait_for_without_timeout():
+    assert await wait_for(asyncio.sleep(0.01, "done"), timeout=None) == "done"
+
+
+@pytest.mark.asyncio()
+async def test_wait_for_times_out():
+    with pytest.raises(asyncio.TimeoutError):
+        await wait_for(asyncio.sleep(1), timeout=0.01)
+    # The task that timed out can carry on
+    assert await wait_for(asyncio.sleep(0, "done"), timeout=1) == "done"
+
+
+@pytest.mark.asyncio()
+async def test_wait_for_cancelled():
+    # A cancellation that isn't the timeout's is passed on
+    task = asyncio.ensure_future(wait_for(asyncio.sleep(1), timeout=5))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from pytest_tcpclient.framing import write_frame
+from pytest_tcpclient.plugin import MockTcpServer
+
+
+@pytest.mark.parametrize("method", ["expect_frames_unordered", "expect_any_of"])
+def test_payloads_must_not_be_empty(mocker, method):
+    with pytest.raises(ValueError, match="`payloads` must not be empty"):
+        getattr(MockTcpServer(0, mocker), method)([])
+
+
+@pytest.mark.parametrize("method", ["expect_frames_unordered", "expect_any_of"])
+def test_payloads_must_be_bytes(mocker, method):
+    with pytest.raises(TypeError, match="`payloads` must be bytes-like"):
+        getattr(MockTcpServer(0, mocker), method)(["GET"])
+
+
+@pytest.mark.asyncio()
+async def test_expect_frames_unordered_many_frames(tcpserver):
+    # Each payload is matched with a lookup so many distinct payloads are cheap
+    payloads = [str(index).encode() for index in range(50_000)]
+    tcpserver.expect_connect()
+    tcpserver.expect_frames_unordered(payloads)
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    for payload in reversed(payloads):
+        write_frame(writer, payload)
+    await tcpserver.join()
+
+    assert tcpserver.stats.frames_received == 50_000
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_expect_any_of_connection_closed(tcpserver):
+    tcpserver.expect_connect()
+    tcpserver.expect_any_of([b"BYE"])
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    writer.write(b"\x00\x00")
+    writer.close()
+    await writer.wait_closed()
+
+    with pytest.raises(pytest.fail.Exception, match="but only read b'\\\\x00\\\\x00' before"):
+        await tcpserver.join()
+
+
+@pytest.mark.asyncio()
+async def test_expect_any_of_times_out(tcpserver):
+    tcpserver.expect_connect()
+    tcpserver.expect_any_of([b"BYE"], timeout=0.1)
+
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+
+    with pytest.raises(pytest.fail.Exception, match="Timed out waiting for a frame with any"):
+        await tcpserver.join()
+    writer.close()
+    await writer.wait_closed()
+
+
+@pytest.mark.asyncio()
+async def test_missing_expect_connect(tcpserver):
+    _, writer = await asyncio.open_connection(None, tcpserver.service_port)
+    tcpserver.expect_frames_unordered([b"a"])
+    write_frame(writer, b"a")
+
+    with pytest.raises(pytest.fail.Exception, match="Missing `expect_connect\\(\\)` before"):
+        await tcpserver.join()
+    writer.close()
+    await writer.wait_closed()